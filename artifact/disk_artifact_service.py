@@ -0,0 +1,491 @@
+"""
+Disk-backed, content-addressed artifact service.
+
+Blobs are stored once under `blobs/<sha256[:2]>/<sha256>` no matter how many
+versions, sessions or users save the same bytes. Each artifact keeps a small
+JSON manifest of its versions that points at those blobs. Loads go through a
+size-bounded in-memory LRU keyed by digest, and cold reads are served from a
+memory map, so nothing is read twice and nothing is buffered in between.
+
+Artifacts written to disk by a tool (e.g. a large export) can be saved as a
+`file://` FileData part. Files under one of `ingest_dirs` are then streamed
+into the blob store and removed, without ever being read into memory.
+
+Usage:
+    svc = DiskArtifactService("/tmp/adk_artifacts", memory_cache_bytes=64 * 2**20)
+    runner = Runner(agent=..., session_service=..., artifact_service=svc)
+"""
+import asyncio
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter, OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+from urllib.parse import quote, unquote, urlparse
+
+from google.adk.artifacts import BaseArtifactService
+from google.adk.artifacts import artifact_util
+from google.adk.artifacts.base_artifact_service import ArtifactVersion, ensure_part
+from google.genai import types
+
+MANIFEST_SUFFIX = ".json"
+
+# Chunk size for hashing and copying ingested files
+COPY_CHUNK_BYTES = 1 << 20
+
+
+class _LruBlobCache:
+    """Least-recently-used cache of blob bytes keyed by digest, bounded by total size."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, digest: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._entries.get(digest)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            return data
+
+    def put(self, digest: str, data: bytes):
+        # A blob bigger than the whole budget would only evict everything else
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            if digest in self._entries:
+                self._entries.move_to_end(digest)
+                return
+            self._entries[digest] = data
+            self.size_bytes += len(data)
+            while self.size_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size_bytes -= len(evicted)
+
+    def discard(self, digest: str):
+        with self._lock:
+            data = self._entries.pop(digest, None)
+            if data is not None:
+                self.size_bytes -= len(data)
+
+
+class DiskArtifactService(BaseArtifactService):
+    """
+    Artifact service that persists content-addressed blobs on local disk.
+
+    Args:
+        root_dir: Directory holding the `blobs/` and `index/` trees. Created if missing.
+        memory_cache_bytes: Budget of the in-memory LRU for hot blobs. 0 disables it.
+        ingest_dirs: Directories whose files are moved into the blob store when
+            saved as `file://` FileData parts. Other file URIs are kept as references.
+    """
+
+    def __init__(
+        self,
+        root_dir: Union[str, Path],
+        memory_cache_bytes: int = 64 * 2**20,
+        ingest_dirs: Sequence[Union[str, Path]] = (),
+    ):
+        self.root_dir = Path(root_dir)
+        self.blob_dir = self.root_dir / "blobs"
+        self.index_dir = self.root_dir / "index"
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self.cache = _LruBlobCache(memory_cache_bytes)
+        self.ingest_dirs = [Path(d).resolve() for d in ingest_dirs]
+        # Manifests are read-modify-written from worker threads
+        self._manifest_lock = threading.Lock()
+        # Digests being saved whose manifest entry isn't written yet; collect_garbage leaves them alone
+        self._pinned: Counter = Counter()
+        self._blob_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Paths
+    # ------------------------------------------------------------------
+    def _file_has_user_namespace(self, filename: str) -> bool:
+        return filename.startswith("user:")
+
+    def _scope_dir(self, app_name: str, user_id: str, session_id: Optional[str]) -> Path:
+        artifact_util.validate_path_segment(app_name, "app_name")
+        artifact_util.validate_path_segment(user_id, "user_id")
+        if session_id is None:
+            return self.index_dir / app_name / user_id / "user"
+        artifact_util.validate_path_segment(session_id, "session_id")
+        return self.index_dir / app_name / user_id / "sessions" / session_id
+
+    def _manifest_path(
+        self, app_name: str, user_id: str, filename: str, session_id: Optional[str]
+    ) -> Path:
+        if self._file_has_user_namespace(filename):
+            scope = self._scope_dir(app_name, user_id, None)
+        else:
+            if session_id is None:
+                raise ValueError("Session ID must be provided for session-scoped artifacts.")
+            scope = self._scope_dir(app_name, user_id, session_id)
+        # Quoting keeps any '/' or '..' in the filename from escaping the scope dir
+        return scope / (quote(filename, safe="") + MANIFEST_SUFFIX)
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.blob_dir / digest[:2] / digest
+
+    # ------------------------------------------------------------------
+    # Blobs
+    # ------------------------------------------------------------------
+    def _pin(self, digest: str, pins: List[str]):
+        with self._blob_lock:
+            self._pinned[digest] += 1
+        pins.append(digest)
+
+    def _unpin(self, pins: List[str]):
+        with self._blob_lock:
+            self._pinned.subtract(pins)
+            for digest in pins:
+                if self._pinned[digest] <= 0:
+                    del self._pinned[digest]
+
+    def _store_blob(self, data: bytes, pins: List[str]) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        # Pinned before the existence check, so a blob found here isn't collected before it's referenced
+        self._pin(digest, pins)
+        path = self._blob_path(digest)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            _atomic_write(path, data)
+        return digest
+
+    def _ingest_file(self, source: Path, pins: List[str]) -> Tuple[str, int]:
+        """Moves a file into the blob store, hashing it in chunks. Returns (digest, size)."""
+        digest = hashlib.sha256()
+        size = 0
+        with open(source, "rb") as f:
+            while chunk := f.read(COPY_CHUNK_BYTES):
+                digest.update(chunk)
+                size += len(chunk)
+        self._pin(digest.hexdigest(), pins)
+        path = self._blob_path(digest.hexdigest())
+        if path.exists():
+            source.unlink()
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # A rename when on the same filesystem, otherwise a chunked copy
+            shutil.move(str(source), str(path))
+        return digest.hexdigest(), size
+
+    def _ingestable_path(self, file_uri: str) -> Optional[Path]:
+        parsed = urlparse(file_uri)
+        if parsed.scheme != "file" or not self.ingest_dirs:
+            return None
+        path = Path(unquote(parsed.path)).resolve()
+        if any(path.is_relative_to(d) for d in self.ingest_dirs) and path.is_file():
+            return path
+        return None
+
+    def ingests(self, file_uri: str) -> bool:
+        """Whether saving a `file://` FileData part for `file_uri` moves the file into the blob store."""
+        return self._ingestable_path(file_uri) is not None
+
+    def _read_blob(self, digest: str) -> bytes:
+        # Callers check the LRU first; this is the cold path
+        with open(self._blob_path(digest), "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                data = b""
+            else:
+                # Copy straight out of the page cache into the one bytes object we keep
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    data = mapped[:]
+        self.cache.put(digest, data)
+        return data
+
+    def open_blob_view(self, digest: str) -> memoryview:
+        """
+        Returns a read-only, zero-copy view of a blob.
+
+        Served from the LRU when hot, otherwise backed by a memory map of the blob
+        file. Release the view (or use it as a context manager) when done.
+        """
+        data = self.cache.get(digest)
+        if data is not None:
+            return memoryview(data)
+        with open(self._blob_path(digest), "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return memoryview(b"")
+            # The map stays valid after the file is closed, for as long as the view lives
+            return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    # ------------------------------------------------------------------
+    # Manifests
+    # ------------------------------------------------------------------
+    def _read_manifest(self, path: Path) -> List[Dict[str, Any]]:
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+
+    def _write_manifest(self, path: Path, entries: List[Dict[str, Any]]):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _atomic_write(path, json.dumps(entries).encode())
+
+    # ------------------------------------------------------------------
+    # BaseArtifactService
+    # ------------------------------------------------------------------
+    async def save_artifact(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        filename: str,
+        artifact: Union[types.Part, Dict[str, Any]],
+        session_id: Optional[str] = None,
+        custom_metadata: Optional[Dict[str, Any]] = None,
+    ) -> int:
+        artifact = ensure_part(artifact)
+        path = self._manifest_path(app_name, user_id, filename, session_id)
+        return await asyncio.to_thread(self._save_sync, path, artifact, custom_metadata)
+
+    def _save_sync(
+        self, path: Path, artifact: types.Part, custom_metadata: Optional[Dict[str, Any]]
+    ) -> int:
+        entry: Dict[str, Any] = {"create_time": time.time(), "custom_metadata": custom_metadata or {}}
+        pins: List[str] = []
+        try:
+            return self._save_entry(path, artifact, entry, pins)
+        finally:
+            self._unpin(pins)
+
+    def _save_entry(self, path: Path, artifact: types.Part, entry: Dict[str, Any], pins: List[str]) -> int:
+        if artifact.inline_data is not None:
+            data = artifact.inline_data.data or b""
+            entry.update(kind="inline", mime_type=artifact.inline_data.mime_type, size=len(data))
+            entry["digest"] = self._store_blob(data, pins)
+            self.cache.put(entry["digest"], data)
+        elif artifact.text is not None:
+            data = artifact.text.encode()
+            entry.update(kind="text", mime_type="text/plain", size=len(data))
+            entry["digest"] = self._store_blob(data, pins)
+        elif artifact.file_data is not None:
+            source = self._ingestable_path(artifact.file_data.file_uri)
+            if source is not None:
+                digest, size = self._ingest_file(source, pins)
+                entry.update(kind="inline", mime_type=artifact.file_data.mime_type, size=size, digest=digest)
+            else:
+                entry.update(
+                    kind="file_data",
+                    mime_type=artifact.file_data.mime_type,
+                    file_uri=artifact.file_data.file_uri,
+                )
+        else:
+            raise ValueError("Not supported artifact type.")
+
+        # Blob writes above can run in parallel; only the version bump is serialized.
+        # The blob stays pinned until the entry referencing it is written.
+        with self._manifest_lock:
+            entries = self._read_manifest(path)
+            entry["version"] = len(entries)
+            entries.append(entry)
+            self._write_manifest(path, entries)
+        return entry["version"]
+
+    async def load_artifact(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        filename: str,
+        session_id: Optional[str] = None,
+        version: Optional[int] = None,
+    ) -> Optional[types.Part]:
+        path = self._manifest_path(app_name, user_id, filename, session_id)
+        entry = await asyncio.to_thread(self._get_entry, path, version)
+        if entry is None:
+            return None
+
+        if entry["kind"] == "file_data":
+            part = types.Part(
+                file_data=types.FileData(file_uri=entry["file_uri"], mime_type=entry.get("mime_type"))
+            )
+            if not artifact_util.is_artifact_ref(part):
+                return part
+            # Artifact references point at another artifact in the same scope
+            parsed_uri = artifact_util.parse_artifact_uri(entry["file_uri"])
+            if not parsed_uri:
+                raise ValueError(f"Invalid artifact reference URI: {entry['file_uri']}")
+            artifact_util.validate_artifact_reference_scope(
+                app_name=app_name, user_id=user_id, session_id=session_id, parsed_uri=parsed_uri
+            )
+            return await self.load_artifact(
+                app_name=parsed_uri.app_name,
+                user_id=parsed_uri.user_id,
+                filename=parsed_uri.filename,
+                session_id=parsed_uri.session_id,
+                version=parsed_uri.version,
+            )
+
+        data = self.cache.get(entry["digest"])
+        if data is None:
+            data = await asyncio.to_thread(self._read_blob, entry["digest"])
+        if not data:
+            return None
+        if entry["kind"] == "text":
+            return types.Part(text=data.decode())
+        return types.Part(inline_data=types.Blob(mime_type=entry["mime_type"], data=data))
+
+    def _get_entry(self, path: Path, version: Optional[int]) -> Optional[Dict[str, Any]]:
+        entries = self._read_manifest(path)
+        if not entries:
+            return None
+        try:
+            return entries[-1 if version is None else version]
+        except IndexError:
+            return None
+
+    async def open_artifact_view(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        filename: str,
+        session_id: Optional[str] = None,
+        version: Optional[int] = None,
+    ) -> Optional[memoryview]:
+        """Zero-copy counterpart of load_artifact for blob-backed artifacts."""
+        path = self._manifest_path(app_name, user_id, filename, session_id)
+        entry = await asyncio.to_thread(self._get_entry, path, version)
+        if entry is None or "digest" not in entry:
+            return None
+        return self.open_blob_view(entry["digest"])
+
+    async def list_artifact_keys(
+        self, *, app_name: str, user_id: str, session_id: Optional[str] = None
+    ) -> List[str]:
+        scopes = [self._scope_dir(app_name, user_id, None)]
+        if session_id is not None:
+            scopes.append(self._scope_dir(app_name, user_id, session_id))
+        return await asyncio.to_thread(self._list_keys_sync, scopes)
+
+    def _list_keys_sync(self, scopes: List[Path]) -> List[str]:
+        filenames = []
+        for scope in scopes:
+            if not scope.is_dir():
+                continue
+            for manifest in scope.iterdir():
+                if manifest.name.endswith(MANIFEST_SUFFIX):
+                    filenames.append(unquote(manifest.name[: -len(MANIFEST_SUFFIX)]))
+        return sorted(filenames)
+
+    async def delete_artifact(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        filename: str,
+        session_id: Optional[str] = None,
+    ) -> None:
+        # Blobs may be shared with other artifacts; collect_garbage() reclaims them
+        path = self._manifest_path(app_name, user_id, filename, session_id)
+        with self._manifest_lock:
+            path.unlink(missing_ok=True)
+
+    async def list_versions(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        filename: str,
+        session_id: Optional[str] = None,
+    ) -> List[int]:
+        path = self._manifest_path(app_name, user_id, filename, session_id)
+        entries = await asyncio.to_thread(self._read_manifest, path)
+        return [entry["version"] for entry in entries]
+
+    async def list_artifact_versions(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        filename: str,
+        session_id: Optional[str] = None,
+    ) -> List[ArtifactVersion]:
+        path = self._manifest_path(app_name, user_id, filename, session_id)
+        entries = await asyncio.to_thread(self._read_manifest, path)
+        return [self._to_artifact_version(entry) for entry in entries]
+
+    async def get_artifact_version(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        filename: str,
+        session_id: Optional[str] = None,
+        version: Optional[int] = None,
+    ) -> Optional[ArtifactVersion]:
+        path = self._manifest_path(app_name, user_id, filename, session_id)
+        entry = await asyncio.to_thread(self._get_entry, path, version)
+        return self._to_artifact_version(entry) if entry else None
+
+    def _to_artifact_version(self, entry: Dict[str, Any]) -> ArtifactVersion:
+        if "digest" in entry:
+            canonical_uri = self._blob_path(entry["digest"]).resolve().as_uri()
+        else:
+            canonical_uri = entry["file_uri"]
+        return ArtifactVersion(
+            version=entry["version"],
+            canonical_uri=canonical_uri,
+            custom_metadata=entry.get("custom_metadata") or {},
+            create_time=entry["create_time"],
+            mime_type=entry.get("mime_type"),
+        )
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+    def collect_garbage(self) -> int:
+        """
+        Deletes blobs no longer referenced by any artifact version. Blobs of
+        saves still in progress are kept.
+
+        Returns:
+            int: The number of blobs removed.
+        """
+        with self._manifest_lock:
+            referenced = set()
+            for manifest in self.index_dir.rglob("*" + MANIFEST_SUFFIX):
+                referenced.update(e["digest"] for e in self._read_manifest(manifest) if "digest" in e)
+            removed = 0
+            for blob in self.blob_dir.glob("*/*"):
+                # Skip referenced blobs, and temp files of writes still in progress
+                if blob.name in referenced or blob.name.startswith("."):
+                    continue
+                with self._blob_lock:
+                    if self._pinned[blob.name]:
+                        continue
+                    blob.unlink(missing_ok=True)
+                self.cache.discard(blob.name)
+                removed += 1
+        return removed
+
+
+def _atomic_write(path: Path, data: bytes):
+    # Write to a sibling temp file and rename, so readers never see a partial file
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
@@ -0,0 +1,144 @@
+"""
+Artifact service benchmark: InMemoryArtifactService vs DiskArtifactService.
+
+Scales the save/load flow from artifact/agent.py across blob sizes and version
+counts. Every configuration runs in a fresh process so its peak RSS is its own.
+
+Usage:
+    python -m benchmarks.artifact_benchmark
+    python -m benchmarks.artifact_benchmark --sizes 1024 1048576 --versions 1 50 --json artifacts.json
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from google.genai.types import Part
+
+from .load_test import _percentile
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def _make_service(kind: str, root_dir: str, cache_mb: int):
+    if kind == "memory":
+        from google.adk.artifacts import InMemoryArtifactService
+        return InMemoryArtifactService()
+    from artifact.disk_artifact_service import DiskArtifactService
+    return DiskArtifactService(root_dir, memory_cache_bytes=cache_mb * 2**20)
+
+
+async def _run(kind: str, size: int, versions: int, sessions: int, loads: int, cache_mb: int) -> Dict[str, Any]:
+    root_dir = tempfile.mkdtemp(prefix="artifact-bench-")
+    try:
+        svc = _make_service(kind, root_dir, cache_mb)
+        baseline_rss = _peak_rss_mb()
+        # Half the versions repeat earlier content, as re-uploads of an unchanged file would
+        unique_blobs = [os.urandom(size) for _ in range(max(1, versions // 2))]
+
+        save_samples = []
+        for s in range(sessions):
+            for v in range(versions):
+                data = unique_blobs[v % len(unique_blobs)]
+                started = time.perf_counter()
+                await svc.save_artifact(
+                    app_name="solo",
+                    user_id="u1",
+                    session_id=f"s{s}",
+                    filename="tester1.bin",
+                    artifact=Part.from_bytes(data=data, mime_type="application/octet-stream"),
+                )
+                save_samples.append(time.perf_counter() - started)
+
+        rng = random.Random(0)
+        latest_samples, random_samples = [], []
+        for _ in range(loads):
+            session_id = f"s{rng.randrange(sessions)}"
+            started = time.perf_counter()
+            part = await svc.load_artifact(app_name="solo", user_id="u1", session_id=session_id, filename="tester1.bin")
+            latest_samples.append(time.perf_counter() - started)
+            assert len(part.inline_data.data) == size
+
+            started = time.perf_counter()
+            await svc.load_artifact(
+                app_name="solo", user_id="u1", session_id=session_id,
+                filename="tester1.bin", version=rng.randrange(versions),
+            )
+            random_samples.append(time.perf_counter() - started)
+
+        disk_bytes = sum(
+            os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(root_dir) for f in files
+        )
+        return {
+            "service": kind,
+            "blob_bytes": size,
+            "versions": versions,
+            "sessions": sessions,
+            "save_p50_ms": _percentile(sorted(save_samples), 50) * 1000,
+            "save_p99_ms": _percentile(sorted(save_samples), 99) * 1000,
+            "load_latest_p50_ms": _percentile(sorted(latest_samples), 50) * 1000,
+            "load_random_p50_ms": _percentile(sorted(random_samples), 50) * 1000,
+            "load_random_p99_ms": _percentile(sorted(random_samples), 99) * 1000,
+            "rss_growth_mb": _peak_rss_mb() - baseline_rss,
+            "disk_mb": disk_bytes / 2**20,
+        }
+    finally:
+        shutil.rmtree(root_dir, ignore_errors=True)
+
+
+def _run_in_child(queue, *args):
+    queue.put(asyncio.run(_run(*args)))
+
+
+def run_isolated(*args) -> Dict[str, Any]:
+    """Runs one configuration in a fresh interpreter so RSS numbers don't bleed."""
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    process = ctx.Process(target=_run_in_child, args=(queue, *args))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="*", type=int, default=[1024, 64 * 1024, 1024 * 1024, 8 * 1024 * 1024])
+    parser.add_argument("--versions", nargs="*", type=int, default=[1, 10, 50])
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--loads", type=int, default=200)
+    parser.add_argument("--cache-mb", type=int, default=64, help="LRU budget of the disk service.")
+    parser.add_argument("--json", help="Also write the results to this JSON file.")
+    args = parser.parse_args(argv)
+
+    results = []
+    print(f"{'service':<8} {'blob KB':>9} {'vers':>5} {'save p50':>9} {'latest p50':>11} "
+          f"{'random p50':>11} {'random p99':>11} {'RSS +MB':>8} {'disk MB':>8}")
+    for size in args.sizes:
+        for versions in args.versions:
+            for kind in ("memory", "disk"):
+                row = run_isolated(kind, size, versions, args.sessions, args.loads, args.cache_mb)
+                results.append(row)
+                print(f"{kind:<8} {size / 1024:>9.0f} {versions:>5} {row['save_p50_ms']:>9.3f} "
+                      f"{row['load_latest_p50_ms']:>11.3f} {row['load_random_p50_ms']:>11.3f} "
+                      f"{row['load_random_p99_ms']:>11.3f} {row['rss_growth_mb']:>8.1f} {row['disk_mb']:>8.1f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
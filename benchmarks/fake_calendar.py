@@ -0,0 +1,199 @@
+"""
+Local fake of the Google Calendar API endpoints the scheduler uses.
+
+Serves, over plain HTTP on 127.0.0.1:
+  * POST /calendar/v3/freeBusy: busy blocks generated deterministically per
+    calendar and day, plus the events created here. Calendars whose ID
+    contains "external" come back with a notFound error, as calendars of
+    people outside the organization do.
+  * POST /calendar/v3/calendars/{calendarId}/events: inserts an event
+  * POST /batch/calendar/v3: multipart batches of the above
+
+Every HTTP request is counted by endpoint, and can be delayed by `latency_ms`
+to stand in for the round trip to Google.
+
+Usage:
+    with FakeCalendarServer(latency_ms=50) as server:
+        service = server.calendar_service()
+        schedule_sessions(service, emails, start, end)
+        server.calls   # {"freebusy": 2, "batch": 1}
+"""
+import email.parser
+import hashlib
+import http.server
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Tuple
+from urllib.parse import unquote, urlparse
+
+import httplib2
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+
+
+def _parse_time(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def _iso(value: datetime) -> str:
+    return value.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+class FakeCalendar:
+    """In-memory calendars: generated meetings plus inserted events."""
+
+    def __init__(self, meetings_per_day: int = 3, seed: int = 0):
+        self.meetings_per_day = meetings_per_day
+        self.seed = seed
+        self.events: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def _meetings(self, calendar_id: str, day: date) -> List[Tuple[datetime, datetime]]:
+        digest = hashlib.sha256(f"{self.seed}:{calendar_id}:{day.isoformat()}".encode()).digest()
+        rng = random.Random(digest)
+        meetings = []
+        for _ in range(rng.randint(0, self.meetings_per_day)):
+            start = datetime(day.year, day.month, day.day, 8, tzinfo=timezone.utc) + timedelta(minutes=30 * rng.randint(0, 18))
+            meetings.append((start, start + timedelta(minutes=30 * rng.randint(1, 3))))
+        return meetings
+
+    def free_busy(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        time_min, time_max = _parse_time(body["timeMin"]), _parse_time(body["timeMax"])
+        calendars = {}
+        with self._lock:
+            events = list(self.events)
+        for item in body.get("items", []):
+            calendar_id = item["id"]
+            if "external" in calendar_id:
+                calendars[calendar_id] = {"errors": [{"domain": "global", "reason": "notFound"}], "busy": []}
+                continue
+            busy = []
+            day = time_min.date()
+            while day <= time_max.date():
+                busy.extend(self._meetings(calendar_id, day))
+                day += timedelta(days=1)
+            for event in events:
+                if calendar_id in event["_calendars"]:
+                    busy.append((_parse_time(event["start"]["dateTime"]), _parse_time(event["end"]["dateTime"])))
+            calendars[calendar_id] = {"busy": [
+                {"start": _iso(start), "end": _iso(end)}
+                for start, end in sorted(busy) if end > time_min and start < time_max
+            ]}
+        return {"kind": "calendar#freeBusy", "timeMin": body["timeMin"], "timeMax": body["timeMax"], "calendars": calendars}
+
+    def insert_event(self, calendar_id: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        event_id = uuid.uuid4().hex
+        event = {
+            **body,
+            "id": event_id,
+            "status": "confirmed",
+            "htmlLink": f"https://calendar.example.com/event?eid={event_id}",
+            "_calendars": {calendar_id, *(a["email"] for a in body.get("attendees", []))},
+        }
+        with self._lock:
+            self.events.append(event)
+        return {k: v for k, v in event.items() if not k.startswith("_")}
+
+    def handle(self, method: str, path: str, body: bytes) -> Tuple[int, Dict[str, Any]]:
+        """Answers one (non-batch) API request."""
+        parts = urlparse(path).path.strip("/").split("/")
+        if method == "POST" and parts == ["calendar", "v3", "freeBusy"]:
+            return 200, self.free_busy(json.loads(body))
+        if method == "POST" and len(parts) == 5 and parts[:3] == ["calendar", "v3", "calendars"] and parts[4] == "events":
+            return 200, self.insert_event(unquote(parts[3]), json.loads(body))
+        return 404, {"error": {"code": 404, "message": f"No fake for {method} {path}"}}
+
+
+def _endpoint(path: str) -> str:
+    path = urlparse(path).path
+    if path.startswith("/batch/"):
+        return "batch"
+    if path.endswith("/freeBusy"):
+        return "freebusy"
+    if path.endswith("/events"):
+        return "events.insert"
+    return "other"
+
+
+class FakeCalendarServer:
+    """Runs a FakeCalendar behind a local HTTP server on a background thread."""
+
+    def __init__(self, latency_ms: float = 0.0, calendar: FakeCalendar = None):
+        self.latency_ms = latency_ms
+        self.calendar = calendar or FakeCalendar()
+        self.calls: Counter = Counter()
+        self._server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}/"
+
+    def __enter__(self) -> "FakeCalendarServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def calendar_service(self):
+        """A Calendar client for this server, built from the bundled discovery document."""
+        document = json.loads(get_static_doc("calendar", "v3"))
+        # Batch requests are sent to rootUrl, which api_endpoint does not override
+        document["rootUrl"] = self.base_url
+        document["baseUrl"] = self.base_url + document["servicePath"]
+        return build_from_document(document, http=httplib2.Http())
+
+    def _batch(self, content_type: str, body: bytes) -> Tuple[str, bytes]:
+        message = email.parser.BytesParser().parsebytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode() + body
+        )
+        boundary = f"batch_{uuid.uuid4().hex}"
+        out = []
+        for part in message.get_payload():
+            head, request_body = re.split(r"\r?\n\r?\n", part.get_payload(), maxsplit=1)
+            method, path, _version = head.splitlines()[0].split(" ", 2)
+            status, payload = self.calendar.handle(method, path, request_body.encode())
+            content_id = part["Content-ID"].strip("<>")
+            out.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\nContent-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {status} {'OK' if status == 200 else 'Not Found'}\r\n"
+                f"Content-Type: application/json; charset=UTF-8\r\n\r\n{json.dumps(payload)}\r\n"
+            )
+        out.append(f"--{boundary}--\r\n")
+        return f"multipart/mixed; boundary={boundary}", "".join(out).encode()
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                server.calls[_endpoint(self.path)] += 1
+                if server.latency_ms:
+                    time.sleep(server.latency_ms / 1000)
+                if _endpoint(self.path) == "batch":
+                    content_type, payload = server._batch(self.headers["Content-Type"], body)
+                    status = 200
+                else:
+                    status, response = server.calendar.handle("POST", self.path, body)
+                    content_type, payload = "application/json; charset=UTF-8", json.dumps(response).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,551 @@
+"""
+Offline load test for the agents in this repo.
+
+Drives N concurrent sessions per agent through `Runner` and
+`InMemorySessionService`, with a StubLlm replaying scripted function calls in
+place of Gemini. Remote toolsets are swapped for empty offline ones and outbound
+HTTP is answered locally, so nothing leaves the machine.
+
+Usage:
+    python -m benchmarks.load_test --sessions 200 --concurrency 50
+    python -m benchmarks.load_test --agents journey2 --model-latency-ms 300 --json out.json
+"""
+import argparse
+import asyncio
+import contextlib
+import functools
+import inspect
+import io
+import json
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+from unittest import mock
+
+import pandas as pd
+from google.adk.plugins.base_plugin import BasePlugin
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.adk.tools import google_api_tool
+from google.adk.tools.application_integration_tool import application_integration_toolset
+from google.adk.tools.base_toolset import BaseToolset
+from google.genai import types
+
+from shared import integration_spec_cache
+
+from .stub_llm import ScriptStep, StubLlm, call, reply
+
+CALLBACK_ATTRIBUTES = [
+    "before_agent_callback",
+    "after_agent_callback",
+    "before_model_callback",
+    "after_model_callback",
+    "before_tool_callback",
+    "after_tool_callback",
+]
+
+
+# ==============================================================================
+# Latency bookkeeping
+# ==============================================================================
+class LatencyRecorder:
+    """Collects latency samples in seconds, grouped by (kind, name)."""
+
+    def __init__(self):
+        self.samples: Dict[tuple, List[float]] = defaultdict(list)
+
+    def record(self, kind: str, name: str, seconds: float):
+        self.samples[(kind, name)].append(seconds)
+
+    def summary(self) -> List[Dict[str, Any]]:
+        rows = []
+        for (kind, name), values in sorted(self.samples.items()):
+            values = sorted(values)
+            rows.append({
+                "kind": kind,
+                "name": name,
+                "count": len(values),
+                "p50_ms": _percentile(values, 50) * 1000,
+                "p95_ms": _percentile(values, 95) * 1000,
+                "p99_ms": _percentile(values, 99) * 1000,
+                "max_ms": values[-1] * 1000,
+            })
+        return rows
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    # Nearest-rank percentile; good enough for latency reporting
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class ToolTimingPlugin(BasePlugin):
+    """Runner plugin that records the wall time of every tool call."""
+
+    def __init__(self, recorder: LatencyRecorder):
+        super().__init__(name="tool_timing")
+        self.recorder = recorder
+        self._started: Dict[str, float] = {}
+
+    async def before_tool_callback(self, *, tool, tool_args, tool_context):
+        self._started[tool_context.function_call_id] = time.perf_counter()
+
+    async def after_tool_callback(self, *, tool, tool_args, tool_context, result):
+        started = self._started.pop(tool_context.function_call_id, None)
+        if started is not None:
+            self.recorder.record("tool", tool.name, time.perf_counter() - started)
+
+    async def on_tool_error_callback(self, *, tool, tool_args, tool_context, error):
+        started = self._started.pop(tool_context.function_call_id, None)
+        if started is not None:
+            self.recorder.record("tool_error", tool.name, time.perf_counter() - started)
+
+
+def time_agent_callbacks(agent, recorder: LatencyRecorder):
+    """Wraps the agent's own callbacks (and its sub-agents') with timers, in place."""
+    for attribute in CALLBACK_ATTRIBUTES:
+        callback = getattr(agent, attribute, None)
+        if callback is None:
+            continue
+        if isinstance(callback, list):
+            setattr(agent, attribute, [_timed_callback(cb, attribute, recorder) for cb in callback])
+        else:
+            setattr(agent, attribute, _timed_callback(callback, attribute, recorder))
+    for sub_agent in agent.sub_agents:
+        time_agent_callbacks(sub_agent, recorder)
+
+
+def _timed_callback(callback: Callable, attribute: str, recorder: LatencyRecorder) -> Callable:
+    name = f"{attribute}:{getattr(callback, '__name__', type(callback).__name__)}"
+
+    @functools.wraps(callback)
+    async def timed(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            result = callback(*args, **kwargs)
+            if inspect.isawaitable(result):
+                result = await result
+            return result
+        finally:
+            recorder.record("callback", name, time.perf_counter() - started)
+
+    return timed
+
+
+# ==============================================================================
+# Offline environment
+# ==============================================================================
+class OfflineToolset(BaseToolset):
+    """Takes the place of toolsets that fetch remote specs at construction time."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+
+    async def get_tools(self, readonly_context=None):
+        return []
+
+
+class _FakeHttpResponse:
+    def __init__(self, payload: dict):
+        self._payload = payload
+        self.status_code = 200
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._payload
+
+
+def fake_requests_get(url: str, *args, **kwargs) -> _FakeHttpResponse:
+    """Answers the HTTP calls the repo's tools make, without the network."""
+    if "userinfo" in url:
+        return _FakeHttpResponse({"email": "loadtest@example.com", "name": "Load Test"})
+    if "frankfurter" in url:
+        params = kwargs.get("params") or {}
+        currency_to = params.get("to", "INR")
+        return _FakeHttpResponse({
+            "amount": 1.0,
+            "base": params.get("from", "USD"),
+            "date": "2025-01-01",
+            "rates": {currency_to: 83.12},
+        })
+    raise RuntimeError(f"Unexpected outbound request in offline load test: {url}")
+
+
+@contextlib.contextmanager
+def offline_environment():
+    """Lets the agent modules import and run with no credentials and no network."""
+    os.environ.setdefault("OAUTH_CLIENT_ID", "offline-client-id")
+    os.environ.setdefault("OAUTH_CLIENT_SECRET", "offline-client-secret")
+    # testagent talks to the bundled fake Workspace MCP server instead of the real one
+    os.environ.setdefault("USE_FAKE_WORKSPACE_MCP", "1")
+    # A 20-candidate cohort per session, the size the onboarding scenario has always ingested
+    os.environ.setdefault("FAKE_MCP_SHEET_ROWS", "20")
+    # No Workspace credentials here, so find_drive_file only sees what search_drive indexed
+    os.environ.setdefault("DRIVE_INDEX_PATH", os.path.join(tempfile.gettempdir(), "load_test_drive_index.db"))
+    with contextlib.ExitStack() as stack:
+        for name in ("CalendarToolset", "SheetsToolset"):
+            stack.enter_context(mock.patch.object(google_api_tool, name, OfflineToolset))
+        stack.enter_context(mock.patch.object(
+            application_integration_toolset, "ApplicationIntegrationToolset", OfflineToolset
+        ))
+        stack.enter_context(mock.patch.object(
+            integration_spec_cache, "CachedApplicationIntegrationToolset", OfflineToolset
+        ))
+        stack.enter_context(mock.patch("requests.get", fake_requests_get))
+        yield
+
+
+def _offline_mongo_client():
+    # mongomock is only needed for offline runs, so it is imported lazily
+    try:
+        import mongomock
+    except ImportError:
+        raise RuntimeError("Set MONGO_URI or install 'mongomock' to load test the candidate tools.")
+    return _SharedMongoMock.get(mongomock)
+
+
+class _SharedMongoMock:
+    # One in-process database for the whole run, like a single real mongod
+    _client = None
+
+    @classmethod
+    def get(cls, mongomock):
+        if cls._client is None:
+            client = mongomock.MongoClient()
+            client.close = lambda: None
+            cls._client = _SerializedMongo(client, threading.RLock())
+        return cls._client
+
+
+class _SerializedMongo:
+    """
+    A mongomock client, database or collection whose calls all hold one lock.
+    mongomock isn't thread-safe and the candidate tools do their Mongo work on
+    worker threads. Cursors are read out under the lock.
+    """
+
+    def __init__(self, target, lock):
+        self._target = target
+        self._lock = lock
+
+    def _wrap(self, value):
+        from mongomock import Collection, Database
+        from mongomock.collection import Cursor
+        from mongomock.command_cursor import CommandCursor
+
+        if isinstance(value, (Database, Collection)):
+            return _SerializedMongo(value, self._lock)
+        if isinstance(value, (Cursor, CommandCursor)):
+            return iter(list(value))
+        return value
+
+    def __getitem__(self, name):
+        with self._lock:
+            return self._wrap(self._target[name])
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if not callable(attr) or isinstance(attr, _SerializedMongo):
+            return self._wrap(attr)
+
+        def call(*args, **kwargs):
+            with self._lock:
+                return self._wrap(attr(*args, **kwargs))
+        return call
+
+
+# ==============================================================================
+# Scenarios
+# ==============================================================================
+@dataclass
+class Scenario:
+    """A scripted conversation to replay against one agent."""
+    name: str
+    load_agent: Callable[[], Any]
+    turns: List[List[ScriptStep]]
+    # Builds the user messages for session `i`; one message per entry in `turns`
+    user_messages: Callable[[int], List[types.Content]]
+    initial_state: Dict[str, Any] = field(default_factory=dict)
+    patches: Callable[[], contextlib.AbstractContextManager] = contextlib.nullcontext
+
+
+def _user_text(text: str) -> types.Content:
+    return types.Content(role="user", parts=[types.Part(text=text)])
+
+
+# Tokens shaped like the ones read_calendar/get_exchange_rate cache in state.
+# The far-off expiry keeps them valid, so the tools skip the OAuth flow.
+_CACHED_TOKENS = {
+    "token": "offline-access-token",
+    "expiry": "2999-01-01T00:00:00Z",
+    "refresh_token": "offline-refresh-token",
+    "client_id": "offline-client-id",
+    "client_secret": "offline-client-secret",
+}
+
+
+def _load_calendar_agent():
+    from googletoolset import agent
+    return agent.root_agent
+
+
+def _load_sheet_agent():
+    from googletoolset import new_agent
+    # The callback is disabled on the module's agent; enable it so its cost shows up
+    return new_agent.root_agent.model_copy(
+        update={"before_model_callback": [new_agent.simple_before_model_modifier, new_agent.request_profiler.before_model]}
+    )
+
+
+def _load_currency_agent():
+    from journey2 import agent
+    return agent.root_agent
+
+
+def _load_drive_agent():
+    from medium import agent
+    return agent.root_agent
+
+
+def _load_workspace_agent():
+    from testagent import agent
+    return agent.root_agent
+
+
+def _candidate_tool_patches():
+    if os.getenv("MONGO_URI"):
+        return contextlib.nullcontext()
+    return mock.patch("testagent.custom_read_tools._get_mongo_client", _offline_mongo_client)
+
+
+@functools.lru_cache(maxsize=None)
+def _sample_sheet_xlsx(rows: int = 50) -> bytes:
+    frame = pd.DataFrame(_sample_candidate_rows(0, rows))
+    buffer = io.BytesIO()
+    frame.to_excel(buffer, index=False, engine="openpyxl")
+    return buffer.getvalue()
+
+
+def _sample_candidate_rows(session_index: int, rows: int) -> List[Dict[str, str]]:
+    roles = ["Software Engineer", "Human Resources Executive"]
+    return [
+        {
+            "First Name": f"First{i}",
+            "Last Name": f"Last{i}",
+            "Email": f"candidate{session_index}.{i}@example.com",
+            "Gender": "Male" if i % 2 else "Female",
+            "Role": roles[i % 2],
+        }
+        for i in range(rows)
+    ]
+
+
+def _sheet_from_prompt(user_text: str) -> Dict[str, str]:
+    # "... from sheet cohort-<n>" -> a file ID unique to session n; the fake server makes up its rows
+    return {"user_google_email": "hr@example.com", "file_id": user_text.rsplit(" ", 1)[-1]}
+
+
+SCENARIOS = {
+    "googletoolset": Scenario(
+        name="googletoolset",
+        load_agent=_load_calendar_agent,
+        turns=[[call("read_calendar", {"calendar_id": "primary"}), reply("Here are your events.")]],
+        user_messages=lambda i: [_user_text("list the first 5 events in my google calendar")],
+        initial_state={"calendar_tool_tokens": _CACHED_TOKENS},
+    ),
+    "googletoolset.new_agent": Scenario(
+        name="googletoolset.new_agent",
+        load_agent=_load_sheet_agent,
+        turns=[[reply("The sheet has 50 candidates.")]],
+        user_messages=lambda i: [types.Content(role="user", parts=[
+            types.Part(text="How many candidates are in this sheet?"),
+            types.Part.from_bytes(
+                data=_sample_sheet_xlsx(),
+                mime_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            ),
+        ])],
+    ),
+    "journey2": Scenario(
+        name="journey2",
+        load_agent=_load_currency_agent,
+        turns=[[
+            call("get_exchange_rate", {"currency_from": "USD", "currency_to": "INR"}),
+            reply("1 USD is 83.12 INR, invoked by loadtest@example.com."),
+        ]],
+        user_messages=lambda i: [_user_text("Convert USD to INR")],
+        initial_state={"exchange_tool_tokens": _CACHED_TOKENS},
+    ),
+    "medium": Scenario(
+        name="medium",
+        load_agent=_load_drive_agent,
+        turns=[[reply("I was created with the Google Agent Framework.")]],
+        user_messages=lambda i: [_user_text("How were you created?")],
+    ),
+    "testagent": Scenario(
+        name="testagent",
+        load_agent=_load_workspace_agent,
+        turns=[
+            [
+                call("find_drive_file", {"user_google_email": "hr@example.com", "name": "cohort"}),
+                call("search_drive", {"user_google_email": "hr@example.com", "query": "cohort"}),
+                call("ingest_candidates_from_sheet", _sheet_from_prompt),
+                reply("Candidates saved."),
+            ],
+            [
+                call("generate_onboarding_email"),
+                call("send_gmail_message", {
+                    "user_google_email": "hr@example.com",
+                    "to": "candidate@example.com",
+                    "subject": "Welcome to NextLeap",
+                    "content": "Onboarding details",
+                }),
+                call("record_onboarding_email_results", {"results": []}),
+                reply("All onboarding emails have been sent successfully."),
+            ],
+        ],
+        user_messages=lambda i: [
+            _user_text(f"Start onboarding for candidates from sheet cohort-{i}"),
+            _user_text("Send onboarding emails to candidates"),
+        ],
+        patches=_candidate_tool_patches,
+    ),
+}
+
+
+# ==============================================================================
+# Runner
+# ==============================================================================
+async def run_scenario(
+    scenario: Scenario,
+    sessions: int,
+    concurrency: int,
+    model_latency_seconds: float,
+) -> Dict[str, Any]:
+    """Runs `sessions` scripted conversations, at most `concurrency` at a time."""
+    recorder = LatencyRecorder()
+    stub = StubLlm(model="stub-llm", turns=scenario.turns, latency_seconds=model_latency_seconds)
+    agent = scenario.load_agent().model_copy(update={"model": stub})
+    time_agent_callbacks(agent, recorder)
+
+    app_name = f"loadtest_{scenario.name.replace('.', '_')}"
+    session_service = InMemorySessionService()
+    runner = Runner(
+        agent=agent,
+        app_name=app_name,
+        session_service=session_service,
+        plugins=[ToolTimingPlugin(recorder)],
+    )
+    semaphore = asyncio.Semaphore(concurrency)
+    errors: List[str] = []
+
+    async def run_session(index: int):
+        async with semaphore:
+            user_id = f"user{index}"
+            session = await session_service.create_session(
+                app_name=app_name, user_id=user_id, state=dict(scenario.initial_state)
+            )
+            for message in scenario.user_messages(index):
+                started = time.perf_counter()
+                async for event in runner.run_async(
+                    user_id=user_id, session_id=session.id, new_message=message
+                ):
+                    if event.error_message:
+                        errors.append(event.error_message)
+                recorder.record("turn", scenario.name, time.perf_counter() - started)
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    # The repo's tools and callbacks print freely; keep that cost but not the noise
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = await asyncio.gather(*(run_session(i) for i in range(sessions)), return_exceptions=True)
+    elapsed = time.perf_counter() - started
+    _, peak_traced = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    await runner.close()
+    sheet_reader = sys.modules.get("testagent.sheet_reader")
+    if sheet_reader is not None:
+        # The in-tool sheet reads keep a Workspace MCP session of their own
+        await sheet_reader.close_workspace_reader()
+
+    errors.extend(f"{type(r).__name__}: {r}" for r in results if isinstance(r, BaseException))
+    turns = sum(len(scenario.turns) for _ in range(sessions))
+    return {
+        "scenario": scenario.name,
+        "sessions": sessions,
+        "concurrency": concurrency,
+        "elapsed_s": elapsed,
+        "sessions_per_s": sessions / elapsed,
+        "turns_per_s": turns / elapsed,
+        "peak_traced_mb": peak_traced / 2**20,
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "latencies": recorder.summary(),
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    print(f"\n=== {report['scenario']} ===")
+    if report.get("skipped"):
+        print(f"  skipped: {report['skipped']}")
+        return
+    print(
+        f"  {report['sessions']} sessions @ concurrency {report['concurrency']}: "
+        f"{report['elapsed_s']:.2f}s, {report['sessions_per_s']:.1f} sessions/s, "
+        f"{report['turns_per_s']:.1f} turns/s, peak traced memory {report['peak_traced_mb']:.1f} MB"
+    )
+    if report["errors"]:
+        print(f"  errors: {report['errors']} (first: {report['first_error']})")
+    print(f"  {'kind':<10} {'name':<55} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for row in report["latencies"]:
+        print(
+            f"  {row['kind']:<10} {row['name']:<55} {row['count']:>6} "
+            f"{row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f}"
+        )
+
+
+async def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--agents", nargs="*", default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=25)
+    parser.add_argument("--model-latency-ms", type=float, default=0.0,
+                        help="Simulated model latency per call, to see tool/callback cost in context.")
+    parser.add_argument("--json", help="Also write the reports to this JSON file.")
+    args = parser.parse_args(argv)
+
+    reports = []
+    for name in args.agents:
+        scenario = SCENARIOS[name]
+        with offline_environment():
+            try:
+                with scenario.patches():
+                    report = await run_scenario(
+                        scenario, args.sessions, args.concurrency, args.model_latency_ms / 1000
+                    )
+            except Exception as e:
+                # An agent that cannot even be built offline is reported, not fatal
+                report = {"scenario": name, "skipped": f"{type(e).__name__}: {e}"}
+        print_report(report)
+        reports.append(report)
+
+    peak_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    peak_rss_mb = peak_rss_kb / 2**20 if sys.platform == "darwin" else peak_rss_kb / 2**10
+    print(f"\nPeak RSS for the whole run: {peak_rss_mb:.1f} MB")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"peak_rss_mb": peak_rss_mb, "reports": reports}, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
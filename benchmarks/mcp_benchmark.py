@@ -0,0 +1,259 @@
+"""
+MCP overhead benchmark against the bundled fake Workspace MCP server.
+
+Measures, for each response size:
+  * serialization: JSON-RPC encode/decode cost of a read_file result
+  * call overhead: read_file over stdio / streamable HTTP vs the same coroutine in-process
+  * concurrency: throughput of one MCP client session at increasing concurrency
+  * toolset: concurrent Runner sessions sharing one MCPToolset, tool time per call
+
+Usage:
+    python -m benchmarks.mcp_benchmark
+    python -m benchmarks.mcp_benchmark --transports stdio --rows 10 5000 --latency-ms 20 --json mcp.json
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from google.adk.agents import LlmAgent
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.adk.tools.mcp_tool.mcp_session_manager import MCPSessionManager
+from google.adk.tools.mcp_tool.mcp_toolset import (
+    MCPToolset,
+    StdioConnectionParams,
+    StreamableHTTPConnectionParams,
+)
+from google.genai import types
+from mcp import types as mcp_types
+from mcp.client.stdio import StdioServerParameters
+
+from .load_test import LatencyRecorder, ToolTimingPlugin, _percentile
+from .stub_llm import StubLlm, call, reply
+
+FAKE_SERVER_SCRIPT = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "testagent", "fake_workspace_mcp.py"
+)
+READ_FILE_ARGS = {"user_google_email": "bench@example.com", "file_id": "benchmark-sheet"}
+
+
+def _load_fake_server():
+    # Loaded by path so the benchmark does not import the testagent package itself
+    import importlib.util
+    spec = importlib.util.spec_from_file_location("fake_workspace_mcp", FAKE_SERVER_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _stats(samples: List[float]) -> Dict[str, float]:
+    samples = sorted(samples)
+    return {
+        "p50_ms": _percentile(samples, 50) * 1000,
+        "p95_ms": _percentile(samples, 95) * 1000,
+        "p99_ms": _percentile(samples, 99) * 1000,
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextlib.asynccontextmanager
+async def fake_server(transport: str, rows: int, latency_ms: float):
+    """Starts the fake server and yields connection params for MCPToolset."""
+    env = {"FAKE_MCP_SHEET_ROWS": str(rows), "FAKE_MCP_LATENCY_MS": str(latency_ms)}
+    if transport == "stdio":
+        yield StdioConnectionParams(
+            server_params=StdioServerParameters(command=sys.executable, args=[FAKE_SERVER_SCRIPT], env=env),
+            timeout=30,
+        )
+        return
+
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, FAKE_SERVER_SCRIPT, "--transport", "http", "--port", str(port)],
+        env={**os.environ, **env},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        # Wait for the HTTP server to accept connections
+        deadline = time.monotonic() + 30
+        while True:
+            with contextlib.suppress(OSError), socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                break
+            if time.monotonic() > deadline:
+                raise RuntimeError("Fake MCP HTTP server did not start.")
+            await asyncio.sleep(0.1)
+        yield StreamableHTTPConnectionParams(url=f"http://127.0.0.1:{port}/mcp", timeout=30)
+    finally:
+        process.terminate()
+        process.wait()
+
+
+async def bench_serialization(fake, rows: int, iterations: int) -> Dict[str, Any]:
+    fake.settings.update(sheet_rows=rows, latency_seconds=0)
+    payload = await fake.read_file(**READ_FILE_ARGS)
+    message = mcp_types.JSONRPCResponse(
+        jsonrpc="2.0",
+        id=1,
+        result=mcp_types.CallToolResult(content=[mcp_types.TextContent(type="text", text=payload)]).model_dump(),
+    )
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        encoded = message.model_dump_json(by_alias=True, exclude_none=True)
+    encode_s = (time.perf_counter() - started) / iterations
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        decoded = mcp_types.JSONRPCMessage.model_validate_json(encoded)
+        mcp_types.CallToolResult.model_validate(decoded.root.result)
+    decode_s = (time.perf_counter() - started) / iterations
+
+    return {
+        "rows": rows,
+        "payload_bytes": len(payload.encode()),
+        "wire_bytes": len(encoded.encode()),
+        "encode_us": encode_s * 1e6,
+        "decode_us": decode_s * 1e6,
+    }
+
+
+async def bench_direct(fake, rows: int, calls: int, latency_ms: float) -> Dict[str, float]:
+    fake.settings.update(sheet_rows=rows, latency_seconds=latency_ms / 1000)
+    samples = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        await fake.read_file(**READ_FILE_ARGS)
+        samples.append(time.perf_counter() - started)
+    return _stats(samples)
+
+
+async def bench_session(connection_params, calls: int, concurrency_levels: List[int]) -> Dict[str, Any]:
+    """Sequential latency and concurrent throughput over one MCP client session."""
+    manager = MCPSessionManager(connection_params)
+    try:
+        session = await manager.create_session()
+        await session.call_tool("read_file", READ_FILE_ARGS)  # warm up
+
+        samples = []
+        for _ in range(calls):
+            started = time.perf_counter()
+            await session.call_tool("read_file", READ_FILE_ARGS)
+            samples.append(time.perf_counter() - started)
+
+        throughput = {}
+        for concurrency in concurrency_levels:
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def one_call():
+                async with semaphore:
+                    await session.call_tool("read_file", READ_FILE_ARGS)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(one_call() for _ in range(calls)))
+            throughput[concurrency] = calls / (time.perf_counter() - started)
+
+        return {"sequential": _stats(samples), "calls_per_s_by_concurrency": throughput}
+    finally:
+        await manager.close()
+
+
+async def bench_toolset(connection_params, sessions: int, concurrency: int) -> Dict[str, Any]:
+    """Concurrent Runner sessions sharing one MCPToolset, each calling read_file once."""
+    recorder = LatencyRecorder()
+    toolset = MCPToolset(connection_params=connection_params, tool_filter=["read_file"])
+    agent = LlmAgent(
+        name="mcp_benchmark_agent",
+        model=StubLlm(model="stub-llm", turns=[[call("read_file", READ_FILE_ARGS), reply("done")]]),
+        tools=[toolset],
+    )
+    session_service = InMemorySessionService()
+    runner = Runner(
+        agent=agent, app_name="mcp_benchmark", session_service=session_service,
+        plugins=[ToolTimingPlugin(recorder)],
+    )
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_session(index: int):
+        async with semaphore:
+            session = await session_service.create_session(app_name="mcp_benchmark", user_id=f"user{index}")
+            message = types.Content(role="user", parts=[types.Part(text="read the sheet")])
+            async for _ in runner.run_async(user_id=f"user{index}", session_id=session.id, new_message=message):
+                pass
+
+    try:
+        started = time.perf_counter()
+        await asyncio.gather(*(run_session(i) for i in range(sessions)))
+        elapsed = time.perf_counter() - started
+    finally:
+        await runner.close()
+        await toolset.close()
+
+    tool_samples = recorder.samples.get(("tool", "read_file"), [0.0])
+    return {"sessions_per_s": sessions / elapsed, "tool": _stats(tool_samples)}
+
+
+async def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transports", nargs="*", default=["stdio", "http"], choices=["stdio", "http"])
+    parser.add_argument("--rows", nargs="*", type=int, default=[10, 1000, 20000],
+                        help="Sheet sizes returned by read_file.")
+    parser.add_argument("--calls", type=int, default=100)
+    parser.add_argument("--concurrency", nargs="*", type=int, default=[1, 8, 32])
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Latency injected by the fake server.")
+    parser.add_argument("--json", help="Also write the results to this JSON file.")
+    args = parser.parse_args(argv)
+
+    fake = _load_fake_server()
+    results: Dict[str, Any] = {"serialization": [], "transports": []}
+
+    print(f"{'rows':>7} {'payload KB':>11} {'wire KB':>9} {'encode us':>10} {'decode us':>10}")
+    for rows in args.rows:
+        row = await bench_serialization(fake, rows, iterations=max(10, 20000 // max(rows, 1)))
+        results["serialization"].append(row)
+        print(f"{rows:>7} {row['payload_bytes'] / 1024:>11.1f} {row['wire_bytes'] / 1024:>9.1f} "
+              f"{row['encode_us']:>10.1f} {row['decode_us']:>10.1f}")
+
+    for transport in args.transports:
+        for rows in args.rows:
+            direct = await bench_direct(fake, rows, args.calls, args.latency_ms)
+            async with fake_server(transport, rows, args.latency_ms) as params:
+                session = await bench_session(params, args.calls, args.concurrency)
+            async with fake_server(transport, rows, args.latency_ms) as params:
+                toolset = await bench_toolset(params, args.calls, max(args.concurrency))
+
+            overhead_ms = session["sequential"]["p50_ms"] - direct["p50_ms"]
+            results["transports"].append({
+                "transport": transport, "rows": rows, "direct": direct,
+                "session": session, "toolset": toolset, "overhead_p50_ms": overhead_ms,
+            })
+            throughput = ", ".join(
+                f"c={c}: {v:.0f}/s" for c, v in session["calls_per_s_by_concurrency"].items()
+            )
+            print(f"\n[{transport}] rows={rows}")
+            print(f"  in-process   p50 {direct['p50_ms']:.2f} ms")
+            print(f"  mcp session  p50 {session['sequential']['p50_ms']:.2f} ms, "
+                  f"p99 {session['sequential']['p99_ms']:.2f} ms (overhead {overhead_ms:.2f} ms)")
+            print(f"  mcp session  throughput {throughput}")
+            print(f"  MCPToolset   {toolset['sessions_per_s']:.1f} sessions/s, tool p50 "
+                  f"{toolset['tool']['p50_ms']:.2f} ms, p99 {toolset['tool']['p99_ms']:.2f} ms")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
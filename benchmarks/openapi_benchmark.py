@@ -0,0 +1,117 @@
+"""
+OpenAPI toolset startup benchmark, `OpenAPIToolset` vs the compiled cache in
+`shared/openapi_toolset_cache.py`.
+
+Uses the bundled CRM-style spec (benchmarks/fixtures/crm_openapi.json, 50
+resources, 300 operations, shared `$ref` schemas and OAuth2 security) unless
+--spec is given. Measures, as the median over --repeats:
+  * construct: building the toolset from the spec text
+  * declarations: building every tool's function declaration, as ADK does when it assembles a model request
+  * first call: materializing one tool's RestApiTool from the cache, and the
+    per-tool declaration
+
+Usage:
+    python -m benchmarks.openapi_benchmark
+    python -m benchmarks.openapi_benchmark --spec my_api.yaml --repeats 10 --json openapi.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from google.adk.tools.openapi_tool import OpenAPIToolset
+
+from shared.openapi_toolset_cache import CachedOpenAPIToolset
+
+DEFAULT_SPEC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "crm_openapi.json")
+
+
+def _timed(fn, repeats: int) -> Dict[str, Any]:
+    samples, result = [], None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - started)
+    return {"ms": statistics.median(samples) * 1000, "result": result}
+
+
+def _tools(toolset):
+    return asyncio.run(toolset.get_tools())
+
+
+def _declarations(tools) -> int:
+    return sum(len(tool._get_declaration().model_dump_json(exclude_none=True)) for tool in tools)
+
+
+def run(spec_str: str, spec_str_type: str, repeats: int, cache_dir: str) -> Dict[str, Any]:
+    results: Dict[str, Any] = {"spec_bytes": len(spec_str.encode())}
+
+    def uncached():
+        return OpenAPIToolset(spec_str=spec_str, spec_str_type=spec_str_type)
+
+    def cached():
+        return CachedOpenAPIToolset(spec_str=spec_str, spec_str_type=spec_str_type, cache_dir=cache_dir)
+
+    construct = _timed(uncached, repeats)
+    tools = _tools(construct["result"])
+    results["tools"] = len(tools)
+    results["openapi_toolset"] = {
+        "construct_ms": construct["ms"],
+        # RestApiTool rebuilds its declaration on every request, so every repeat is cold
+        "declarations_ms": _timed(lambda: _declarations(tools), repeats)["ms"],
+    }
+
+    started = time.perf_counter()
+    compiled = cached()
+    assert not compiled.cache_hit
+    results["compile_ms"] = (time.perf_counter() - started) * 1000
+    results["compiled_bytes"] = os.path.getsize(compiled._compiled_path())
+
+    construct = _timed(cached, repeats)
+    assert construct["result"].cache_hit
+    # Declarations are decoded on first use and kept, so time a fresh toolset each repeat
+    first = _timed(lambda: _declarations(_tools(cached())), repeats)["ms"] - construct["ms"]
+    warm_tools = _tools(construct["result"])
+    _declarations(warm_tools)
+    results["cached_toolset"] = {
+        "construct_ms": construct["ms"],
+        "declarations_first_ms": first,
+        "declarations_ms": _timed(lambda: _declarations(warm_tools), repeats)["ms"],
+        "materialize_one_tool_ms": _timed(lambda: _tools(cached())[0].rest_api_tool, repeats)["ms"] - construct["ms"],
+    }
+    return results
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--spec", default=DEFAULT_SPEC, help="OpenAPI spec, JSON or YAML.")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--json", help="Also write the results to this JSON file.")
+    args = parser.parse_args(argv)
+
+    with open(args.spec, "r") as f:
+        spec_str = f.read()
+    spec_str_type = "yaml" if args.spec.endswith((".yaml", ".yml")) else "json"
+    with tempfile.TemporaryDirectory() as cache_dir:
+        results = run(spec_str, spec_str_type, args.repeats, cache_dir)
+
+    uncached, cached = results["openapi_toolset"], results["cached_toolset"]
+    print(f"spec: {results['spec_bytes'] / 1024:.0f} KB, {results['tools']} tools; "
+          f"compiled once in {results['compile_ms']:.0f} ms to {results['compiled_bytes'] / 1024:.0f} KB")
+    print(f"{'':<16} {'construct ms':>13} {'declarations ms':>16}")
+    print(f"{'OpenAPIToolset':<16} {uncached['construct_ms']:>13.1f} {uncached['declarations_ms']:>16.1f}")
+    print(f"{'cached':<16} {cached['construct_ms']:>13.1f} {cached['declarations_ms']:>16.1f}"
+          f"   (first use {cached['declarations_first_ms']:.1f} ms)")
+    print(f"materializing one cached tool on its first call: {cached['materialize_one_tool_ms']:.2f} ms")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+"""
+Candidate pipeline benchmark: process_and_save_candidates, then
+generate_onboarding_email and record_onboarding_email_results, at scale.
+
+For each --rows size, builds a synthetic candidate CSV in which
+--invalid-ratio of the rows break a rule and --duplicate-ratio repeat an
+earlier row's email. It ingests the CSV with process_and_save_candidates,
+then drains the outbox with generate_onboarding_email(--email-batch) and
+records every email as sent. Each size runs in a fresh process, so its peak
+RSS is its own. Phases:
+  * parse: splitting the CSV into rows, and the loop around the other phases
+  * validate: the compiled rules in candidate_rules.py
+  * dedupe: looking up each chunk's emails among those already saved
+  * insert: insert_many
+  * claim: the leased claims in generate_onboarding_email
+  * render: building and encoding the email drafts
+  * update: record_onboarding_email_results
+
+Each phase reports seconds, rows/s and Mongo round trips. Runs against the
+mongod at --mongo-uri, or the in-process mongomock stand-in. The tools'
+`nextleap` database is redirected to --database, which is dropped before and
+after each run. Against mongod, round trips come from pymongo's command events
+and include cursor getMores. Against mongomock, each collection call counts as
+one. mongomock scans and sorts the collection for every claim, which makes the
+claim phase quadratic; sizes past a few thousand rows need a real mongod.
+
+Usage:
+    python -m benchmarks.pipeline_benchmark
+    python -m benchmarks.pipeline_benchmark --mongo-uri mongodb://localhost:27017 \\
+        --rows 1000 10000 100000 1000000 --invalid-ratio 0.05 --duplicate-ratio 0.02 --json pipeline.json
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import random
+import subprocess
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from pymongo import monitoring
+
+from shared.serialization import loads
+
+from .artifact_benchmark import _peak_rss_mb
+from .load_test import offline_environment
+
+HEADER = ["First Name", "Last Name", "Email", "Gender", "Role"]
+ROLES = ["Software Engineer", "Human Resources Executive"]
+INGEST_PHASES = ("parse", "validate", "dedupe", "insert")
+EMAIL_PHASES = ("claim", "render", "update")
+
+# The Mongo phase each collection method belongs to in these tools
+METHOD_PHASES = {
+    "find": "dedupe",
+    "insert_many": "insert",
+    "update_many": "dedupe",
+    "create_index": "claim",
+    "find_one_and_update": "claim",
+    "update_one": "update",
+    "find_one": "update",
+    "count_documents": "update",
+}
+# Phases timed by their Mongo calls; the others are timed around the tool calls
+MONGO_PHASES = ("dedupe", "insert", "claim")
+
+
+def synthetic_csv(rows: int, invalid_ratio: float, duplicate_ratio: float, seed: int = 0) -> str:
+    """A candidate CSV with `rows` data rows, some invalid and some repeating an earlier email."""
+    rng = random.Random(seed)
+    invalid = [
+        lambda i: [f"First{i}", f"Last{i}", f"candidate{i}.example.com", "Male", ROLES[0]],  # bad email
+        lambda i: [f"First{i}", f"Last{i}", f"candidate{i}@example.com", "Unknown", ROLES[0]],  # bad gender
+        lambda i: [f"First{i}", f"Last{i}", f"candidate{i}@example.com", "Female", ""],  # no role
+        lambda i: [f"First{i}", f"Last{i}", f"candidate{i}@example.com", "Female"],  # short row
+    ]
+    lines = [",".join(HEADER)]
+    for i in range(rows):
+        draw = rng.random()
+        if draw < invalid_ratio:
+            values = invalid[i % len(invalid)](i)
+        else:
+            email = f"candidate{i}@example.com"
+            if i and draw < invalid_ratio + duplicate_ratio:
+                email = f"candidate{rng.randrange(i)}@example.com"
+            values = [f"First{i}", f"Last{i}", email, "Female" if i % 2 else "Male", ROLES[i % len(ROLES)]]
+        lines.append(",".join(values))
+    return "\n".join(lines)
+
+
+class Phases:
+    """Seconds and Mongo round trips per phase."""
+
+    def __init__(self, count_calls: bool):
+        self.seconds: Counter = Counter()
+        self.round_trips: Counter = Counter()
+        self.mongo_phase = "connect"
+        self.count_calls = count_calls
+
+    def timed(self, phase: str, fn):
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.seconds[phase] += time.perf_counter() - started
+        return wrapper
+
+
+class _CommandCounter(monitoring.CommandListener):
+    def __init__(self, phases: Phases):
+        self.phases = phases
+
+    def started(self, event):
+        self.phases.round_trips[self.phases.mongo_phase] += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+class _TimedCursor:
+    def __init__(self, cursor, phase: str, phases: Phases):
+        self._cursor, self._phase, self._phases = cursor, phase, phases
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        self._phases.mongo_phase = self._phase
+        return self._phases.timed(self._phase, self._cursor.__next__)()
+
+
+class _TimedCollection:
+    def __init__(self, coll, phases: Phases):
+        self._coll, self._phases = coll, phases
+
+    def __getattr__(self, name):
+        attr = getattr(self._coll, name)
+        if not callable(attr):
+            return attr
+        phase = METHOD_PHASES.get(name, "other")
+
+        def call(*args, **kwargs):
+            self._phases.mongo_phase = phase
+            if self._phases.count_calls:
+                self._phases.round_trips[phase] += 1
+            if phase not in MONGO_PHASES:
+                return attr(*args, **kwargs)
+            result = self._phases.timed(phase, attr)(*args, **kwargs)
+            return _TimedCursor(result, phase, self._phases) if name == "find" else result
+        return call
+
+
+class _BenchmarkClient:
+    """What the tools get from _get_mongo_client: `nextleap` is redirected and every call is timed."""
+
+    def __init__(self, client, database: str, phases: Phases):
+        self._client, self._database, self._phases = client, database, phases
+
+    def server_info(self):
+        self._phases.mongo_phase = "connect"
+        if self._phases.count_calls:
+            self._phases.round_trips["connect"] += 1
+        return self._client.server_info()
+
+    def close(self):
+        # One client for the whole run, like a connection pool
+        pass
+
+    def __getitem__(self, name):
+        db = self._client[self._database]
+        return {"candidates": _TimedCollection(db["candidates"], self._phases)}
+
+
+def _open_client(mongo_uri: Optional[str], phases: Phases):
+    if mongo_uri:
+        from pymongo import MongoClient
+        return MongoClient(mongo_uri, serverSelectionTimeoutMS=5000, event_listeners=[_CommandCounter(phases)])
+    import mongomock
+    return mongomock.MongoClient()
+
+
+def run(rows: int, args) -> Dict[str, Any]:
+    from unittest import mock
+
+    with offline_environment():
+        from testagent import custom_read_tools
+
+    csv = synthetic_csv(rows, args.invalid_ratio, args.duplicate_ratio)
+    phases = Phases(count_calls=not args.mongo_uri)
+    raw_client = _open_client(args.mongo_uri, phases)
+    raw_client.drop_database(args.database)
+    client = _BenchmarkClient(raw_client, args.database, phases)
+    compile_rules = custom_read_tools.compile_rules
+
+    def timed_compile_rules(header, schema=None):
+        return phases.timed("validate", compile_rules(header, schema))
+
+    baseline_rss = _peak_rss_mb()
+    try:
+        with mock.patch.object(custom_read_tools, "_get_mongo_client", lambda: client), \
+                mock.patch.object(custom_read_tools, "compile_rules", timed_compile_rules):
+            started = time.perf_counter()
+            ingest = loads(custom_read_tools.process_and_save_candidates(csv))
+            ingest_seconds = time.perf_counter() - started
+            if ingest["status"] == "error":
+                raise RuntimeError(ingest["message"])
+            phases.seconds["parse"] = ingest_seconds - sum(phases.seconds[p] for p in INGEST_PHASES[1:])
+
+            emails = 0
+            started = time.perf_counter()
+            while True:
+                claimed = phases.seconds["claim"]
+                batch_started = time.perf_counter()
+                drafts = loads(asyncio.run(custom_read_tools.generate_onboarding_email(batch_size=args.email_batch)))
+                phases.seconds["render"] += time.perf_counter() - batch_started - (phases.seconds["claim"] - claimed)
+                if drafts["status"] != "success":
+                    break
+                phases.timed("update", asyncio.run)(custom_read_tools.record_onboarding_email_results([
+                    {"candidate_id": d["candidate_id"], "claim_token": d["claim_token"], "sent": True,
+                     "message_id": f"msg-{d['candidate_id']}"}
+                    for d in drafts["emails"]
+                ]))
+                emails += len(drafts["emails"])
+            email_seconds = time.perf_counter() - started
+    finally:
+        raw_client.drop_database(args.database)
+        raw_client.close()
+
+    valid = ingest["accepted"] + ingest["rejections_by_rule"].get("email_exists", 0)
+    processed = {"parse": rows, "validate": rows, "dedupe": valid, "insert": ingest["accepted"]}
+    processed.update({p: emails for p in EMAIL_PHASES})
+    return {
+        "rows": rows,
+        "accepted": ingest["accepted"],
+        "rejected": ingest["rejected"],
+        "rejections_by_rule": ingest["rejections_by_rule"],
+        "emails": emails,
+        "ingest_seconds": ingest_seconds,
+        "email_seconds": email_seconds,
+        "peak_rss_mb": _peak_rss_mb(),
+        "rss_growth_mb": _peak_rss_mb() - baseline_rss,
+        "phases": {
+            p: {
+                "seconds": phases.seconds[p],
+                "rows_per_second": processed[p] / phases.seconds[p] if phases.seconds[p] > 0 else None,
+                "round_trips": phases.round_trips[p],
+            }
+            for p in INGEST_PHASES + EMAIL_PHASES
+        },
+        "other_round_trips": {p: n for p, n in phases.round_trips.items() if p not in INGEST_PHASES + EMAIL_PHASES},
+    }
+
+
+def _run_in_child(queue, rows: int, args):
+    queue.put(run(rows, args))
+
+
+def run_isolated(rows: int, args) -> Dict[str, Any]:
+    """Runs one size in a fresh interpreter so RSS numbers don't bleed."""
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    process = ctx.Process(target=_run_in_child, args=(queue, rows, args))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def _revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", nargs="+", type=int, default=[1000])
+    parser.add_argument("--invalid-ratio", type=float, default=0.05)
+    parser.add_argument("--duplicate-ratio", type=float, default=0.02)
+    parser.add_argument("--email-batch", type=int, default=500, help="batch_size per generate_onboarding_email call.")
+    parser.add_argument("--mongo-uri", help="A mongod to run against; defaults to the in-process mongomock.")
+    parser.add_argument("--database", default="nextleap_pipeline_benchmark", help="Dropped before and after each run.")
+    parser.add_argument("--json", help="Also write the results to this file.")
+    args = parser.parse_args(argv)
+
+    results = []
+    for rows in args.rows:
+        r = run_isolated(rows, args)
+        results.append(r)
+        print(f"\n{r['rows']:,} rows: {r['accepted']:,} accepted, {r['rejected']:,} rejected, "
+              f"{r['emails']:,} emails, peak RSS {r['peak_rss_mb']:.0f} MB")
+        print(f"  {'phase':<9} {'seconds':>9} {'rows/s':>11} {'round trips':>12}")
+        for name, p in r["phases"].items():
+            rate = f"{p['rows_per_second']:,.0f}" if p["rows_per_second"] else "-"
+            print(f"  {name:<9} {p['seconds']:>9.3f} {rate:>11} {p['round_trips']:>12,}")
+
+    report = {
+        "revision": _revision(),
+        "backend": "mongod" if args.mongo_uri else "mongomock",
+        "config": vars(args),
+        "results": results,
+    }
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main()
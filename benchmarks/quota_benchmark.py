@@ -0,0 +1,188 @@
+"""
+Quota scheduler benchmark, `shared/quota_scheduler.py` vs sending blindly.
+
+An in-process fake API enforces a real quota: a project-wide token bucket
+and one per user. Requests over it get a 429, with a Retry-After header when
+--retry-after is set. Against it, --users users each send a bulk run of
+--bulk requests (onboarding emails) with --concurrency in flight per user,
+while interactive requests arrive at --interactive-rate per second. Modes:
+  * blind: send at once, and on a 429 back off exponentially with jitter
+  * scheduled: through QuotaScheduler configured with the true quota
+  * overestimated: through QuotaScheduler configured at twice the true
+    quota, so only the adaptive rate keeps it under
+
+Reports throughput against the quota ceiling, 429s, requests that gave up,
+and interactive latency.
+
+Usage:
+    python -m benchmarks.quota_benchmark
+    python -m benchmarks.quota_benchmark --users 20 --bulk 50 --project-rate 100 --retry-after --json quota.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+from shared.quota_scheduler import (
+    BACKOFF_BASE_SECONDS,
+    BACKOFF_MAX_SECONDS,
+    BULK,
+    INTERACTIVE,
+    MAX_RETRIES,
+    Quota,
+    QuotaScheduler,
+    TokenBucket,
+)
+
+from .load_test import _percentile
+
+API = "gmail"
+
+
+class FakeResponse:
+    """Just enough of requests.Response for the scheduler's throttle detection."""
+
+    def __init__(self, status_code: int, headers: Optional[Dict[str, str]] = None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.text = '{"error": {"errors": [{"reason": "rateLimitExceeded"}]}}' if status_code == 429 else "{}"
+
+
+class FakeQuotaApi:
+    """Answers 429 once a project or user bucket is empty. Buckets here never adapt."""
+
+    def __init__(self, quota: Quota, latency_ms: float, retry_after: bool):
+        self.quota = quota
+        self.latency = latency_ms / 1000
+        self.retry_after = retry_after
+        self._project = TokenBucket(quota.per_project, time.monotonic())
+        self._users: Dict[str, TokenBucket] = {}
+        self.ok = 0
+        self.throttled = 0
+
+    async def request(self, user: str) -> FakeResponse:
+        await asyncio.sleep(self.latency)
+        now = time.monotonic()
+        user_bucket = self._users.setdefault(user, TokenBucket(self.quota.per_user, now))
+        wait = max(self._project.delay(now, 1.0), user_bucket.delay(now, 1.0))
+        if wait > 0:
+            self.throttled += 1
+            return FakeResponse(429, {"Retry-After": f"{wait:.3f}"} if self.retry_after else {})
+        self._project.take(now)
+        user_bucket.take(now)
+        self.ok += 1
+        return FakeResponse(200)
+
+
+async def _blind(api: FakeQuotaApi, user: str) -> FakeResponse:
+    for attempt in range(MAX_RETRIES + 1):
+        response = await api.request(user)
+        if response.status_code != 429 or attempt == MAX_RETRIES:
+            return response
+        retry_after = response.headers.get("Retry-After")
+        await asyncio.sleep(
+            float(retry_after) if retry_after
+            else min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt) * random.uniform(0.5, 1.0)
+        )
+
+
+async def run(mode: str, args) -> Dict[str, Any]:
+    quota = Quota(per_project=args.project_rate, per_user=args.user_rate)
+    api = FakeQuotaApi(quota, args.latency_ms, args.retry_after)
+    scheduler = None
+    if mode != "blind":
+        factor = 2.0 if mode == "overestimated" else 1.0
+        scheduler = QuotaScheduler({API: Quota(quota.per_project * factor, quota.per_user * factor)})
+
+    async def send(user: str, priority: int) -> FakeResponse:
+        if scheduler is None:
+            return await _blind(api, user)
+        return await scheduler.run(API, user, api.request, user, priority=priority)
+
+    failed = 0
+    interactive_latency: List[float] = []
+
+    async def bulk_user(user: str):
+        nonlocal failed
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def one():
+            nonlocal failed
+            async with semaphore:
+                if (await send(user, BULK)).status_code == 429:
+                    failed += 1
+
+        await asyncio.gather(*(one() for _ in range(args.bulk)))
+
+    async def interactive(stop: asyncio.Event):
+        tasks = []
+
+        async def one(user: str):
+            nonlocal failed
+            started = time.perf_counter()
+            if (await send(user, INTERACTIVE)).status_code == 429:
+                failed += 1
+            interactive_latency.append(time.perf_counter() - started)
+
+        while not stop.is_set():
+            tasks.append(asyncio.create_task(one(f"user{random.randrange(args.users)}")))
+            await asyncio.sleep(random.expovariate(args.interactive_rate))
+        await asyncio.gather(*tasks)
+
+    random.seed(0)
+    stop = asyncio.Event()
+    started = time.perf_counter()
+    interactive_task = asyncio.create_task(interactive(stop))
+    await asyncio.gather(*(bulk_user(f"user{i}") for i in range(args.users)))
+    bulk_seconds = time.perf_counter() - started
+    stop.set()
+    await interactive_task
+
+    ceiling = min(quota.per_project, quota.per_user * args.users)
+    latency = sorted(interactive_latency)
+    return {
+        "mode": mode,
+        "bulk_seconds": bulk_seconds,
+        "throughput_rps": api.ok / bulk_seconds,
+        "ceiling_rps": ceiling,
+        "ceiling_percent": 100 * api.ok / bulk_seconds / ceiling,
+        "responses_429": api.throttled,
+        "gave_up": failed,
+        "interactive_requests": len(latency),
+        "interactive_p50_ms": _percentile(latency, 50) * 1000 if latency else 0.0,
+        "interactive_p95_ms": _percentile(latency, 95) * 1000 if latency else 0.0,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--bulk", type=int, default=40, help="Bulk requests per user.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Bulk requests in flight per user.")
+    parser.add_argument("--project-rate", type=float, default=50.0, help="True project quota, requests/s.")
+    parser.add_argument("--user-rate", type=float, default=10.0, help="True per-user quota, requests/s.")
+    parser.add_argument("--interactive-rate", type=float, default=2.0, help="Interactive requests/s.")
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--retry-after", action="store_true", help="Send Retry-After with 429s.")
+    parser.add_argument("--modes", nargs="+", default=["blind", "scheduled", "overestimated"])
+    parser.add_argument("--json", help="Also write the results to this file.")
+    args = parser.parse_args(argv)
+
+    results = [asyncio.run(run(mode, args)) for mode in args.modes]
+    print(f"{'mode':>14} {'bulk s':>7} {'req/s':>7} {'% ceiling':>9} {'429s':>6} {'gave up':>7} {'inter p50':>9} {'inter p95':>9}")
+    for r in results:
+        print(
+            f"{r['mode']:>14} {r['bulk_seconds']:>7.1f} {r['throughput_rps']:>7.1f} {r['ceiling_percent']:>9.0f} "
+            f"{r['responses_429']:>6} {r['gave_up']:>7} {r['interactive_p50_ms']:>9.0f} {r['interactive_p95_ms']:>9.0f}"
+        )
+    report = {"config": vars(args), "results": results}
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Onboarding scheduling benchmark against the fake Calendar endpoint in
+`benchmarks/fake_calendar.py`.
+
+For each cohort size, schedules one session per candidate over a working
+week two ways:
+  * batched: `shared/calendar_scheduling.schedule_sessions`, i.e. freebusy.query
+    for up to 50 calendars per call and batched event inserts
+  * sequential: one freebusy.query per calendar and one events.insert per
+    session, as separate tool calls would make them
+
+and reports API calls, wall time and whether every booked session is free of
+conflicts for all of its attendees.
+
+Usage:
+    python -m benchmarks.scheduling_benchmark
+    python -m benchmarks.scheduling_benchmark --candidates 10 50 200 --latency-ms 100 --json scheduling.json
+"""
+import argparse
+import json
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from shared.calendar_scheduling import (
+    first_slot,
+    merge_intervals,
+    query_free_busy,
+    schedule_sessions,
+    working_windows,
+)
+
+from .fake_calendar import FakeCalendar, FakeCalendarServer
+
+HOSTS = ["hiring.manager@example.com"]
+START_DATE = date(2025, 3, 3)
+END_DATE = START_DATE + timedelta(days=4)
+
+
+def _emails(count: int) -> List[str]:
+    return [f"candidate{i}@example.com" for i in range(count)]
+
+
+def schedule_sequentially(service, candidates: List[str]) -> Dict[str, Any]:
+    """The same schedule as schedule_sessions, one API call per calendar and per event."""
+    windows = working_windows(START_DATE, END_DATE)
+    calendars = ["primary"] + HOSTS + candidates
+    busy = {}
+    for calendar_id in calendars:
+        busy.update(query_free_busy(service, [calendar_id], windows[0][0], windows[-1][1])[0])
+    host_busy = merge_intervals([i for host in ["primary"] + HOSTS for i in busy.get(host, [])])
+    sessions = []
+    for email in candidates:
+        slot = first_slot(merge_intervals(host_busy + busy.get(email, [])), windows, timedelta(minutes=30), timedelta(minutes=30))
+        if slot is None:
+            continue
+        host_busy = merge_intervals(host_busy + [slot])
+        service.events().insert(calendarId="primary", sendUpdates="all", body={
+            "summary": "Onboarding session",
+            "start": {"dateTime": slot[0].isoformat(), "timeZone": "UTC"},
+            "end": {"dateTime": slot[1].isoformat(), "timeZone": "UTC"},
+            "attendees": [{"email": e} for e in HOSTS + [email]],
+        }).execute()
+        sessions.append({"attendees": [email], "start": slot[0].isoformat(), "end": slot[1].isoformat()})
+    return {"sessions": sessions}
+
+
+def _conflicts(calendar: FakeCalendar, sessions: List[Dict[str, Any]]) -> int:
+    """Sessions overlapping a generated meeting of one of their attendees, or each other."""
+    conflicts = 0
+    booked = []
+    for session in sessions:
+        start, end = datetime.fromisoformat(session["start"]), datetime.fromisoformat(session["end"])
+        for email in ["primary"] + HOSTS + session["attendees"]:
+            for m_start, m_end in calendar._meetings(email, start.date()):
+                conflicts += m_start < end and start < m_end
+        conflicts += sum(b_start < end and start < b_end for b_start, b_end in booked)
+        booked.append((start, end))
+    return conflicts
+
+
+def run(candidates: int, mode: str, latency_ms: float) -> Dict[str, Any]:
+    with FakeCalendarServer(latency_ms=latency_ms) as server:
+        service = server.calendar_service()
+        started = time.perf_counter()
+        if mode == "batched":
+            result = schedule_sessions(service, _emails(candidates), START_DATE, END_DATE, host_emails=HOSTS)
+        else:
+            result = schedule_sequentially(service, _emails(candidates))
+        elapsed = time.perf_counter() - started
+        return {
+            "candidates": candidates,
+            "mode": mode,
+            "sessions": len(result["sessions"]),
+            "api_calls": sum(server.calls.values()),
+            "calls_by_endpoint": dict(server.calls),
+            "wall_ms": elapsed * 1000,
+            "conflicts": _conflicts(server.calendar, result["sessions"]),
+        }
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--candidates", type=int, nargs="+", default=[10, 50])
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Delay per HTTP request to the fake endpoint.")
+    parser.add_argument("--json", help="Also write the results to this file.")
+    args = parser.parse_args(argv)
+
+    results = [run(n, mode, args.latency_ms) for n in args.candidates for mode in ("batched", "sequential")]
+    print(f"{'candidates':>10} {'mode':>10} {'sessions':>8} {'api calls':>9} {'wall ms':>9} {'conflicts':>9}")
+    for r in results:
+        print(f"{r['candidates']:>10} {r['mode']:>10} {r['sessions']:>8} {r['api_calls']:>9} {r['wall_ms']:>9.0f} {r['conflicts']:>9}")
+    report = {"latency_ms": args.latency_ms, "results": results}
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main()
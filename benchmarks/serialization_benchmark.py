@@ -0,0 +1,139 @@
+"""
+Serialization benchmark for tool payloads, stdlib json vs `shared/serialization.py`.
+
+On --records candidate records (a fifth with non-ASCII names), measures as
+the median over --repeats:
+  * records: building the records as dicts vs slotted `Candidate`s, with
+    the memory they hold
+  * candidates: encoding the records as json.dumps(indent=2), json.dumps and
+    compact `dumps` of the `Candidate`s
+  * emails: encoding generate_onboarding_email's payload as
+    json.dumps(indent=2), json.dumps and compact `dumps` of `OnboardingEmail`s
+  * decode: json.loads vs `loads` of the compact payload
+  * sheet: DataFrame.to_json(orient="records") indented vs compact, as in
+    convert_xlsx_to_json
+
+Usage:
+    python -m benchmarks.serialization_benchmark
+    python -m benchmarks.serialization_benchmark --records 100000 --repeats 5 --json serialization.json
+"""
+import argparse
+import json
+import statistics
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+
+from shared import serialization
+from shared.serialization import dumps, loads
+
+from .load_test import offline_environment
+
+# Importing testagent builds its agent, so do it with the offline stand-ins
+with offline_environment():
+    from testagent.candidate_model import Candidate
+    from testagent.custom_read_tools import _render_onboarding_email
+
+HEADER = ["First Name", "Last Name", "Email", "Gender", "Role"]
+FIRST_NAMES = ["Asha", "Ben", "Chen", "Dana", "José", "Zoë", "अनिल", "Erik", "Fatima", "Gus"]
+ROLES = ["Software Engineer", "Human Resources Executive", "Designer"]
+
+
+def _rows(count: int) -> List[List[str]]:
+    return [
+        [FIRST_NAMES[i % len(FIRST_NAMES)], f"Lastname{i}", f"candidate{i}@example.com",
+         "Female" if i % 2 else "Male", ROLES[i % len(ROLES)]]
+        for i in range(count)
+    ]
+
+
+def _timed(fn: Callable[[], Any], repeats: int) -> Dict[str, Any]:
+    samples, result = [], None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - started)
+    return {"ms": statistics.median(samples) * 1000, "result": result}
+
+
+def _held_bytes(fn: Callable[[], Any]) -> int:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = fn()
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del kept
+    return held
+
+
+def run(records: int, repeats: int) -> Dict[str, Any]:
+    rows = _rows(records)
+    results: Dict[str, Any] = {"records": records, "encoder": "orjson" if serialization.orjson else "json"}
+
+    as_dicts = lambda: [dict(zip(HEADER, row)) for row in rows]
+    as_models = lambda: [Candidate(*row) for row in rows]
+    results["records_build"] = {
+        "dicts": {"ms": _timed(as_dicts, repeats)["ms"], "held_bytes": _held_bytes(as_dicts)},
+        "slots": {"ms": _timed(as_models, repeats)["ms"], "held_bytes": _held_bytes(as_models)},
+    }
+
+    candidates, candidate_dicts = as_models(), as_dicts()
+    results["candidates_encode"] = {}
+    for name, encode in {
+        "json_indent2": lambda: json.dumps(candidate_dicts, indent=2),
+        "json": lambda: json.dumps(candidate_dicts),
+        "compact": lambda: dumps(candidates),
+    }.items():
+        timed = _timed(encode, repeats)
+        results["candidates_encode"][name] = {"ms": timed["ms"], "bytes": len(timed["result"].encode())}
+
+    emails = [_render_onboarding_email(c, f"id{i}", f"token{i}") for i, c in enumerate(candidates)]
+    email_dicts = [{f: getattr(e, f) for f in e.__slots__} for e in emails]
+    encoders = {
+        "json_indent2": lambda: json.dumps({"status": "success", "emails": email_dicts}, indent=2),
+        "json": lambda: json.dumps({"status": "success", "emails": email_dicts}),
+        "compact": lambda: dumps({"status": "success", "emails": emails}),
+    }
+    results["emails_encode"] = {}
+    for name, encode in encoders.items():
+        timed = _timed(encode, repeats)
+        results["emails_encode"][name] = {"ms": timed["ms"], "bytes": len(timed["result"].encode())}
+
+    payload = encoders["compact"]()
+    results["decode"] = {
+        "json": {"ms": _timed(lambda: json.loads(payload), repeats)["ms"]},
+        "compact": {"ms": _timed(lambda: loads(payload), repeats)["ms"]},
+    }
+
+    frame = pd.DataFrame(rows, columns=HEADER)
+    results["sheet_to_json"] = {}
+    for name, kwargs in {"indent2": {"indent": 2}, "compact": {"force_ascii": False}}.items():
+        timed = _timed(lambda: frame.to_json(orient="records", **kwargs), repeats)
+        results["sheet_to_json"][name] = {"ms": timed["ms"], "bytes": len(timed["result"].encode())}
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=100_000)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--json", help="Also write the results to this file.")
+    args = parser.parse_args(argv)
+
+    results = run(args.records, args.repeats)
+    print(f"{results['records']} records, encoder: {results['encoder']}")
+    for section in ("records_build", "candidates_encode", "emails_encode", "decode", "sheet_to_json"):
+        print(f"\n{section}")
+        for name, r in results[section].items():
+            extra = "".join(f" {k}={v:,}" for k, v in r.items() if k != "ms")
+            print(f"  {name:<14} {r['ms']:>9.1f} ms{extra}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Session service benchmark: events/second for InMemorySessionService vs SqliteSessionService.
+
+Appends realistic turns (user message, tool call, tool response carrying an
+OAuth token cache, final answer, plus an occasional large state value) to many
+sessions concurrently, then reads every session back.
+
+Usage:
+    python -m benchmarks.session_benchmark
+    python -m benchmarks.session_benchmark --sessions 200 --turns 20 --large-value-kb 64 --json sessions.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from google.adk.events import Event, EventActions
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from shared.sqlite_session_service import SqliteSessionService
+
+from .load_test import _percentile
+
+APP_NAME = "session_benchmark"
+
+
+def _turn_events(invocation_id: str, turn: int, large_value: str) -> List[Event]:
+    tokens = {"token": f"access-{turn}", "refresh_token": "refresh", "client_id": "id", "client_secret": "secret"}
+    call = types.FunctionCall(id=f"call-{invocation_id}", name="read_calendar", args={"calendar_id": "primary"})
+    response = types.FunctionResponse(id=call.id, name=call.name, response={"result": "ok"})
+    final_delta: Dict[str, Any] = {"user:last_turn": turn}
+    if turn % 5 == 0:
+        final_delta["last_sheet_json"] = large_value
+    return [
+        Event(invocation_id=invocation_id, author="user",
+              content=types.Content(role="user", parts=[types.Part(text=f"turn {turn}")])),
+        Event(invocation_id=invocation_id, author="agent",
+              content=types.Content(role="model", parts=[types.Part(function_call=call)])),
+        Event(invocation_id=invocation_id, author="agent",
+              content=types.Content(role="user", parts=[types.Part(function_response=response)]),
+              actions=EventActions(state_delta={"calendar_tool_tokens": tokens})),
+        Event(invocation_id=invocation_id, author="agent",
+              content=types.Content(role="model", parts=[types.Part(text="Here are your events.")]),
+              actions=EventActions(state_delta=final_delta)),
+    ]
+
+
+async def run(service, sessions: int, turns: int, large_value_kb: int) -> Dict[str, Any]:
+    large_value = "x" * (large_value_kb * 1024)
+    append_samples: List[float] = []
+
+    async def drive(index: int):
+        session = await service.create_session(app_name=APP_NAME, user_id=f"user{index % 10}")
+        for turn in range(turns):
+            for event in _turn_events(f"inv-{index}-{turn}", turn, large_value):
+                started = time.perf_counter()
+                await service.append_event(session, event)
+                append_samples.append(time.perf_counter() - started)
+        return session.id, session.user_id
+
+    started = time.perf_counter()
+    created = await asyncio.gather(*(drive(i) for i in range(sessions)))
+    await service.flush()
+    write_elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for session_id, user_id in created:
+        session = await service.get_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
+        assert len(session.events) == turns * 4
+        assert session.state["calendar_tool_tokens"]["token"] == f"access-{turns - 1}"
+    read_elapsed = time.perf_counter() - started
+
+    samples = sorted(append_samples)
+    return {
+        "events": len(samples),
+        "events_per_s": len(samples) / write_elapsed,
+        "append_p50_us": _percentile(samples, 50) * 1e6,
+        "append_p99_us": _percentile(samples, 99) * 1e6,
+        "get_session_ms": read_elapsed / sessions * 1000,
+    }
+
+
+async def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--large-value-kb", type=int, default=32)
+    parser.add_argument("--json", help="Also write the results to this JSON file.")
+    args = parser.parse_args(argv)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        services = {
+            "in_memory": InMemorySessionService(),
+            "sqlite_batched": SqliteSessionService(os.path.join(tmp, "batched.db")),
+            "sqlite_per_event": SqliteSessionService(os.path.join(tmp, "per_event.db"), batch_turns=False),
+        }
+        print(f"{'service':<18} {'events':>7} {'events/s':>10} {'append p50 us':>14} "
+              f"{'append p99 us':>14} {'get_session ms':>15}")
+        for name, service in services.items():
+            row = await run(service, args.sessions, args.turns, args.large_value_kb)
+            results[name] = row
+            print(f"{name:<18} {row['events']:>7} {row['events_per_s']:>10.0f} {row['append_p50_us']:>14.1f} "
+                  f"{row['append_p99_us']:>14.1f} {row['get_session_ms']:>15.2f}")
+            if isinstance(service, SqliteSessionService):
+                service.close()
+                results[name]["db_mb"] = os.path.getsize(service.db_path) / 2**20
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
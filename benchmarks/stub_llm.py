@@ -0,0 +1,74 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import AsyncGenerator, Callable, Dict, List, Optional, Union
+
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.genai import types
+
+# Arguments can be computed from the user's message so that concurrent
+# sessions replaying the same script still work on their own data.
+ArgsSpec = Union[Dict, Callable[[str], Dict]]
+
+
+@dataclass
+class ScriptStep:
+    """One scripted model response: either a function call or a final text reply."""
+    function_name: Optional[str] = None
+    args: ArgsSpec = field(default_factory=dict)
+    text: Optional[str] = None
+
+    def to_content(self, user_text: str) -> types.Content:
+        if self.function_name is None:
+            return types.Content(role="model", parts=[types.Part(text=self.text or "")])
+        args = self.args(user_text) if callable(self.args) else self.args
+        return types.Content(
+            role="model",
+            parts=[types.Part(function_call=types.FunctionCall(name=self.function_name, args=args))],
+        )
+
+
+def call(function_name: str, args: ArgsSpec = None) -> ScriptStep:
+    return ScriptStep(function_name=function_name, args=args or {})
+
+
+def reply(text: str) -> ScriptStep:
+    return ScriptStep(text=text)
+
+
+def _is_user_text(content: types.Content) -> bool:
+    return content.role == "user" and any(
+        part.text is not None or part.inline_data is not None for part in content.parts or []
+    )
+
+
+class StubLlm(BaseLlm):
+    """
+    Deterministic stand-in for Gemini that replays a script of model responses.
+
+    `turns[i]` is the list of responses for the i-th user message of a session;
+    the step within a turn is the number of model responses already made since
+    that message. Everything is derived from the request itself, so one instance
+    can serve any number of concurrent sessions.
+    """
+    turns: List[List[ScriptStep]]
+    latency_seconds: float = 0.0
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        contents = llm_request.contents or []
+        user_indexes = [i for i, c in enumerate(contents) if _is_user_text(c)]
+        if not user_indexes:
+            raise ValueError("StubLlm received a request without a user message.")
+
+        turn_index = min(len(user_indexes), len(self.turns)) - 1
+        last_user = user_indexes[-1]
+        step_index = sum(1 for c in contents[last_user + 1:] if c.role == "model")
+        script = self.turns[turn_index]
+        step = script[min(step_index, len(script) - 1)]
+
+        user_text = "".join(p.text or "" for p in contents[last_user].parts or [])
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+
+        yield LlmResponse(content=step.to_content(user_text), turn_complete=True)
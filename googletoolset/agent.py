@@ -12,8 +12,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import json
+import asyncio
 import os
+from datetime import date
+from typing import List, Optional
 
 from dotenv import load_dotenv
 from fastapi.openapi.models import OAuth2
@@ -29,6 +31,10 @@ from google.adk.tools.google_api_tool import SheetsToolset , CalendarToolset
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
+from shared.calendar_scheduling import schedule_sessions
+from shared.instrumentation import instrument, set_attributes
+from shared.quota_scheduler import QuotaGate, get_quota_scheduler
+from shared.serialization import dumps, loads
 
 # Load environment variables from .env file
 load_dotenv()
@@ -49,17 +55,10 @@ calendar_toolset = CalendarToolset(
 
 
 
-def read_calendar(
-    calendar_id: str,
-    tool_context: ToolContext,
-) -> str:
-    """Read events from a Google Calendar.
-
-    Args:
-        calendar_id (str): The ID of the calendar.
-
-    Returns:
-        str: A list of events from the calendar.
+def _calendar_credentials(tool_context: ToolContext) -> Optional[Credentials]:
+    """
+    The user's Calendar credentials from session state, refreshed or obtained
+    through the OAuth flow. None when authorization has been requested.
     """
     creds = None
 
@@ -67,6 +66,7 @@ def read_calendar(
         creds = Credentials.from_authorized_user_info(
             tool_context.state["calendar_tool_tokens"], SCOPES
         )
+    set_attributes(token_cache_hit=bool(creds and creds.valid))
     if not creds or not creds.valid:
         if creds and creds.expired and creds.refresh_token:
             creds.refresh(Request())
@@ -115,8 +115,27 @@ def read_calendar(
                         raw_auth_credential=auth_credential,
                     )
                 )
-                return "Need User Authorization to access their Google Calendar."
-        tool_context.state["calendar_tool_tokens"] = json.loads(creds.to_json())
+                return None
+        tool_context.state["calendar_tool_tokens"] = loads(creds.to_json())
+    return creds
+
+
+@instrument()
+def read_calendar(
+    calendar_id: str,
+    tool_context: ToolContext,
+) -> str:
+    """Read events from a Google Calendar.
+
+    Args:
+        calendar_id (str): The ID of the calendar.
+
+    Returns:
+        str: A list of events from the calendar.
+    """
+    creds = _calendar_credentials(tool_context)
+    if creds is None:
+        return "Need User Authorization to access their Google Calendar."
 
     # service = build("calendar", "v3", credentials=creds)
     # events_result = (
@@ -128,6 +147,67 @@ def read_calendar(
     # return json.dumps(events, indent=2)
 
 
+@instrument()
+async def schedule_onboarding_sessions(
+    candidate_emails: List[str],
+    start_date: str,
+    end_date: str,
+    tool_context: ToolContext,
+    host_emails: Optional[List[str]] = None,
+    duration_minutes: int = 30,
+    group_size: int = 1,
+    title: str = "Onboarding session",
+    time_zone: str = "UTC",
+) -> str:
+    """Schedule onboarding sessions for a cohort of candidates on the user's primary calendar.
+
+    Finds the first slot in working hours (9:00-17:00, weekdays) when the user,
+    the hosts and the session's candidates are all free, and invites them.
+
+    Args:
+        candidate_emails (List[str]): Email addresses of the candidates to schedule.
+        start_date (str): First day to schedule on, as YYYY-MM-DD.
+        end_date (str): Last day to schedule on, as YYYY-MM-DD.
+        host_emails (List[str]): Other people who attend every session, e.g. the hiring manager.
+        duration_minutes (int): Length of each session.
+        group_size (int): Candidates per session; 1 gives every candidate their own session.
+        title (str): Event title.
+        time_zone (str): IANA time zone of the working hours, e.g. "Asia/Kolkata".
+
+    Returns:
+        str: JSON string with the booked sessions (attendees, start, end, event_id),
+          the candidates that could not be scheduled, and the calendars whose
+          availability could not be read.
+    """
+    try:
+        first_day, last_day = date.fromisoformat(start_date), date.fromisoformat(end_date)
+    except ValueError as e:
+        return dumps({"status": "error", "message": f"Invalid date: {e}"})
+    if group_size < 1 or duration_minutes < 1:
+        return dumps({"status": "error", "message": "group_size and duration_minutes must be positive."})
+
+    creds = _calendar_credentials(tool_context)
+    if creds is None:
+        return "Need User Authorization to access their Google Calendar."
+    service = build("calendar", "v3", http=get_quota_scheduler().http(creds, "calendar", tool_context.user_id))
+    try:
+        # The scheduler sleeps between throttled Calendar requests; keep that off the event loop
+        result = await asyncio.to_thread(
+            schedule_sessions, service, candidate_emails, first_day, last_day,
+            host_emails=host_emails or [], duration_minutes=duration_minutes,
+            group_size=group_size, title=title, time_zone=time_zone,
+        )
+    except Exception as e:
+        return dumps({"status": "error", "message": f"Scheduling failed: {e}"})
+    set_attributes(
+        sessions=len(result["sessions"]), unscheduled=len(result["unscheduled"]),
+        api_calls=sum(result["api_calls"].values()),
+    )
+    return dumps({"status": "success", **result})
+
+
+# CalendarToolset calls are scheduled against the Calendar quota
+quota_gate = QuotaGate(get_quota_scheduler())
 
 root_agent = Agent(
     model="gemini-2.0-flash",
@@ -135,6 +215,10 @@ root_agent = Agent(
     instruction="""
       You are a helpful Google Calendar assistant.
       Use the provided tools to read from Google Calendar.
+      To schedule onboarding sessions for several candidates, call
+      schedule_onboarding_sessions once with all of their emails.
 """,
-    tools=[read_calendar, calendar_toolset],
+    tools=[read_calendar, schedule_onboarding_sessions, calendar_toolset],
+    before_tool_callback=quota_gate.before_tool,
+    after_tool_callback=quota_gate.after_tool,
 )
\ No newline at end of file
@@ -4,6 +4,7 @@ from google.adk.agents.callback_context import CallbackContext
 from google.adk.models import LlmRequest
 import pandas as pd
 import io
+import os
 import json
 import pprint
 from google.genai import types
@@ -14,6 +15,11 @@ from google.adk.auth import AuthConfig
 from google.adk.runners import Runner
 from google.genai.types import Content, Part
 from dotenv import load_dotenv
+from urllib.parse import urlencode
+from shared.instrumentation import instrument, set_attributes
+from shared.llm_profiler import LlmRequestProfiler
+from shared.sqlite_session_service import SqliteSessionService
+from .oauth_server import REDIRECT_URI, register_pending_auth, start_callback_server, wait_for_credential
 
 load_dotenv()
 
@@ -82,8 +88,9 @@ def convert_xlsx_to_json(data_bytes: bytes) -> Optional[str]:
         df = pd.read_excel(file_in_memory, engine='openpyxl')
         
         # Convert the DataFrame to a JSON string in 'records' orientation
-        # (a list of dictionaries), which is a very common format.
-        json_output = df.to_json(orient='records', indent=2)
+        # (a list of dictionaries), which is a very common format. It goes to
+        # the model, so no indentation and no \u escapes.
+        json_output = df.to_json(orient='records', force_ascii=False)
         
         return json_output
         
@@ -123,6 +130,7 @@ def process_request(llm_request: LlmRequest):
             #if part.inline_data.data.startswith(b'PK\x03\x04'):
             binary_data = part.inline_data.data
             break
+    set_attributes(attachment_bytes=len(binary_data) if binary_data else 0)
 
     if not binary_data:
         print("No Excel file found in the last user message.")
@@ -133,6 +141,7 @@ def process_request(llm_request: LlmRequest):
     if binary_data.startswith(b'PK\x03\x04'):
         excel_data_as_json = convert_xlsx_to_json(binary_data)
     
+    set_attributes(attachment_json_bytes=len(excel_data_as_json) if excel_data_as_json else 0)
     if not excel_data_as_json:
         print("Failed to convert file data.")
         return None
@@ -145,7 +154,15 @@ def process_request(llm_request: LlmRequest):
     print(excel_data_as_json)
     return excel_data_as_json
 
+# Markers around the file content injected into the prompt
+ATTACHMENT_START_MARKER = "--- Content of Attached Excel File ---"
+ATTACHMENT_END_MARKER = "--- End of File Content ---"
+
+# Measures every model call; see shared/llm_profiler.py
+request_profiler = LlmRequestProfiler(injected_markers=[(ATTACHMENT_START_MARKER, ATTACHMENT_END_MARKER)])
+
 # --- Define the Callback Function ---
+@instrument(kind="callback")
 def simple_before_model_modifier(
     callback_context: CallbackContext, llm_request: LlmRequest
 ):
@@ -159,9 +176,7 @@ def simple_before_model_modifier(
          if llm_request.contents[-1].parts:
             last_user_message = llm_request.contents[-1].parts[0].text
     print(f"[Callback] Inspecting last user message: '{last_user_message}'")
-    print("\n--- Pretty-printing LlmRequest: ---")
-    #pprint.pprint(llm_request)
-    print("----------------------------------\n")
+    # Full requests are dumped to disk by request_profiler (set LLM_PROFILE_DIR and LLM_PROFILE_SAMPLE_RATE)
     excel_data_as_json = process_request(llm_request)
 
     # 2. If JSON data was successfully created, inject it into the user's prompt
@@ -174,9 +189,9 @@ def simple_before_model_modifier(
             # We create a formatted block to make it clear to the LLM
             # where the file content begins and ends.
             injected_content = (
-                f"\n\n--- Content of Attached Excel File ---\n"
+                f"\n\n{ATTACHMENT_START_MARKER}\n"
                 f"{excel_data_as_json}\n"
-                f"--- End of File Content ---"
+                f"{ATTACHMENT_END_MARKER}"
             )
 
             # Search for an existing text part in the user's message
@@ -210,7 +225,9 @@ root_agent = Agent(
     ),
     tools=[google_sheet_tool],
     sub_agents=[],
-    #before_model_callback=simple_before_model_modifier
+    #before_model_callback=[simple_before_model_modifier, request_profiler.before_model],
+    before_model_callback=request_profiler.before_model,
+    after_model_callback=request_profiler.after_model,
 )
 
 # Helper functions from the documentation to identify the auth request
@@ -236,6 +253,9 @@ def get_auth_config(auth_request_function_call: types.FunctionCall) -> AuthConfi
         raise ValueError(
             f"Cannot get auth config from function call: {auth_request_function_call}"
         )
+    # Newer ADK releases serialize the config into the function call args
+    if isinstance(auth_config, dict):
+        auth_config = AuthConfig.model_validate(auth_config)
     if not isinstance(auth_config, AuthConfig):
         raise ValueError(
             f"Cannot get auth config {auth_config} is not an instance of AuthConfig."
@@ -271,7 +291,9 @@ async def main():
         instruction=(
             "You are a helpful agent who can read google calendar for the user."
         ),
-        tools=[google_sheet_tool]
+        tools=[google_sheet_tool],
+        before_model_callback=request_profiler.before_model,
+        after_model_callback=request_profiler.after_model,
     )
     print(f"Agent '{drive_agent.name}' created with Google Drive tools.")
 
@@ -280,7 +302,9 @@ async def main():
     # ==============================================================================
     print("\n--- Step 2: Setting up Session and Runner ---")
 
-    session_service = InMemorySessionService()
+    # Set SESSION_DB_PATH to keep sessions (and cached OAuth tokens) across restarts and workers
+    session_db_path = os.getenv("SESSION_DB_PATH")
+    session_service = SqliteSessionService(session_db_path) if session_db_path else InMemorySessionService()
     runner = Runner(agent=drive_agent, session_service=session_service, app_name="google_drive_agent")
 
     # Define identifiers for the conversation
@@ -299,41 +323,61 @@ async def main():
     # --- FIX 2: Create a `Content` object with a 'user' role ---
     user_message = Content(role="user", parts=[Part(text=user_prompt_text)])
 
-    events_async = runner.run_async(session_id=session.id, new_message=user_message, user_id="user123")
-
-    auth_request_id = None
-    auth_request_uri = None
-
-    async for event in events_async:
-
-        print(event)
-        # Check if the agent is requesting user authentication
-        if auth_request := get_auth_request_function_call(event):
-            print("\n--> AGENT REQUIRES USER AUTHENTICATION <--")
-            auth_request_id = auth_request.id
-            auth_config_info = get_auth_config(auth_request)
-
-            # Build the full authorization URL
-            base_auth_uri = auth_config_info.exchanged_auth_credential.oauth2.auth_uri
-            redirect_uri = 'http://localhost:8000/callback' # MUST MATCH YOUR OAUTH CLIENT CONFIG
-
-            auth_request_uri = base_auth_uri + f'&redirect_uri={redirect_uri}'
-
-            print("\nACTION REQUIRED:")
-            print("1. Ensure your FastAPI server (`callback_server.py`) is running.")
-            print("2. Please visit this URL in your browser to authorize the application:")
-            print(f"\n   {auth_request_uri}\n")
-            break # Stop processing events, waiting for user to authorize
-
-        # Handle the final response if no auth is needed or after it's complete
-        # if event. == "finalize":
-        #     print(f"Agent < {event.content.parts[0].text}")
-
-    if auth_request_id:
-        print("--- Waiting for user to complete authorization ---")
-        print("After you authorize in the browser, the authorization code will appear in the FastAPI server's terminal.")
-        print("The next step will be to send that code back to the agent.")
-
+    # Start the callback server on this event loop so the redirect can resume the session
+    callback_server = start_callback_server()
 
+    try:
+        while user_message is not None:
+            events_async = runner.run_async(session_id=session.id, new_message=user_message, user_id="user123")
+            user_message = None
+
+            async for event in events_async:
+
+                print(event)
+                # Check if the agent is requesting user authentication
+                if auth_request := get_auth_request_function_call(event):
+                    print("\n--> AGENT REQUIRES USER AUTHENTICATION <--")
+                    auth_config_info = get_auth_config(auth_request)
+                    pending = register_pending_auth(
+                        auth_request_id=auth_request.id,
+                        auth_config=auth_config_info,
+                        user_id="user123",
+                        session_id=session.id,
+                    )
+
+                    # Build the full authorization URL
+                    base_auth_uri = auth_config_info.exchanged_auth_credential.oauth2.auth_uri
+                    auth_request_uri = base_auth_uri + "&" + urlencode({"redirect_uri": REDIRECT_URI})
+
+                    print("\nACTION REQUIRED:")
+                    print("Please visit this URL in your browser to authorize the application:")
+                    print(f"\n   {auth_request_uri}\n")
+                    print("--- Waiting for user to complete authorization ---")
+
+                    # The callback server exchanges the code and resolves this for us
+                    exchanged_auth_config = await wait_for_credential(pending)
+                    print("--- Authorization complete, resuming the agent ---")
+
+                    user_message = Content(
+                        role="user",
+                        parts=[
+                            Part(
+                                function_response=types.FunctionResponse(
+                                    id=pending.auth_request_id,
+                                    name="adk_request_credential",
+                                    response=exchanged_auth_config.model_dump(),
+                                )
+                            )
+                        ],
+                    )
+                    break
+
+                if event.is_final_response() and event.content and event.content.parts:
+                    print(f"Agent < {event.content.parts[0].text}")
+    finally:
+        callback_server.cancel()
+        request_profiler.write_summary()
+
+# Run with `python -m googletoolset.new_agent` so the callback server import resolves.
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -1,21 +1,199 @@
+import asyncio
+import html
+import os
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
 import uvicorn
 from fastapi import FastAPI, Request
 from fastapi.responses import HTMLResponse
+from google.adk.auth import AuthConfig
+from google.adk.auth.exchanger.oauth2_credential_exchanger import OAuth2CredentialExchanger
+
+# The callback URL registered on the OAuth client. new_agent.main advertises
+# this same value, so the server must listen on the matching host/port.
+OAUTH_CALLBACK_HOST = os.getenv("OAUTH_CALLBACK_HOST", "localhost")
+OAUTH_CALLBACK_PORT = int(os.getenv("OAUTH_CALLBACK_PORT", "8000"))
+REDIRECT_URI = os.getenv(
+    "OAUTH_REDIRECT_URI", f"http://{OAUTH_CALLBACK_HOST}:{OAUTH_CALLBACK_PORT}/callback"
+)
+
+# How long an auth request stays claimable before the waiting session gives up.
+PENDING_AUTH_TIMEOUT_SECONDS = 300
+
+
+@dataclass
+class PendingAuth:
+    """An auth request issued by a Runner session that is waiting for its redirect."""
+    state: str
+    auth_request_id: str
+    auth_config: AuthConfig
+    user_id: str
+    session_id: str
+    future: asyncio.Future = field(repr=False)
+
+
+# Pending auth requests keyed by the OAuth `state` parameter. Every user gets
+# their own entry, so any number of them can be mid-authorization at once.
+pending_auth_requests: Dict[str, PendingAuth] = {}
+
+
+def register_pending_auth(
+    auth_request_id: str,
+    auth_config: AuthConfig,
+    user_id: str,
+    session_id: str,
+) -> PendingAuth:
+    """
+    Registers an `adk_request_credential` call so the callback can complete it.
+
+    Must be called from the event loop the callback server runs on, since the
+    returned entry's future is resolved by the callback handler.
+
+    Args:
+        auth_request_id: The id of the `adk_request_credential` function call.
+        auth_config: The auth config carried by that function call.
+        user_id: The user the session belongs to.
+        session_id: The session waiting for the credential.
+
+    Returns:
+        The registered PendingAuth entry.
+    """
+    oauth2 = auth_config.exchanged_auth_credential.oauth2
+    if not oauth2.state:
+        raise ValueError("Auth config has no OAuth state; cannot correlate the redirect.")
+
+    # The token exchange has to use the same redirect_uri as the authorization request
+    oauth2.redirect_uri = REDIRECT_URI
+
+    pending = PendingAuth(
+        state=oauth2.state,
+        auth_request_id=auth_request_id,
+        auth_config=auth_config,
+        user_id=user_id,
+        session_id=session_id,
+        future=asyncio.get_running_loop().create_future(),
+    )
+    pending_auth_requests[pending.state] = pending
+    return pending
+
+
+async def wait_for_credential(
+    pending: PendingAuth, timeout: float = PENDING_AUTH_TIMEOUT_SECONDS
+) -> AuthConfig:
+    """
+    Waits until the callback has exchanged the code for `pending`.
+
+    Returns:
+        The auth config with `exchanged_auth_credential` holding the tokens.
+
+    Raises:
+        asyncio.TimeoutError: If the user did not complete authorization in time.
+    """
+    try:
+        return await asyncio.wait_for(asyncio.shield(pending.future), timeout)
+    finally:
+        pending_auth_requests.pop(pending.state, None)
+
+
+async def exchange_authorization_code(pending: PendingAuth, auth_response_uri: str) -> AuthConfig:
+    """Exchanges the code in `auth_response_uri` for tokens on the pending auth config."""
+    auth_config = pending.auth_config
+    credential = auth_config.exchanged_auth_credential
+    credential.oauth2.auth_response_uri = auth_response_uri
+
+    # The exchanger leaves the credential untouched on failure, so check for a token
+    result = await OAuth2CredentialExchanger().exchange(credential, auth_config.auth_scheme)
+    if not result.credential.oauth2.access_token:
+        raise RuntimeError("Token exchange did not return an access token.")
+
+    auth_config.exchanged_auth_credential = result.credential
+    return auth_config
+
+
+def start_callback_server() -> asyncio.Task:
+    """Runs the callback server on the current event loop as a background task."""
+    config = uvicorn.Config(app, host="0.0.0.0", port=OAUTH_CALLBACK_PORT, log_level="warning")
+    return asyncio.create_task(uvicorn.Server(config).serve())
+
 
 app = FastAPI()
 
 @app.get("/")
 async def root():
-    return {"message": "OAuth Callback Server is running. Awaiting redirect from Google."}
+    return {
+        "message": "OAuth Callback Server is running. Awaiting redirect from Google.",
+        "pending_auth_requests": len(pending_auth_requests),
+    }
 
 @app.get("/callback")
-async def handle_google_callback(request: Request, code: str):
+async def handle_google_callback(
+    request: Request, code: str, state: Optional[str] = None
+):
     """
     This is the REDIRECT_URI.
-    It receives the code from Google and displays it to the user.
+    If the `state` belongs to a waiting Runner session, it exchanges the code and
+    hands the credential back so that session resumes on its own. Otherwise it
+    displays the code for the user to paste into the ADK Web UI.
+    """
+    pending = pending_auth_requests.get(state) if state else None
+    if pending is None:
+        print(f"[OAuth Server] Received authorization code for an unknown state; showing it to the user.")
+        return _render_manual_code_page(code)
+
+    if pending.future.done():
+        return _render_status_page("Authorization Already Completed", "You can close this tab.", ok=True)
+
+    print(f"[OAuth Server] Exchanging authorization code for session {pending.session_id}.")
+    try:
+        auth_config = await exchange_authorization_code(pending, str(request.url))
+    except Exception as e:
+        # The session keeps waiting, so opening the authorization URL again retries with a fresh code
+        print(f"[OAuth Server] Token exchange failed: {e}")
+        return _render_status_page(
+            "Authentication Failed",
+            f"Could not exchange the authorization code: {e}. Open the authorization URL again to retry.",
+            ok=False,
+        )
+
+    if not pending.future.done():
+        pending.future.set_result(auth_config)
+    return _render_status_page(
+        "Authentication Successful",
+        "The agent has received your credentials and is continuing. You can close this tab.",
+        ok=True,
+    )
+
+
+def _render_status_page(heading: str, message: str, ok: bool) -> HTMLResponse:
+    color = "#28a745" if ok else "#dc3545"
+    heading, message = html.escape(heading), html.escape(message)
+    html_content = f"""
+    <!DOCTYPE html>
+    <html lang="en">
+    <head>
+        <meta charset="UTF-8">
+        <title>{heading}</title>
+        <style>
+            body {{ font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, Helvetica, Arial, sans-serif; background-color: #f4f7f6; color: #333; display: flex; justify-content: center; align-items: center; height: 100vh; margin: 0; }}
+            .container {{ background-color: white; padding: 40px; border-radius: 8px; box-shadow: 0 4px 15px rgba(0,0,0,0.1); text-align: center; max-width: 600px; }}
+            h1 {{ color: {color}; }}
+            p {{ font-size: 1.1em; }}
+        </style>
+    </head>
+    <body>
+        <div class="container">
+            <h1>{heading}</h1>
+            <p>{message}</p>
+        </div>
+    </body>
+    </html>
     """
-    print(f"[OAuth Server] Received authorization code from Google.")
-    
+    return HTMLResponse(content=html_content, status_code=200 if ok else 400)
+
+
+def _render_manual_code_page(code: str) -> HTMLResponse:
+    code = html.escape(code)
     # Simple HTML page to display the code and instructions
     html_content = f"""
     <!DOCTYPE html>
@@ -59,5 +237,5 @@ async def handle_google_callback(request: Request, code: str):
     return HTMLResponse(content=html_content)
 
 if __name__ == "__main__":
-    print("--- Starting FastAPI OAuth Callback Server on http://localhost:8000 ---")
-    uvicorn.run(app, host="0.0.0.0", port=9000)
\ No newline at end of file
+    print(f"--- Starting FastAPI OAuth Callback Server on http://{OAUTH_CALLBACK_HOST}:{OAUTH_CALLBACK_PORT} ---")
+    uvicorn.run(app, host="0.0.0.0", port=OAUTH_CALLBACK_PORT)
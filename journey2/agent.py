@@ -1,8 +1,8 @@
+import asyncio
 import requests
 import vertexai
 from typing import Dict, Any
 import os
-import json
 from dotenv import load_dotenv
 
 
@@ -21,6 +21,9 @@ from google.adk.agents import Agent
 from google.oauth2 import id_token
 from google.adk.auth import AuthConfig
 from google.oauth2.credentials import Credentials
+from shared.instrumentation import instrument, set_attributes
+from shared.quota_scheduler import get_quota_scheduler
+from shared.serialization import loads
 
 
 
@@ -65,7 +68,8 @@ auth_credential = AuthCredential(
 
 
 
-def get_exchange_rate(
+@instrument()
+async def get_exchange_rate(
    tool_context: ToolContext,
    currency_from: str = "USD",
    currency_to: str = "INR",
@@ -86,8 +90,8 @@ def get_exchange_rate(
        try:
            creds = Credentials.from_authorized_user_info(cached, SCOPES)
            if not creds.valid and creds.expired and creds.refresh_token:
-               creds.refresh(Request())
-               tool_context.state[TOKEN_CACHE_KEY] = json.loads(creds.to_json())
+               await asyncio.to_thread(creds.refresh, Request())
+               tool_context.state[TOKEN_CACHE_KEY] = loads(creds.to_json())
            elif not creds.valid:
                creds = None
                tool_context.state.pop(TOKEN_CACHE_KEY, None)
@@ -97,6 +101,9 @@ def get_exchange_rate(
            tool_context.state.pop(TOKEN_CACHE_KEY, None)
 
 
+   set_attributes(token_cache_hit=bool(creds and creds.valid))
+
+
    # Step 2: If no valid credentials, check for an auth response from the client. (This part is correct)
    if not creds or not creds.valid:
        exchanged = tool_context.get_auth_response(
@@ -112,7 +119,7 @@ def get_exchange_rate(
                client_secret=auth_credential.oauth2.client_secret,
                scopes=SCOPES,
            )
-           tool_context.state[TOKEN_CACHE_KEY] = json.loads(creds.to_json())
+           tool_context.state[TOKEN_CACHE_KEY] = loads(creds.to_json())
        else:
            # Step 3: Initiate authentication request. (This part is correct)
            auth_config = AuthConfig(
@@ -133,7 +140,8 @@ def get_exchange_rate(
    # **** Step 4: CORRECTED LOGIC - Get user info from the UserInfo endpoint ****
    try:
        # We use the access token to get the user's profile information.
-       userinfo_response = requests.get(
+       userinfo_response = await get_quota_scheduler().run(
+           "oauth2", tool_context.user_id, requests.get,
            "https://www.googleapis.com/oauth2/v3/userinfo",
            headers={"Authorization": f"Bearer {creds.token}"}
        )
@@ -150,7 +158,8 @@ def get_exchange_rate(
 
    # Step 5: Make the authenticated API call. (This part is correct)
    try:
-       resp = requests.get(
+       resp = await asyncio.to_thread(
+           requests.get,
            f"https://api.frankfurter.app/{currency_date}",
            params={"from": currency_from, "to": currency_to},
            # Note: This specific API doesn't require auth, but we include the header
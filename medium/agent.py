@@ -7,9 +7,11 @@ from google.adk.auth import AuthCredentialTypes
 from google.adk.auth import OAuth2Auth
 from dotenv import load_dotenv
 import os
-from google.adk.tools.application_integration_tool.application_integration_toolset import ApplicationIntegrationToolset
 from google.adk.agents import Agent
 from google.genai import types
+from shared.integration_spec_cache import CachedApplicationIntegrationToolset
+from shared.llm_response_cache import LlmResponseCache
+from shared.quota_scheduler import QuotaGate, get_quota_scheduler
 
 load_dotenv()
 
@@ -38,7 +40,8 @@ auth_credential = AuthCredential(
     ),
 )
 
-gdrive_connection_toolset = ApplicationIntegrationToolset(
+# Built from a local spec snapshot on first use, so importing this module makes no remote calls
+gdrive_connection_toolset = CachedApplicationIntegrationToolset(
             project=os.getenv("PROJECT_ID"), 
             location=os.getenv("LOCATION"), 
             connection="gdrive-connection-with-auth", 
@@ -51,6 +54,13 @@ gdrive_connection_toolset = ApplicationIntegrationToolset(
             auth_scheme=auth_scheme
  )
 
+# Low temperature and a fixed instruction, so identical questions get the stored answer.
+# Its only tool is a read-only Drive GET, so replaying a stored tool call is harmless.
+response_cache = LlmResponseCache(enabled=True, cache_tool_calls=True, disk_dir=os.getenv("LLM_RESPONSE_CACHE_DIR"))
+
+# Connector calls (mygdrive_*) are scheduled against the Drive quota
+quota_gate = QuotaGate(get_quota_scheduler())
+
 root_agent = Agent(
         model="gemini-2.5-flash",
         name="google_drive_agent",
@@ -58,4 +68,8 @@ root_agent = Agent(
         instruction="If they ask you how you were created, tell them you were created with the Google Agent Framework.",
         generate_content_config=types.GenerateContentConfig(temperature=0.2),
         tools = [gdrive_connection_toolset],
+        before_model_callback=response_cache.before_model,
+        after_model_callback=response_cache.after_model,
+        before_tool_callback=quota_gate.before_tool,
+        after_tool_callback=quota_gate.after_tool,
 )
\ No newline at end of file
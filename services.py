@@ -0,0 +1,25 @@
+"""
+Custom ADK services, loaded by `adk web` / `adk api_server` from the agents directory.
+
+`disk://<root>` builds a DiskArtifactService under <root> that ingests the
+files export_candidates writes to EXPORT_DIR:
+
+    adk web --artifact_service_uri disk:///var/lib/adk_artifacts
+"""
+from pathlib import Path
+from urllib.parse import unquote, urlparse
+
+from google.adk.cli.service_registry import get_service_registry
+
+
+def disk_artifact_factory(uri: str, **_):
+    from artifact.disk_artifact_service import DiskArtifactService
+    from testagent.candidate_export import EXPORT_DIR
+
+    parsed = urlparse(uri)
+    if not parsed.path:
+        raise ValueError("disk:// artifact URIs must include a path component.")
+    return DiskArtifactService(Path(unquote(parsed.path)), ingest_dirs=[EXPORT_DIR])
+
+
+get_service_registry().register_artifact_service("disk", disk_artifact_factory)
@@ -0,0 +1,252 @@
+"""
+Batched Google Calendar scheduling for onboarding sessions.
+
+`schedule_sessions` books one session per group of candidates with the same
+hosts, in a handful of API calls however large the cohort:
+  * free/busy: one `freebusy.query` per FREEBUSY_MAX_CALENDARS calendars
+    (hosts and candidates together)
+  * slots: computed locally. Each group's busy intervals are merged with the
+    hosts' and with the sessions already booked. The group gets the first
+    slot of the right length inside working hours.
+  * events: every session inserted through batch HTTP requests of up to
+    BATCH_MAX_REQUESTS calls each
+
+Calendars whose free/busy can't be read (typically external candidates) are
+treated as free and listed in the result.
+
+Usage:
+    service = build("calendar", "v3", credentials=creds)
+    result = schedule_sessions(service, ["a@x.com", "b@x.com"], date(2025, 3, 3), date(2025, 3, 7))
+    result["sessions"]   # [{"attendees": [...], "start": ..., "end": ..., "event_id": ...}, ...]
+    result["api_calls"]  # {"freebusy": 1, "batch": 1}
+"""
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo
+
+# Calendars per freebusy.query, the API's calendarExpansionMax
+FREEBUSY_MAX_CALENDARS = 50
+
+# Calls per batch HTTP request; Calendar rejects larger batches
+BATCH_MAX_REQUESTS = 50
+
+Interval = Tuple[datetime, datetime]
+
+
+def _parse_time(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def merge_intervals(intervals: Sequence[Interval]) -> List[Interval]:
+    """Sorts intervals and merges the ones that overlap or touch."""
+    merged: List[Interval] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def free_intervals(busy: Sequence[Interval], window: Interval) -> List[Interval]:
+    """The parts of `window` not covered by `busy`, which must be merged."""
+    free: List[Interval] = []
+    cursor, window_end = window
+    for start, end in busy:
+        if end <= cursor:
+            continue
+        if start >= window_end:
+            break
+        if start > cursor:
+            free.append((cursor, start))
+        cursor = max(cursor, end)
+    if cursor < window_end:
+        free.append((cursor, window_end))
+    return free
+
+
+def working_windows(
+    start_date: date,
+    end_date: date,
+    time_zone: str = "UTC",
+    day_start_hour: int = 9,
+    day_end_hour: int = 17,
+    weekdays_only: bool = True,
+) -> List[Interval]:
+    """Working hours of each day from start_date to end_date inclusive."""
+    tz = ZoneInfo(time_zone)
+    windows = []
+    day = start_date
+    while day <= end_date:
+        if not weekdays_only or day.weekday() < 5:
+            windows.append((
+                datetime.combine(day, time(day_start_hour), tz),
+                datetime.combine(day, time(day_end_hour), tz),
+            ))
+        day += timedelta(days=1)
+    return windows
+
+
+def first_slot(
+    busy: Sequence[Interval], windows: Sequence[Interval], duration: timedelta, step: timedelta
+) -> Optional[Interval]:
+    """
+    The earliest slot of `duration` free of the merged `busy`, starting on a
+    `step` boundary from the start of its window.
+    """
+    for window in windows:
+        for free_start, free_end in free_intervals(busy, window):
+            offset = free_start - window[0]
+            start = window[0] + -(-offset // step) * step
+            if start + duration <= free_end:
+                return start, start + duration
+    return None
+
+
+def query_free_busy(
+    service, calendar_ids: Sequence[str], time_min: datetime, time_max: datetime
+) -> Tuple[Dict[str, List[Interval]], Dict[str, str], int]:
+    """
+    Merged busy intervals of every calendar, FREEBUSY_MAX_CALENDARS per request.
+
+    Returns:
+        (busy by calendar ID, error reason by calendar ID, requests made)
+    """
+    busy: Dict[str, List[Interval]] = {}
+    errors: Dict[str, str] = {}
+    ids = list(dict.fromkeys(calendar_ids))
+    calls = 0
+    for i in range(0, len(ids), FREEBUSY_MAX_CALENDARS):
+        response = service.freebusy().query(body={
+            "timeMin": time_min.isoformat(),
+            "timeMax": time_max.isoformat(),
+            "items": [{"id": calendar_id} for calendar_id in ids[i:i + FREEBUSY_MAX_CALENDARS]],
+        }).execute()
+        calls += 1
+        for calendar_id, calendar in response.get("calendars", {}).items():
+            if calendar.get("errors"):
+                errors[calendar_id] = calendar["errors"][0].get("reason", "unknown")
+                continue
+            busy[calendar_id] = merge_intervals(
+                [(_parse_time(b["start"]), _parse_time(b["end"])) for b in calendar.get("busy", [])]
+            )
+    return busy, errors, calls
+
+
+def insert_events(
+    service, calendar_id: str, events: Sequence[Dict[str, Any]], send_updates: str = "all"
+) -> Tuple[List[Optional[Dict[str, Any]]], List[Optional[str]], int]:
+    """
+    Inserts the events with batch HTTP requests of BATCH_MAX_REQUESTS calls each.
+
+    Returns:
+        (created event or None per event, error message or None per event, requests made)
+    """
+    created: List[Optional[Dict[str, Any]]] = [None] * len(events)
+    errors: List[Optional[str]] = [None] * len(events)
+
+    def callback(request_id, response, exception):
+        index = int(request_id)
+        if exception is not None:
+            errors[index] = str(exception)
+        else:
+            created[index] = response
+
+    calls = 0
+    for i in range(0, len(events), BATCH_MAX_REQUESTS):
+        batch = service.new_batch_http_request(callback=callback)
+        for index in range(i, min(i + BATCH_MAX_REQUESTS, len(events))):
+            batch.add(
+                service.events().insert(calendarId=calendar_id, body=events[index], sendUpdates=send_updates),
+                request_id=str(index),
+            )
+        batch.execute()
+        calls += 1
+    return created, errors, calls
+
+
+def schedule_sessions(
+    service,
+    candidate_emails: Sequence[str],
+    start_date: date,
+    end_date: date,
+    host_emails: Sequence[str] = (),
+    calendar_id: str = "primary",
+    duration_minutes: int = 30,
+    group_size: int = 1,
+    title: str = "Onboarding session",
+    description: str = "",
+    time_zone: str = "UTC",
+    day_start_hour: int = 9,
+    day_end_hour: int = 17,
+    step_minutes: int = 30,
+) -> Dict[str, Any]:
+    """
+    Books onboarding sessions for the candidates, `group_size` per session.
+
+    Every session has the organizer's calendar and `host_emails` as hosts. The
+    events are created on `calendar_id` with the hosts and the group's
+    candidates invited.
+
+    Returns:
+        dict with "sessions" (attendees, start, end, event_id), "unscheduled"
+        (candidates with no free slot left in the range, or whose event
+        failed), "availability_unknown" and "api_calls".
+    """
+    windows = working_windows(start_date, end_date, time_zone, day_start_hour, day_end_hour)
+    if not windows:
+        raise ValueError("The date range contains no working days.")
+    duration = timedelta(minutes=duration_minutes)
+    step = timedelta(minutes=step_minutes)
+    candidates = list(dict.fromkeys(candidate_emails))
+    hosts = [calendar_id] + [h for h in dict.fromkeys(host_emails) if h != calendar_id]
+
+    busy, errors, freebusy_calls = query_free_busy(service, hosts + candidates, windows[0][0], windows[-1][1])
+    # Booked sessions are added here, so later groups don't overlap them
+    host_busy = merge_intervals([interval for host in hosts for interval in busy.get(host, [])])
+
+    planned: List[Tuple[List[str], Interval]] = []
+    unscheduled: List[str] = []
+    for i in range(0, len(candidates), group_size):
+        group = candidates[i:i + group_size]
+        group_busy = merge_intervals(host_busy + [interval for email in group for interval in busy.get(email, [])])
+        slot = first_slot(group_busy, windows, duration, step)
+        if slot is None:
+            unscheduled.extend(group)
+            continue
+        planned.append((group, slot))
+        host_busy = merge_intervals(host_busy + [slot])
+
+    events = [
+        {
+            "summary": title,
+            "description": description,
+            "start": {"dateTime": start.isoformat(), "timeZone": time_zone},
+            "end": {"dateTime": end.isoformat(), "timeZone": time_zone},
+            "attendees": [{"email": email} for email in hosts[1:] + group],
+        }
+        for group, (start, end) in planned
+    ]
+    created, insert_errors, batch_calls = insert_events(service, calendar_id, events)
+
+    sessions, failed = [], []
+    for (group, (start, end)), event, error in zip(planned, created, insert_errors):
+        if event is None:
+            unscheduled.extend(group)
+            failed.append({"attendees": group, "error": error})
+            continue
+        sessions.append({
+            "attendees": group,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "event_id": event.get("id"),
+            "link": event.get("htmlLink"),
+        })
+    return {
+        "sessions": sessions,
+        "unscheduled": unscheduled,
+        "failed": failed,
+        "availability_unknown": sorted(errors),
+        "api_calls": {"freebusy": freebusy_calls, "batch": batch_calls},
+    }
@@ -0,0 +1,241 @@
+"""
+Local per-user index of Drive file metadata, for resolving file names to IDs.
+
+Looking a sheet up by name costs a remote Drive search on every request.
+`DriveIndex` keeps name, ID, mimeType and modifiedTime for each user's files in
+a local SQLite database and answers lookups from it, with fuzzy name matching.
+
+An index is filled by one paginated `files.list` with a field mask. It is kept
+fresh by replaying `changes.list` from the start page token saved when the
+listing began, so a refresh only transfers what changed. Results of remote
+searches can be added with `upsert`, so a file found remotely is found locally
+the next time.
+
+Usage:
+    index = DriveIndex("drive_index.db")
+    drive = googleapiclient.discovery.build("drive", "v3", credentials=creds)
+    index.refresh(user_email, drive)              # full listing first time, changes after
+    index.lookup(user_email, "Q3 candidates")     # [{"id", "name", "mimeType", "modifiedTime", "score"}, ...]
+"""
+import difflib
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+FILE_FIELDS = "id,name,mimeType,modifiedTime"
+LIST_FIELDS = f"nextPageToken,files({FILE_FIELDS})"
+CHANGE_FIELDS = f"nextPageToken,newStartPageToken,changes(fileId,removed,file({FILE_FIELDS},trashed))"
+PAGE_SIZE = 1000
+
+# Lowest similarity a fuzzy match needs to be returned
+DEFAULT_CUTOFF = 0.6
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    user TEXT NOT NULL,
+    id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    name_key TEXT NOT NULL,
+    mime_type TEXT,
+    modified_time TEXT,
+    PRIMARY KEY (user, id)
+);
+CREATE INDEX IF NOT EXISTS files_by_name ON files (user, name_key);
+CREATE TABLE IF NOT EXISTS sync_state (
+    user TEXT PRIMARY KEY,
+    page_token TEXT,
+    synced_at REAL NOT NULL
+);
+"""
+
+_EXTENSIONS = re.compile(r"\.(xlsx|xls|csv|gsheet|docx|pdf)$")
+_SEPARATORS = re.compile(r"[\s_\-.]+")
+
+
+def name_key(name: str) -> str:
+    """Case-, separator- and extension-insensitive form of a file name."""
+    return _SEPARATORS.sub(" ", _EXTENSIONS.sub("", name.strip().casefold())).strip()
+
+
+def _score(query: str, key: str) -> float:
+    if query == key:
+        return 1.0
+    if query in key:
+        # Substring matches rank above fuzzy ones, closer lengths first
+        return 0.8 + 0.2 * len(query) / len(key)
+    matcher = difflib.SequenceMatcher(None, query, key)
+    # The quick upper bounds skip most non-matches without the full comparison
+    if matcher.real_quick_ratio() < DEFAULT_CUTOFF or matcher.quick_ratio() < DEFAULT_CUTOFF:
+        return 0.0
+    ratio = matcher.ratio()
+    return ratio * 0.8 if ratio >= DEFAULT_CUTOFF else 0.0
+
+
+class DriveIndex:
+    """
+    Per-user Drive file metadata in a local SQLite database.
+
+    Args:
+        db_path: Path of the SQLite database file. Created if missing.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        # Decoded (name_key, row) lists per user, dropped whenever the user's files change
+        self._names: Dict[str, List[Tuple[str, Dict[str, Any]]]] = {}
+
+    # --- Syncing ---
+
+    def synced_at(self, user: str) -> Optional[float]:
+        with self._lock:
+            row = self._conn.execute("SELECT synced_at FROM sync_state WHERE user = ?", (user,)).fetchone()
+        return row[0] if row else None
+
+    def refresh(self, user: str, drive, full: bool = False) -> Dict[str, int]:
+        """
+        Brings the user's index up to date: a full listing the first time (or
+        when `full` is set), otherwise the changes since the last refresh.
+
+        Args:
+            user: The user the index belongs to.
+            drive: A Drive v3 service for that user, from googleapiclient's `build`.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT page_token FROM sync_state WHERE user = ?", (user,)).fetchone()
+        if full or not row or not row[0]:
+            return self._full_sync(user, drive)
+        return self._apply_changes(user, drive, row[0])
+
+    def _full_sync(self, user: str, drive) -> Dict[str, int]:
+        # Take the change token first, so changes made during the listing are replayed next time
+        page_token = drive.changes().getStartPageToken().execute()["startPageToken"]
+        files, request_token = [], None
+        while True:
+            response = drive.files().list(
+                q="trashed = false",
+                fields=LIST_FIELDS,
+                pageSize=PAGE_SIZE,
+                pageToken=request_token,
+            ).execute()
+            files.extend(response.get("files", []))
+            request_token = response.get("nextPageToken")
+            if not request_token:
+                break
+        with self._lock, self._transaction():
+            self._conn.execute("DELETE FROM files WHERE user = ?", (user,))
+            self._insert(user, files)
+            self._save_token(user, page_token)
+            self._names.pop(user, None)
+        return {"listed": len(files)}
+
+    def _apply_changes(self, user: str, drive, page_token: str) -> Dict[str, int]:
+        upserts: Dict[str, Dict[str, Any]] = {}
+        removed = set()
+        while True:
+            response = drive.changes().list(
+                pageToken=page_token,
+                spaces="drive",
+                includeRemoved=True,
+                fields=CHANGE_FIELDS,
+                pageSize=PAGE_SIZE,
+            ).execute()
+            for change in response.get("changes", []):
+                file = change.get("file")
+                if change.get("removed") or not file or file.get("trashed"):
+                    removed.add(change["fileId"])
+                    upserts.pop(change["fileId"], None)
+                else:
+                    upserts[file["id"]] = file
+                    removed.discard(file["id"])
+            if "newStartPageToken" in response:
+                page_token = response["newStartPageToken"]
+                break
+            page_token = response["nextPageToken"]
+        with self._lock, self._transaction():
+            self._conn.executemany("DELETE FROM files WHERE user = ? AND id = ?", [(user, i) for i in removed])
+            self._insert(user, upserts.values())
+            self._save_token(user, page_token)
+            if upserts or removed:
+                self._names.pop(user, None)
+        return {"updated": len(upserts), "removed": len(removed)}
+
+    def upsert(self, user: str, files: Iterable[Dict[str, Any]]):
+        """Adds or updates files found some other way, e.g. by a remote search."""
+        files = [f for f in files if f.get("id") and f.get("name")]
+        if not files:
+            return
+        with self._lock:
+            self._insert(user, files)
+            self._names.pop(user, None)
+
+    @contextmanager
+    def _transaction(self):
+        """BEGIN ... COMMIT, rolled back if the block raises. Hold self._lock around it."""
+        self._conn.execute("BEGIN")
+        try:
+            yield
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    def _insert(self, user: str, files: Iterable[Dict[str, Any]]):
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO files (user, id, name, name_key, mime_type, modified_time) VALUES (?, ?, ?, ?, ?, ?)",
+            [(user, f["id"], f["name"], name_key(f["name"]), f.get("mimeType"), f.get("modifiedTime")) for f in files],
+        )
+
+    def _save_token(self, user: str, page_token: str):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO sync_state (user, page_token, synced_at) VALUES (?, ?, ?)",
+            (user, page_token, time.time()),
+        )
+
+    # --- Lookup ---
+
+    def lookup(self, user: str, name: str, limit: int = 5, mime_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Files whose name matches `name`, best first: exact matches (ignoring case,
+        separators and extension), then names containing it, then similar names.
+        Ties go to the most recently modified file.
+        """
+        query = name_key(name)
+        if not query:
+            return []
+        matches = []
+        for key, row in self._user_names(user):
+            if mime_type and row["mimeType"] != mime_type:
+                continue
+            score = _score(query, key)
+            if score:
+                matches.append({**row, "score": round(score, 3)})
+        matches.sort(key=lambda m: (m["score"], m["modifiedTime"] or ""), reverse=True)
+        return matches[:limit]
+
+    def _user_names(self, user: str) -> List[Tuple[str, Dict[str, Any]]]:
+        # Under the lock, so the read never lands inside another thread's transaction
+        # and a list decoded before a write is never cached after it
+        with self._lock:
+            names = self._names.get(user)
+            if names is None:
+                rows = self._conn.execute(
+                    "SELECT name_key, id, name, mime_type, modified_time FROM files WHERE user = ?", (user,)
+                ).fetchall()
+                names = [
+                    (key, {"id": file_id, "name": name, "mimeType": mime, "modifiedTime": modified})
+                    for key, file_id, name, mime, modified in rows
+                ]
+                self._names[user] = names
+        return names
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
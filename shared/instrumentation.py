@@ -0,0 +1,322 @@
+"""
+OpenTelemetry tracing and metrics for the custom tools and callbacks.
+
+Decorate a tool or callback with `@instrument()` to run it inside a span and
+record its duration in the `adk.tool.duration` / `adk.callback.duration`
+histograms. Inside it, `set_attributes(rows=..., bytes=..., cache_hit=...)`
+adds details to the current span. Mongo commands (via a pymongo
+`CommandListener`) and outbound `requests` calls are timed too, as child spans
+of whatever tool issued them and in the `mongo.command.duration` and
+`http.client.duration` histograms.
+
+Instrumentation is off unless one of these is set (in the environment or
+.env) before the agents are imported:
+    INSTRUMENTATION_ENABLED=1     record spans and metrics (e.g. for ADK's own exporters)
+    OTEL_EXPORTER_OTLP_ENDPOINT   export spans and metrics over OTLP/HTTP
+    PROMETHEUS_METRICS_PORT       serve metrics in Prometheus text format on :PORT/metrics
+
+When it is off, `@instrument()` returns the function unchanged and
+`set_attributes` returns immediately, so the disabled cost is one function call.
+"""
+import functools
+import inspect
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+from dotenv import load_dotenv
+from pymongo import monitoring
+
+try:
+    from opentelemetry import trace
+    from opentelemetry.sdk.metrics import Histogram, MeterProvider
+    from opentelemetry.sdk.metrics.export import HistogramData, InMemoryMetricReader, PeriodicExportingMetricReader
+    from opentelemetry.sdk.metrics.view import ExplicitBucketHistogramAggregation, View
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    from opentelemetry.trace import ProxyTracerProvider, Status, StatusCode
+except ImportError:  # the SDK is optional; without it everything stays a no-op
+    trace = None
+
+# The agents load .env after their imports, so read it here before deciding
+load_dotenv()
+
+ENABLED = trace is not None and bool(
+    os.getenv("INSTRUMENTATION_ENABLED", "").lower() in ("1", "true", "yes")
+    or os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
+    or os.getenv("PROMETHEUS_METRICS_PORT")
+)
+
+SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "adk-nextleap")
+
+# Seconds; the OTel defaults are tuned for milliseconds
+LATENCY_BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]
+
+_tracer = None
+_histograms: Dict[str, Any] = {}
+_prometheus_reader = None
+_configured = False
+_configure_lock = threading.Lock()
+
+
+def configure_instrumentation():
+    """Sets up providers, exporters, the Mongo listener and HTTP timing. Idempotent."""
+    global _tracer, _prometheus_reader, _configured
+    with _configure_lock:
+        if _configured or not ENABLED:
+            return
+        _configured = True
+
+        resource = Resource.create({"service.name": SERVICE_NAME})
+        otlp_endpoint = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
+
+        # Leave a provider installed by someone else (e.g. `adk web --trace_to_cloud`) in place
+        if isinstance(trace.get_tracer_provider(), ProxyTracerProvider):
+            tracer_provider = TracerProvider(resource=resource)
+            if otlp_endpoint:
+                from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+                tracer_provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+            trace.set_tracer_provider(tracer_provider)
+        _tracer = trace.get_tracer(__name__)
+
+        readers = []
+        if otlp_endpoint:
+            from opentelemetry.exporter.otlp.proto.http.metric_exporter import OTLPMetricExporter
+            readers.append(PeriodicExportingMetricReader(OTLPMetricExporter()))
+        prometheus_port = os.getenv("PROMETHEUS_METRICS_PORT")
+        if prometheus_port:
+            _prometheus_reader = InMemoryMetricReader()
+            readers.append(_prometheus_reader)
+            start_prometheus_server(int(prometheus_port))
+        meter_provider = MeterProvider(
+            resource=resource,
+            metric_readers=readers,
+            views=[View(instrument_type=Histogram, aggregation=ExplicitBucketHistogramAggregation(LATENCY_BUCKETS))],
+        )
+        meter = meter_provider.get_meter(__name__)
+        for name, description in (
+            ("adk.tool.duration", "Duration of custom tool calls"),
+            ("adk.callback.duration", "Duration of agent callbacks"),
+            ("mongo.command.duration", "Duration of MongoDB commands"),
+            ("http.client.duration", "Duration of outbound HTTP requests"),
+        ):
+            _histograms[name] = meter.create_histogram(name, unit="s", description=description)
+
+        monitoring.register(MongoCommandTimer())
+        _instrument_requests()
+
+
+def _record(histogram: str, seconds: float, attributes: Dict[str, Any]):
+    _histograms[histogram].record(seconds, attributes)
+
+
+# ==============================================================================
+# Tools and callbacks
+# ==============================================================================
+
+def instrument(name: Optional[str] = None, kind: str = "tool") -> Callable:
+    """
+    Decorator that traces and times a tool or callback, sync or async.
+
+    The wrapper keeps the wrapped signature, so ADK still builds the same
+    function declaration and still injects `tool_context`.
+
+    Args:
+        name: Span and metric name; defaults to the function name.
+        kind: "tool" or "callback", which selects the duration histogram.
+    """
+    def decorator(func):
+        if not ENABLED:
+            return func
+        configure_instrumentation()
+        span_name = f"{kind} {name or func.__name__}"
+        histogram = f"adk.{kind}.duration"
+        metric_attributes = {"name": name or func.__name__}
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with _tracer.start_as_current_span(span_name):
+                    started = time.perf_counter()
+                    status = "ok"
+                    try:
+                        return await func(*args, **kwargs)
+                    except Exception:
+                        status = "error"  # start_as_current_span records the exception on the span
+                        raise
+                    finally:
+                        _record(histogram, time.perf_counter() - started, {**metric_attributes, "status": status})
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _tracer.start_as_current_span(span_name):
+                started = time.perf_counter()
+                status = "ok"
+                try:
+                    return func(*args, **kwargs)
+                except Exception:
+                    status = "error"
+                    raise
+                finally:
+                    _record(histogram, time.perf_counter() - started, {**metric_attributes, "status": status})
+        return wrapper
+
+    return decorator
+
+
+def set_attributes(**attributes):
+    """Adds attributes (row counts, bytes, cache hits, ...) to the current span."""
+    if not ENABLED:
+        return
+    span = trace.get_current_span()
+    if span.is_recording():
+        span.set_attributes({k: v for k, v in attributes.items() if v is not None})
+
+
+# ==============================================================================
+# MongoDB and HTTP
+# ==============================================================================
+
+class MongoCommandTimer(monitoring.CommandListener):
+    """
+    Records every Mongo command as a histogram sample and a child span.
+
+    pymongo calls listeners on the thread that ran the command, so the span
+    is parented to the tool that issued it. The span is created after the
+    fact from the reported duration, so no per-request state is kept.
+    """
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._finish(event, "ok")
+
+    def failed(self, event):
+        self._finish(event, "error")
+
+    def _finish(self, event, status: str):
+        seconds = event.duration_micros / 1e6
+        _record("mongo.command.duration", seconds, {"command": event.command_name, "status": status})
+        end_ns = time.time_ns()
+        span = _tracer.start_span(
+            f"mongo {event.command_name}",
+            start_time=end_ns - event.duration_micros * 1000,
+            attributes={
+                "db.system": "mongodb",
+                "db.name": event.database_name,
+                "db.operation": event.command_name,
+            },
+        )
+        if status == "error":
+            span.set_status(Status(StatusCode.ERROR, str(event.failure)))
+        span.end(end_time=end_ns)
+
+
+def _instrument_requests():
+    """Times every request sent through `requests`, including google-auth token refreshes."""
+    import requests
+
+    original_send = requests.Session.send
+    if getattr(original_send, "_instrumented", False):
+        return
+
+    @functools.wraps(original_send)
+    def send(session, request, **kwargs):
+        url = urlsplit(request.url)
+        with _tracer.start_as_current_span(f"HTTP {request.method}") as span:
+            span.set_attributes({"http.method": request.method, "server.address": url.hostname or "", "url.path": url.path})
+            # Exceptions are recorded on the span by start_as_current_span
+            started = time.perf_counter()
+            status_code = 0
+            try:
+                response = original_send(session, request, **kwargs)
+                status_code = response.status_code
+                span.set_attribute("http.status_code", status_code)
+                return response
+            finally:
+                _record("http.client.duration", time.perf_counter() - started, {
+                    "method": request.method,
+                    "host": url.hostname or "",
+                    "status_code": status_code,
+                })
+
+    send._instrumented = True
+    requests.Session.send = send
+
+
+# ==============================================================================
+# Prometheus text endpoint
+# ==============================================================================
+
+def _prometheus_name(name: str, unit: str) -> str:
+    name = name.replace(".", "_").replace("-", "_")
+    return f"{name}_seconds" if unit == "s" and not name.endswith("_seconds") else name
+
+
+def _prometheus_labels(attributes: Dict[str, Any], extra: Optional[Dict[str, str]] = None) -> str:
+    labels = {**{k.replace(".", "_"): v for k, v in attributes.items()}, **(extra or {})}
+    if not labels:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in sorted(labels.items())
+    )
+    return "{" + body + "}"
+
+
+def render_prometheus() -> str:
+    """Renders the current histogram values in the Prometheus text exposition format."""
+    if _prometheus_reader is None:
+        return ""
+    data = _prometheus_reader.get_metrics_data()
+    lines = []
+    for resource_metrics in data.resource_metrics if data else []:
+        for scope_metrics in resource_metrics.scope_metrics:
+            for metric in scope_metrics.metrics:
+                if not isinstance(metric.data, HistogramData):
+                    continue  # only histograms are recorded here
+                name = _prometheus_name(metric.name, metric.unit)
+                lines.append(f"# HELP {name} {metric.description}")
+                lines.append(f"# TYPE {name} histogram")
+                for point in metric.data.data_points:
+                    attributes = dict(point.attributes)
+                    # OTel bucket counts are per bucket, Prometheus wants them cumulative
+                    cumulative = 0
+                    bounds = list(point.explicit_bounds) + [float("inf")]
+                    for bound, count in zip(bounds, point.bucket_counts):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else repr(float(bound))
+                        lines.append(f"{name}_bucket{_prometheus_labels(attributes, {'le': le})} {cumulative}")
+                    lines.append(f"{name}_sum{_prometheus_labels(attributes)} {point.sum}")
+                    lines.append(f"{name}_count{_prometheus_labels(attributes)} {point.count}")
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # keep scrapes out of the agent's console output
+
+
+def start_prometheus_server(port: int) -> ThreadingHTTPServer:
+    """Serves /metrics on a daemon thread."""
+    server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="prometheus-metrics", daemon=True).start()
+    print(f"--- Serving Prometheus metrics on http://localhost:{port}/metrics ---")
+    return server
@@ -0,0 +1,236 @@
+"""
+ApplicationIntegrationToolset that starts from a local snapshot of its spec.
+
+`ApplicationIntegrationToolset` fetches the connection details and generates
+the OpenAPI spec from the Integration Connectors backend in its constructor,
+so importing an agent module blocks on (and fails without) those remote
+calls. `CachedApplicationIntegrationToolset` takes the same arguments but does
+no I/O until its tools are first needed.
+
+On first use it loads the generated spec from a snapshot file keyed by
+project, location, integration/connection, triggers, entity operations,
+actions and tool naming, and builds the tools from it. When there is no
+snapshot it fetches one and writes it. A snapshot older than
+`revalidate_after_seconds` is still served, and a background refetch replaces
+it (and the tools) if the backend's spec has changed. The age is checked on
+every `get_tools`, so a long-running process keeps revalidating; after a failed
+refetch the next attempt waits another `revalidate_after_seconds`.
+
+Snapshots go to INTEGRATION_SPEC_CACHE_DIR (default ~/.cache/adk_integration_specs).
+Set INTEGRATION_SPEC_OFFLINE=1 to never contact the backend, e.g. to test
+against a checked-in snapshot.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.adk.auth.auth_tool import AuthConfig
+from google.adk.tools.application_integration_tool.application_integration_toolset import ApplicationIntegrationToolset
+from google.adk.tools.application_integration_tool.clients.connections_client import ConnectionsClient
+from google.adk.tools.application_integration_tool.clients.integration_client import IntegrationClient
+from google.adk.tools.base_toolset import BaseToolset
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "adk_integration_specs")
+
+SNAPSHOT_VERSION = 1
+
+
+class CachedApplicationIntegrationToolset(ApplicationIntegrationToolset):
+    """Drop-in ApplicationIntegrationToolset backed by a lazily loaded, revalidated spec snapshot."""
+
+    def __init__(
+        self,
+        project: str,
+        location: str,
+        connection_template_override: Optional[str] = None,
+        integration: Optional[str] = None,
+        triggers: Optional[List[str]] = None,
+        connection: Optional[str] = None,
+        entity_operations: Optional[Dict[str, List[str]]] = None,
+        actions: Optional[List[str]] = None,
+        tool_name_prefix: Optional[str] = "",
+        tool_instructions: Optional[str] = "",
+        service_account_json: Optional[str] = None,
+        auth_scheme=None,
+        auth_credential=None,
+        tool_filter=None,
+        cache_dir: Optional[str] = None,
+        revalidate_after_seconds: float = 3600,
+    ):
+        """
+        Takes the arguments of ApplicationIntegrationToolset, plus:
+
+        Args:
+            cache_dir: Snapshot directory; defaults to INTEGRATION_SPEC_CACHE_DIR.
+            revalidate_after_seconds: Age after which a served snapshot is refetched in the background.
+        """
+        if not integration and not (connection and (entity_operations or actions)):
+            raise ValueError(
+                "Invalid request, Either integration or (connection and"
+                " (entity_operations or actions)) should be provided."
+            )
+        # Same state as the parent constructor sets up, minus the remote fetch
+        BaseToolset.__init__(self, tool_filter=tool_filter)
+        self.project = project
+        self.location = location
+        self._connection_template_override = connection_template_override
+        self._integration = integration
+        self._triggers = triggers
+        self._connection = connection
+        self._entity_operations = entity_operations
+        self._actions = actions
+        self._tool_name_prefix = tool_name_prefix
+        self._tool_instructions = tool_instructions
+        self._service_account_json = service_account_json
+        self._auth_scheme = auth_scheme
+        self._auth_credential = auth_credential
+        self._auth_config = None
+        if auth_scheme:
+            self._auth_config = AuthConfig(auth_scheme=auth_scheme, raw_auth_credential=auth_credential)
+        self._openapi_toolset = None
+        self._tools = []
+
+        self.cache_dir = cache_dir or os.getenv("INTEGRATION_SPEC_CACHE_DIR", DEFAULT_CACHE_DIR)
+        self.revalidate_after_seconds = revalidate_after_seconds
+        self.offline = os.getenv("INTEGRATION_SPEC_OFFLINE", "").lower() in ("1", "true", "yes")
+        self._loaded_spec: Optional[Dict[str, Any]] = None
+        self._load_lock = asyncio.Lock()
+        self._revalidation: Optional[asyncio.Task] = None
+        self._revalidation_attempted_at = 0.0
+
+    # --- Snapshot keying and storage ---
+
+    def snapshot_key(self) -> str:
+        fields = {
+            "project": self.project,
+            "location": self.location,
+            "connection_template_override": self._connection_template_override,
+            "integration": self._integration,
+            "triggers": self._triggers,
+            "connection": self._connection,
+            "entity_operations": self._entity_operations,
+            "actions": self._actions,
+            "tool_name_prefix": self._tool_name_prefix,
+            "tool_instructions": self._tool_instructions,
+        }
+        return hashlib.sha256(json.dumps(fields, sort_keys=True).encode()).hexdigest()
+
+    def snapshot_path(self) -> str:
+        name = self._integration or self._connection
+        return os.path.join(self.cache_dir, f"{name}-{self.snapshot_key()[:16]}.json")
+
+    def _read_snapshot(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.snapshot_path(), "r") as f:
+                snapshot = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        return snapshot if snapshot.get("version") == SNAPSHOT_VERSION else None
+
+    def _write_snapshot(self, spec: Dict[str, Any], connection_details: Dict[str, Any]) -> Dict[str, Any]:
+        snapshot = {
+            "version": SNAPSHOT_VERSION,
+            "fetched_at": time.time(),
+            "key": self.snapshot_key(),
+            "spec": spec,
+            "connection_details": connection_details,
+            # For reading and diffing the snapshot; the tools are rebuilt from the spec
+            "tools": [{"name": t.name, "description": t.description} for t in self._tools],
+        }
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(snapshot, f, indent=1)
+        os.replace(tmp_path, self.snapshot_path())
+        return snapshot
+
+    # --- Fetching and building ---
+
+    def _fetch_spec(self) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """The remote calls ApplicationIntegrationToolset makes in its constructor."""
+        integration_client = IntegrationClient(
+            self.project,
+            self.location,
+            self._connection_template_override,
+            self._integration,
+            self._triggers,
+            self._connection,
+            self._entity_operations,
+            self._actions,
+            self._service_account_json,
+        )
+        if self._integration:
+            return integration_client.get_openapi_spec_for_integration(), {}
+        connection_details = ConnectionsClient(
+            self.project, self.location, self._connection, self._service_account_json
+        ).get_connection_details()
+        spec = integration_client.get_openapi_spec_for_connection(self._tool_name_prefix, self._tool_instructions)
+        return spec, connection_details
+
+    def _build_tools(self, spec: Dict[str, Any], connection_details: Dict[str, Any]):
+        previous = (self._tools, self._openapi_toolset)
+        self._tools, self._openapi_toolset = [], None
+        try:
+            self._parse_spec_to_toolset(spec, connection_details)
+        except Exception:
+            self._tools, self._openapi_toolset = previous
+            raise
+
+    async def _ensure_loaded(self):
+        if self._loaded_spec is not None:
+            return
+        async with self._load_lock:
+            if self._loaded_spec is not None:
+                return
+            snapshot = await asyncio.to_thread(self._read_snapshot)
+            if snapshot is None:
+                if self.offline:
+                    raise ValueError(
+                        f"No spec snapshot at {self.snapshot_path()} and INTEGRATION_SPEC_OFFLINE is set."
+                    )
+                print(f"[Integration spec cache] No snapshot for {self._integration or self._connection}; fetching.")
+                spec, connection_details = await asyncio.to_thread(self._fetch_spec)
+                self._build_tools(spec, connection_details)
+                snapshot = await asyncio.to_thread(self._write_snapshot, spec, connection_details)
+            else:
+                self._build_tools(snapshot["spec"], snapshot["connection_details"])
+            self._loaded_spec = snapshot
+
+    def _maybe_revalidate(self):
+        """Starts a background refetch when the served snapshot is stale and none is running."""
+        if self.offline or (self._revalidation and not self._revalidation.done()):
+            return
+        now = time.time()
+        checked_at = max(self._loaded_spec["fetched_at"], self._revalidation_attempted_at)
+        if now - checked_at > self.revalidate_after_seconds:
+            self._revalidation_attempted_at = now
+            self._revalidation = asyncio.create_task(self._revalidate(self._loaded_spec))
+
+    async def _revalidate(self, snapshot: Dict[str, Any]):
+        try:
+            spec, connection_details = await asyncio.to_thread(self._fetch_spec)
+        except Exception as e:
+            print(f"[Integration spec cache] Revalidation failed, keeping the snapshot: {e}")
+            return
+        if spec == snapshot["spec"] and connection_details == snapshot["connection_details"]:
+            # Unchanged; just restart the clock
+            self._loaded_spec = await asyncio.to_thread(self._write_snapshot, spec, connection_details)
+            return
+        print(f"[Integration spec cache] Spec for {self._integration or self._connection} changed; rebuilding tools.")
+        self._build_tools(spec, connection_details)
+        self._loaded_spec = await asyncio.to_thread(self._write_snapshot, spec, connection_details)
+
+    async def get_tools(self, readonly_context: Optional[ReadonlyContext] = None):
+        await self._ensure_loaded()
+        self._maybe_revalidate()
+        return await super().get_tools(readonly_context)
+
+    async def close(self) -> None:
+        if self._revalidation and not self._revalidation.done():
+            self._revalidation.cancel()
+        await super().close()
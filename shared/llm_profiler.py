@@ -0,0 +1,248 @@
+"""
+Size and timing profiler for model calls, as a before/after-model callback pair.
+
+For every model call it records what was actually sent: contents count,
+estimated tokens by role (system, user, model, tools), tool-declaration bytes,
+inline-data bytes and bytes injected by other callbacks (e.g. the Excel JSON
+from `simple_before_model_modifier`). Together with the model wall time and
+the token counts the model reports back, this shows why a turn is slow or expensive.
+
+A rolling window of calls is kept per agent for `summary()`. A sampled
+fraction of requests is written to `dump_dir` as JSON, with inline data
+replaced by its size, instead of being printed.
+
+Usage:
+    profiler = LlmRequestProfiler(dump_dir="llm_profiles", sample_rate=0.05)
+    agent = LlmAgent(
+        ...,
+        before_model_callback=[simple_before_model_modifier, profiler.before_model],
+        after_model_callback=profiler.after_model,
+    )
+
+Put `before_model` last so it sees the request after other callbacks have
+modified it, and `after_model` first so it times the model alone.
+"""
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+
+# Rough rule of thumb for English text and JSON
+CHARS_PER_TOKEN = 4
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _part_chars(part) -> int:
+    if part.text:
+        return len(part.text)
+    if part.function_call:
+        return len(part.function_call.name or "") + len(json.dumps(part.function_call.args or {}, default=str))
+    if part.function_response:
+        return len(part.function_response.name or "") + len(json.dumps(part.function_response.response or {}, default=str))
+    return 0
+
+
+def _system_instruction_chars(config) -> int:
+    instruction = config.system_instruction if config else None
+    if not instruction:
+        return 0
+    if isinstance(instruction, str):
+        return len(instruction)
+    parts = getattr(instruction, "parts", None) or []
+    return sum(_part_chars(p) for p in parts)
+
+
+class LlmRequestProfiler:
+    """Records per-call request size and model wall time, per agent."""
+
+    def __init__(
+        self,
+        dump_dir: Optional[str] = None,
+        sample_rate: Optional[float] = None,
+        window: int = 200,
+        injected_markers: Sequence[Tuple[str, str]] = (),
+    ):
+        """
+        Args:
+            dump_dir: Where sampled request dumps and summaries go; defaults to
+                LLM_PROFILE_DIR. Nothing is written when unset.
+            sample_rate: Fraction of requests to dump; defaults to LLM_PROFILE_SAMPLE_RATE or 0.
+            window: Number of recent calls kept per agent for the summary.
+            injected_markers: (start, end) marker pairs around content other
+                callbacks inject into the prompt; the text between them is
+                counted as injected-attachment bytes.
+        """
+        self.dump_dir = dump_dir or os.getenv("LLM_PROFILE_DIR")
+        self.sample_rate = sample_rate if sample_rate is not None else float(os.getenv("LLM_PROFILE_SAMPLE_RATE", "0"))
+        self.window = window
+        self.injected_markers = list(injected_markers)
+        self._pending: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._records: Dict[str, Deque[Dict[str, Any]]] = defaultdict(lambda: deque(maxlen=self.window))
+        self._lock = threading.Lock()
+
+    # --- Callbacks ---
+
+    def before_model(self, callback_context: CallbackContext, llm_request: LlmRequest) -> None:
+        record = self.profile_request(llm_request)
+        record["agent"] = callback_context.agent_name
+        record["invocation_id"] = callback_context.invocation_id
+        dump = None
+        if self.dump_dir and self.sample_rate > 0 and random.random() < self.sample_rate:
+            dump = self._request_dump(llm_request)
+        with self._lock:
+            # A previous call whose after_model never ran (e.g. a cache hit) is simply replaced
+            self._pending[(callback_context.invocation_id, callback_context.agent_name)] = {
+                "record": record,
+                "dump": dump,
+                "started": time.perf_counter(),
+            }
+        return None
+
+    def after_model(self, callback_context: CallbackContext, llm_response: LlmResponse) -> None:
+        if llm_response.partial:
+            return None  # streamed chunk; the final response closes the call
+        with self._lock:
+            pending = self._pending.pop((callback_context.invocation_id, callback_context.agent_name), None)
+        if pending is None:
+            return None
+        record = pending["record"]
+        record["model_ms"] = (time.perf_counter() - pending["started"]) * 1000
+        usage = llm_response.usage_metadata
+        record["prompt_tokens"] = usage.prompt_token_count if usage else None
+        record["response_tokens"] = usage.candidates_token_count if usage else None
+        record["error_code"] = llm_response.error_code
+        with self._lock:
+            self._records[record["agent"]].append(record)
+        if pending["dump"] is not None:
+            self._write_dump(record, pending["dump"])
+        return None
+
+    # --- Measurement ---
+
+    def profile_request(self, llm_request: LlmRequest) -> Dict[str, Any]:
+        """Measures one request without modifying it."""
+        chars_by_role: Dict[str, int] = defaultdict(int)
+        inline_bytes = 0
+        injected_bytes = 0
+        for content in llm_request.contents or []:
+            for part in content.parts or []:
+                chars_by_role[content.role or "user"] += _part_chars(part)
+                if part.inline_data and part.inline_data.data:
+                    inline_bytes += len(part.inline_data.data)
+                if part.text:
+                    injected_bytes += self._injected_bytes(part.text)
+
+        config = llm_request.config
+        chars_by_role["system"] = _system_instruction_chars(config)
+        tool_bytes = sum(
+            len(tool.model_dump_json(exclude_none=True)) for tool in (config.tools if config and config.tools else [])
+            if hasattr(tool, "model_dump_json")
+        )
+        chars_by_role["tools"] = tool_bytes
+
+        tokens_by_role = {role: chars // CHARS_PER_TOKEN for role, chars in chars_by_role.items()}
+        return {
+            "model": llm_request.model,
+            "contents": len(llm_request.contents or []),
+            "estimated_tokens": sum(tokens_by_role.values()),
+            "estimated_tokens_by_role": tokens_by_role,
+            "tool_declaration_bytes": tool_bytes,
+            "inline_data_bytes": inline_bytes,
+            "injected_attachment_bytes": injected_bytes,
+        }
+
+    def _injected_bytes(self, text: str) -> int:
+        total = 0
+        for start_marker, end_marker in self.injected_markers:
+            start = text.find(start_marker)
+            while start != -1:
+                end = text.find(end_marker, start)
+                if end == -1:
+                    end = len(text)
+                total += len(text[start + len(start_marker):end].encode())
+                start = text.find(start_marker, end)
+        return total
+
+    # --- Reporting ---
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Rolling per-agent summary over the last `window` calls."""
+        with self._lock:
+            records = {agent: list(calls) for agent, calls in self._records.items()}
+        result = {}
+        for agent, calls in records.items():
+            model_ms = sorted(c["model_ms"] for c in calls)
+            roles = sorted({role for c in calls for role in c["estimated_tokens_by_role"]})
+            reported = [c["prompt_tokens"] for c in calls if c["prompt_tokens"] is not None]
+            result[agent] = {
+                "calls": len(calls),
+                "model_p50_ms": _percentile(model_ms, 50),
+                "model_p95_ms": _percentile(model_ms, 95),
+                "mean_contents": sum(c["contents"] for c in calls) / len(calls),
+                "mean_estimated_tokens": sum(c["estimated_tokens"] for c in calls) / len(calls),
+                "mean_estimated_tokens_by_role": {
+                    role: sum(c["estimated_tokens_by_role"].get(role, 0) for c in calls) / len(calls) for role in roles
+                },
+                "mean_prompt_tokens": sum(reported) / len(reported) if reported else None,
+                "mean_tool_declaration_bytes": sum(c["tool_declaration_bytes"] for c in calls) / len(calls),
+                "max_inline_data_bytes": max(c["inline_data_bytes"] for c in calls),
+                "max_injected_attachment_bytes": max(c["injected_attachment_bytes"] for c in calls),
+            }
+        return result
+
+    def write_summary(self, path: Optional[str] = None) -> Optional[str]:
+        """Writes summary() as JSON, by default to `<dump_dir>/summary.json`."""
+        if path is None:
+            if not self.dump_dir:
+                return None
+            os.makedirs(self.dump_dir, exist_ok=True)
+            path = os.path.join(self.dump_dir, "summary.json")
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent=2)
+        return path
+
+    def _request_dump(self, llm_request: LlmRequest) -> Dict[str, Any]:
+        dump = llm_request.model_dump(mode="json", exclude_none=True)
+        # Replace base64 payloads with their original size
+        for content, dumped in zip(llm_request.contents or [], dump.get("contents", [])):
+            for part, dumped_part in zip(content.parts or [], dumped.get("parts", [])):
+                if part.inline_data and part.inline_data.data:
+                    dumped_part["inline_data"]["data"] = f"<{len(part.inline_data.data)} bytes>"
+        return dump
+
+    def _write_dump(self, record: Dict[str, Any], dump: Dict[str, Any]):
+        agent_dir = os.path.join(self.dump_dir, record["agent"])
+        os.makedirs(agent_dir, exist_ok=True)
+        # An invocation makes several model calls a second, and workers can share dump_dir
+        filename = f"{time.strftime('%Y%m%dT%H%M%S')}-{record['agent']}-{record['invocation_id']}-{uuid.uuid4().hex[:8]}.json"
+        with open(os.path.join(agent_dir, filename), "w") as f:
+            json.dump({"profile": record, "request": dump}, f, indent=2, default=str)
+
+
+def profile_agent(agent, profiler: LlmRequestProfiler):
+    """
+    Adds the profiler's callbacks to `agent` and its LLM sub-agents, in place,
+    keeping the callbacks they already have.
+    """
+    if hasattr(agent, "before_model_callback"):
+        before = agent.before_model_callback
+        before = before if isinstance(before, list) else [before] if before else []
+        after = agent.after_model_callback
+        after = after if isinstance(after, list) else [after] if after else []
+        agent.before_model_callback = before + [profiler.before_model]
+        agent.after_model_callback = [profiler.after_model] + after
+    for sub_agent in agent.sub_agents:
+        profile_agent(sub_agent, profiler)
@@ -0,0 +1,302 @@
+"""
+Exact-match LLM response cache, as a before/after-model callback pair.
+
+For agents whose requests repeat verbatim (low temperature, fixed prompts), a
+request that was already answered gets the stored `LlmResponse` back from
+`before_model`, so ADK skips the model call entirely. The key is a SHA-256 of
+the canonical JSON of the model, generation config, system instruction, tool
+declarations and contents. Function call ids are left out because ADK
+generates new ones every run. `after_model` stores complete responses that
+are not errors. Responses that call tools are only stored with
+`cache_tool_calls=True`, since serving one runs the tools again without the
+model having looked at anything new; leave it off for agents whose tools have
+side effects.
+
+Entries live in an in-memory LRU and, when `disk_dir` is set, in one JSON file
+per key under it. Both tiers expire entries after `ttl_seconds`, and both
+evict the least recently used entries past their size budget.
+
+Caching is per-agent opt-in: construct the cache with `enabled=True` and add
+the callbacks to the agent:
+
+    response_cache = LlmResponseCache(enabled=True, disk_dir=os.getenv("LLM_RESPONSE_CACHE_DIR"))
+    agent = LlmAgent(
+        ...,
+        before_model_callback=response_cache.before_model,
+        after_model_callback=response_cache.after_model,
+    )
+
+Put `before_model` after callbacks that modify the request, so the key covers
+what would actually be sent. Set LLM_RESPONSE_CACHE=0 to turn every cache off,
+including the ones agents opted into.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, Optional, Tuple
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+
+# Config fields that change per call without changing the answer
+VOLATILE_CONFIG_FIELDS = ("http_options", "labels", "tools")
+
+
+def _strip_call_ids(contents: Any) -> Any:
+    for content in contents:
+        for part in content.get("parts", []):
+            for key in ("function_call", "function_response"):
+                if key in part:
+                    part[key].pop("id", None)
+    return contents
+
+
+def request_cache_key(llm_request: LlmRequest) -> str:
+    """Canonical hash of everything that determines the model's answer."""
+    dumped = llm_request.model_dump(mode="json", exclude_none=True, include={"model", "config", "contents"})
+    config = dumped.get("config", {})
+    tools = config.get("tools", [])
+    for field in VOLATILE_CONFIG_FIELDS:
+        config.pop(field, None)
+    canonical = {
+        "model": dumped.get("model"),
+        "config": config,  # includes system_instruction
+        "tools": tools,
+        "contents": _strip_call_ids(dumped.get("contents", [])),
+    }
+    encoded = json.dumps(canonical, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def _is_cacheable(llm_response: LlmResponse, cache_tool_calls: bool) -> bool:
+    if not (
+        not llm_response.partial
+        and not llm_response.error_code
+        and not llm_response.interrupted
+        and llm_response.content
+        and llm_response.content.parts
+    ):
+        return False
+    return cache_tool_calls or not any(part.function_call for part in llm_response.content.parts)
+
+
+class _MemoryTier:
+    """LRU of serialized responses, bounded by entry count and bytes."""
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._bytes = 0
+
+    def get(self, key: str, now: float) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, payload = entry
+        if expires_at <= now:
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return payload
+
+    def put(self, key: str, payload: str, expires_at: float):
+        if key in self._entries:
+            self._remove(key)
+        if len(payload) > self.max_bytes:
+            return
+        self._entries[key] = (expires_at, payload)
+        self._bytes += len(payload)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key: str):
+        _, payload = self._entries.pop(key)
+        self._bytes -= len(payload)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class _DiskTier:
+    """One JSON file per key, sharded by key prefix; evicts least recently used files past max_bytes."""
+
+    def __init__(self, root_dir: str, max_bytes: int):
+        self.root_dir = root_dir
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        # Reads and writes run on worker threads
+        self._lock = threading.Lock()
+        os.makedirs(root_dir, exist_ok=True)
+        self._bytes = sum(os.path.getsize(path) for path, _ in self._files())
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root_dir, key[:2], f"{key}.json")
+
+    def _files(self):
+        for directory, _, files in os.walk(self.root_dir):
+            for name in files:
+                if name.endswith(".json"):
+                    path = os.path.join(directory, name)
+                    yield path, os.path.getmtime(path)
+
+    def get(self, key: str, now: float) -> Optional[Tuple[float, str]]:
+        path = self._path(key)
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if entry["expires_at"] <= now:
+            with self._lock:
+                self._delete(path)
+            return None
+        os.utime(path)  # mtime doubles as the LRU clock
+        return entry["expires_at"], entry["response"]
+
+    def put(self, key: str, payload: str, expires_at: float):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = json.dumps({"expires_at": expires_at, "response": payload})
+        previous = os.path.getsize(path) if os.path.exists(path) else 0
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._bytes += len(data) - previous
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        for path, _ in sorted(self._files(), key=lambda item: item[1]):
+            if self._bytes <= self.max_bytes * 0.9:  # leave headroom so every put doesn't rescan
+                break
+            self._delete(path)
+            self.evictions += 1
+
+    def _delete(self, path: str):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+            self._bytes -= size
+        except FileNotFoundError:
+            pass
+
+
+class LlmResponseCache:
+    """Returns stored responses for requests that exactly match an earlier one."""
+
+    def __init__(
+        self,
+        ttl_seconds: float = 3600,
+        max_entries: int = 1024,
+        max_memory_bytes: int = 32 * 2**20,
+        disk_dir: Optional[str] = None,
+        max_disk_bytes: int = 512 * 2**20,
+        enabled: bool = False,
+        cache_tool_calls: bool = False,
+    ):
+        """
+        Args:
+            ttl_seconds: How long a stored response may be served.
+            max_entries: Entry budget of the in-memory tier.
+            max_memory_bytes: Byte budget of the in-memory tier.
+            disk_dir: Directory of the on-disk tier; memory only when unset.
+            max_disk_bytes: Byte budget of the on-disk tier.
+            enabled: Whether the agent opts in. LLM_RESPONSE_CACHE=0 overrides it.
+            cache_tool_calls: Also store responses that call tools.
+        """
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled and os.getenv("LLM_RESPONSE_CACHE", "1") != "0"
+        self.cache_tool_calls = cache_tool_calls
+        self._memory = _MemoryTier(max_entries, max_memory_bytes)
+        self._disk = _DiskTier(disk_dir, max_disk_bytes) if disk_dir else None
+        self._pending: Dict[Tuple[str, str], str] = {}
+        self._counts: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._lock = threading.Lock()
+
+    # --- Callbacks ---
+
+    async def before_model(self, callback_context: CallbackContext, llm_request: LlmRequest) -> Optional[LlmResponse]:
+        if not self.enabled:
+            return None
+        key = request_cache_key(llm_request)
+        payload, tier = await self._lookup(key)
+        agent = callback_context.agent_name
+        with self._lock:
+            if payload is None:
+                self._counts[agent]["misses"] += 1
+                self._pending[(callback_context.invocation_id, agent)] = key
+                return None
+            self._counts[agent][f"{tier}_hits"] += 1
+        response = LlmResponse.model_validate_json(payload)
+        response.custom_metadata = {**(response.custom_metadata or {}), "llm_response_cache": tier}
+        return response
+
+    async def after_model(self, callback_context: CallbackContext, llm_response: LlmResponse) -> None:
+        if not self.enabled or llm_response.partial:
+            return None
+        with self._lock:
+            key = self._pending.pop((callback_context.invocation_id, callback_context.agent_name), None)
+        if key is None or not _is_cacheable(llm_response, self.cache_tool_calls):
+            return None
+        payload = llm_response.model_dump_json(exclude_none=True)
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._memory.put(key, payload, expires_at)
+            self._counts[callback_context.agent_name]["stores"] += 1
+        if self._disk:
+            await asyncio.to_thread(self._disk.put, key, payload, expires_at)
+        return None
+
+    async def _lookup(self, key: str) -> Tuple[Optional[str], Optional[str]]:
+        now = time.time()
+        with self._lock:
+            payload = self._memory.get(key, now)
+        if payload is not None:
+            return payload, "memory"
+        if self._disk is None:
+            return None, None
+        entry = await asyncio.to_thread(self._disk.get, key, now)
+        if entry is None:
+            return None, None
+        expires_at, payload = entry
+        # Promote so the next hit skips the disk
+        with self._lock:
+            self._memory.put(key, payload, expires_at)
+        return payload, "disk"
+
+    # --- Metrics ---
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit rates per agent and overall, plus tier sizes and evictions."""
+        with self._lock:
+            counts = {agent: dict(c) for agent, c in self._counts.items()}
+        per_agent = {}
+        totals: Dict[str, int] = defaultdict(int)
+        for agent, c in counts.items():
+            for name, value in c.items():
+                totals[name] += value
+            per_agent[agent] = {**c, "hit_rate": _hit_rate(c)}
+        return {
+            "hit_rate": _hit_rate(totals),
+            **totals,
+            "memory_entries": len(self._memory),
+            "memory_evictions": self._memory.evictions,
+            "disk_evictions": self._disk.evictions if self._disk else 0,
+            "agents": per_agent,
+        }
+
+
+def _hit_rate(counts: Dict[str, int]) -> float:
+    hits = counts.get("memory_hits", 0) + counts.get("disk_hits", 0)
+    lookups = hits + counts.get("misses", 0)
+    return hits / lookups if lookups else 0.0
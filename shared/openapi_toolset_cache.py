@@ -0,0 +1,257 @@
+"""
+OpenAPIToolset that loads precompiled tools from disk.
+
+`OpenAPIToolset` resolves every `$ref` in the spec and builds a pydantic model
+tree per operation on every process start, then rebuilds each tool's
+function declaration whenever a model request is assembled. For a spec with
+a few hundred operations that is most of a second at startup.
+
+`CachedOpenAPIToolset` takes the same arguments. The first time it sees a
+spec it parses it normally and writes a compiled file with each tool's name,
+description and function declaration, plus its serialized parsed operation.
+Later starts with the same spec and auth config load that file, serve the
+stored declarations directly, and only build the real `RestApiTool` behind a
+tool the first time that tool is called.
+
+The cache key is a SHA-256 of the spec text, the auth scheme and credential,
+and the options that change the generated tools, so editing the spec or the
+auth config recompiles. Compiled files go to OPENAPI_TOOLSET_CACHE_DIR
+(default ~/.cache/adk_openapi_toolsets); credentials are hashed, never stored.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, Callable, Dict, List, Literal, Optional, Tuple
+
+import yaml
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.adk.auth.auth_tool import AuthConfig
+from google.adk.features import FeatureName, is_feature_enabled
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.base_toolset import BaseToolset
+from google.adk.tools.openapi_tool.common.common import ApiParameter
+from google.adk.tools.openapi_tool.openapi_spec_parser.openapi_spec_parser import (
+    OpenApiSpecParser,
+    OperationEndpoint,
+    ParsedOperation,
+)
+from google.adk.tools.openapi_tool.openapi_spec_parser.rest_api_tool import RestApiTool
+from google.genai import types
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "adk_openapi_toolsets")
+
+# Bump when the compiled layout changes
+COMPILED_FORMAT_VERSION = 1
+
+
+# ==============================================================================
+# Parsed operation (de)serialization
+# ==============================================================================
+# ApiParameter's own serializer drops `required`, and the default dumps of the
+# OpenAPI models don't round-trip, so both are written out field by field.
+
+def _dump_model(model) -> Any:
+    return model.model_dump(mode="json", by_alias=True, exclude_unset=True)
+
+
+def _dump_parameter(param: ApiParameter) -> Dict[str, Any]:
+    return {
+        "original_name": param.original_name,
+        "param_location": param.param_location,
+        "param_schema": param.param_schema if isinstance(param.param_schema, str) else _dump_model(param.param_schema),
+        "description": param.description,
+        "py_name": param.py_name,
+        "required": param.required,
+    }
+
+
+def _load_parameter(data: Dict[str, Any]) -> ApiParameter:
+    schema = data["param_schema"]
+    return ApiParameter(**{**data, "param_schema": schema if isinstance(schema, str) else json.dumps(schema)})
+
+
+def dump_parsed_operation(parsed: ParsedOperation) -> str:
+    return json.dumps({
+        "name": parsed.name,
+        "description": parsed.description,
+        "endpoint": _dump_model(parsed.endpoint),
+        "operation": _dump_model(parsed.operation),
+        "parameters": [_dump_parameter(p) for p in parsed.parameters],
+        "return_value": _dump_parameter(parsed.return_value),
+        "auth_scheme": _dump_model(parsed.auth_scheme) if parsed.auth_scheme else None,
+    })
+
+
+def load_parsed_operation(payload: str) -> Tuple[ParsedOperation, Optional[Dict[str, Any]]]:
+    """The parsed operation, and the spec-defined auth scheme as a dict (None when the spec has none)."""
+    data = json.loads(payload)
+    return ParsedOperation.model_validate({
+        "name": data["name"],
+        "description": data["description"],
+        "endpoint": OperationEndpoint.model_validate(data["endpoint"]),
+        "operation": data["operation"],
+        "parameters": [_load_parameter(p) for p in data["parameters"]],
+        "return_value": _load_parameter(data["return_value"]),
+    }), data["auth_scheme"]
+
+
+# ==============================================================================
+# Tools
+# ==============================================================================
+
+class CompiledRestApiTool(BaseTool):
+    """
+    Stands in for a RestApiTool loaded from the compiled cache.
+
+    Serves the stored function declaration, and builds the real RestApiTool
+    from the stored operation on the first call.
+    """
+
+    def __init__(self, entry: Dict[str, Any], toolset: "CachedOpenAPIToolset"):
+        super().__init__(name=entry["name"], description=entry["description"])
+        self._entry = entry
+        self._toolset = toolset
+        self._declaration: Optional[types.FunctionDeclaration] = None
+        self._tool: Optional[RestApiTool] = None
+
+    def _get_declaration(self) -> types.FunctionDeclaration:
+        if self._declaration is None:
+            self._declaration = types.FunctionDeclaration.model_validate(self._entry["declaration"])
+        return self._declaration
+
+    @property
+    def rest_api_tool(self) -> RestApiTool:
+        if self._tool is None:
+            parsed, spec_auth_scheme = load_parsed_operation(self._entry["parsed"])
+            tool = self._toolset._build_tool(parsed)
+            if spec_auth_scheme and tool.auth_scheme is None:
+                tool.configure_auth_scheme(spec_auth_scheme)
+            self._tool = tool
+        return self._tool
+
+    async def run_async(self, *, args: Dict[str, Any], tool_context) -> Any:
+        return await self.rest_api_tool.run_async(args=args, tool_context=tool_context)
+
+
+class CachedOpenAPIToolset(BaseToolset):
+    """OpenAPIToolset with the parsed operations and tool declarations compiled to disk."""
+
+    def __init__(
+        self,
+        *,
+        spec_dict: Optional[Dict[str, Any]] = None,
+        spec_str: Optional[str] = None,
+        spec_str_type: Literal["json", "yaml"] = "json",
+        auth_scheme=None,
+        auth_credential=None,
+        credential_key: Optional[str] = None,
+        tool_filter=None,
+        tool_name_prefix: Optional[str] = None,
+        ssl_verify=None,
+        header_provider: Optional[Callable[[ReadonlyContext], Dict[str, str]]] = None,
+        preserve_property_names: bool = False,
+        cache_dir: Optional[str] = None,
+    ):
+        """
+        Takes the arguments of OpenAPIToolset, plus:
+
+        Args:
+            cache_dir: Where compiled toolsets go; defaults to OPENAPI_TOOLSET_CACHE_DIR.
+        """
+        super().__init__(tool_filter=tool_filter, tool_name_prefix=tool_name_prefix)
+        self._auth_scheme = auth_scheme
+        self._auth_credential = auth_credential
+        self._credential_key = credential_key
+        self._ssl_verify = ssl_verify
+        self._header_provider = header_provider
+        self._preserve_property_names = preserve_property_names
+        self._auth_config: Optional[AuthConfig] = (
+            AuthConfig(auth_scheme=auth_scheme, raw_auth_credential=auth_credential, credential_key=credential_key)
+            if auth_scheme
+            else None
+        )
+        self.cache_dir = cache_dir or os.getenv("OPENAPI_TOOLSET_CACHE_DIR", DEFAULT_CACHE_DIR)
+
+        # Hash the text as given; the spec is only parsed on a miss
+        spec_text = spec_str if spec_str is not None else json.dumps(spec_dict, sort_keys=True)
+        self.cache_key = self._cache_key(spec_text)
+        compiled = self._read_compiled()
+        self.cache_hit = compiled is not None
+        if compiled is None:
+            if spec_dict is None:
+                spec_dict = yaml.safe_load(spec_str) if spec_str_type == "yaml" else json.loads(spec_str)
+            self._tools: List[BaseTool] = self._compile(spec_dict)
+        else:
+            self._tools = [CompiledRestApiTool(entry, self) for entry in compiled["tools"]]
+
+    def _cache_key(self, spec_text: str) -> str:
+        digest = hashlib.sha256()
+        for part in (
+            str(COMPILED_FORMAT_VERSION),
+            # The declaration format depends on this feature flag
+            str(is_feature_enabled(FeatureName.JSON_SCHEMA_FOR_FUNC_DECL)),
+            str(self._preserve_property_names),
+            self._auth_scheme.model_dump_json() if self._auth_scheme else "",
+            self._auth_credential.model_dump_json() if self._auth_credential else "",
+            spec_text,
+        ):
+            digest.update(part.encode())
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _compiled_path(self) -> str:
+        return os.path.join(self.cache_dir, f"{self.cache_key}.json")
+
+    def _read_compiled(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._compiled_path(), "r") as f:
+                compiled = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        return compiled if compiled.get("version") == COMPILED_FORMAT_VERSION else None
+
+    def _build_tool(self, parsed: ParsedOperation) -> RestApiTool:
+        """Same tool OpenAPIToolset builds for an operation, including its auth setup."""
+        tool = RestApiTool.from_parsed_operation(
+            parsed, ssl_verify=self._ssl_verify, header_provider=self._header_provider
+        )
+        if self._auth_scheme:
+            tool.configure_auth_scheme(self._auth_scheme)
+        if self._auth_credential:
+            tool.configure_auth_credential(self._auth_credential)
+        if self._credential_key:
+            tool.configure_credential_key(self._credential_key)
+        return tool
+
+    def _compile(self, spec_dict: Dict[str, Any]) -> List[BaseTool]:
+        operations = OpenApiSpecParser(preserve_property_names=self._preserve_property_names).parse(spec_dict)
+        tools, entries = [], []
+        for parsed in operations:
+            tool = self._build_tool(parsed)
+            tools.append(tool)
+            entries.append({
+                "name": tool.name,
+                "description": tool.description,
+                "declaration": tool._get_declaration().model_dump(mode="json", exclude_none=True),
+                # Kept as a string so loading the file doesn't decode every operation
+                "parsed": dump_parsed_operation(parsed),
+            })
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump({"version": COMPILED_FORMAT_VERSION, "tools": entries}, f)
+        os.replace(tmp_path, self._compiled_path())
+        return tools
+
+    async def get_tools(self, readonly_context: Optional[ReadonlyContext] = None) -> List[BaseTool]:
+        return [tool for tool in self._tools if self._is_tool_selected(tool, readonly_context)]
+
+    def get_tool(self, tool_name: str) -> Optional[BaseTool]:
+        return next((tool for tool in self._tools if tool.name == tool_name), None)
+
+    def get_auth_config(self) -> Optional[AuthConfig]:
+        return self._auth_config
+
+    async def close(self):
+        pass
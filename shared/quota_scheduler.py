@@ -0,0 +1,521 @@
+"""
+Quota-aware scheduling of outbound Google API requests.
+
+Every request takes a token from two buckets: the API's project-wide bucket
+and the calling user's bucket for that API. Both refill at the API's quota
+(`Quota`, requests per second). Priorities decide who waits:
+  * INTERACTIVE requests reserve their tokens at once, borrowing against the
+    refill, and sleep until the reservation is due.
+  * BULK requests (onboarding email runs, background ingestion) only take a
+    token that is free now and leaves BULK_RESERVE of the bucket untouched.
+    They never borrow, so an interactive request is never queued behind a
+    bulk backlog.
+
+A 429, or a 403 rateLimitExceeded, pauses the bucket it names (the user's
+for userRateLimitExceeded, otherwise the project's) for the Retry-After
+period, or an exponential backoff without one. It also multiplies that
+bucket's rate by RATE_DECREASE, at most once per DECREASE_INTERVAL_SECONDS.
+While requests succeed the rate climbs back by RATE_INCREASE of the quota
+per second, so it settles just under the real ceiling instead of retrying
+in storms.
+
+Requests go through the scheduler in one of three ways:
+
+    scheduler = get_quota_scheduler()
+
+    # googleapiclient services: every HTTP request is scheduled and 429s retried
+    drive = build("drive", "v3", http=scheduler.http(creds, "drive", user_email))
+
+    # any other call, sync or async
+    resp = scheduler.call("oauth2", user_id, requests.get, url, headers=headers)  # blocks; not on the event loop
+    result = await scheduler.run("calendar", user_id, fetch_events, calendar_id)
+
+    # ADK toolsets (MCP, Google API, Integration Connectors), as tool callbacks
+    quota_gate = QuotaGate(scheduler, bulk_tools=("send_gmail_message",))
+    agent = LlmAgent(..., before_tool_callback=quota_gate.before_tool, after_tool_callback=quota_gate.after_tool)
+
+Quotas can be overridden with GOOGLE_API_QUOTAS, a JSON object such as
+{"gmail": {"per_project": 100, "per_user": 2.5}}. Set QUOTA_SCHEDULER=0 to
+send every request straight away.
+"""
+import asyncio
+import functools
+import inspect
+import json
+import os
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+import google_auth_httplib2
+import httplib2
+from google.adk.tools import FunctionTool, ToolContext
+from google.adk.tools.base_tool import BaseTool
+
+INTERACTIVE = 0
+BULK = 1
+
+# Fraction of each bucket that bulk requests leave for interactive ones
+BULK_RESERVE = 0.2
+
+# Adaptive rate: multiplied by RATE_DECREASE on a throttle, and raised again while
+# requests succeed by RATE_INCREASE of the quota per second
+RATE_DECREASE = 0.7
+RATE_INCREASE = 0.05
+MIN_RATE_FRACTION = 0.05
+# Throttles of requests already in flight when the rate dropped don't drop it again
+DECREASE_INTERVAL_SECONDS = 1.0
+
+# Backoff when a throttled response has no Retry-After
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 64.0
+
+MAX_RETRIES = 5
+
+# Error reasons Google returns with 403s that are really throttles
+RATE_LIMIT_REASON = re.compile(r"(user)?ratelimitexceeded", re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class Quota:
+    """Requests per second for the whole project, and for each user."""
+    per_project: float
+    per_user: float
+
+
+DEFAULT_QUOTAS: Dict[str, Quota] = {
+    "drive": Quota(per_project=200, per_user=20),
+    "sheets": Quota(per_project=5, per_user=1),
+    "gmail": Quota(per_project=100, per_user=2.5),
+    "calendar": Quota(per_project=10, per_user=5),
+    "oauth2": Quota(per_project=10, per_user=1),
+}
+
+# APIs not listed above
+FALLBACK_QUOTA = Quota(per_project=10, per_user=5)
+
+
+class TokenBucket:
+    """A token bucket whose rate adapts to throttling; not thread-safe on its own."""
+
+    def __init__(self, rate: float, now: float):
+        self.ceiling = rate
+        self.rate = rate
+        self.burst = max(1.0, rate)
+        self.tokens = self.burst
+        self.updated = now
+        self.paused_until = 0.0
+        self.adjusted = now
+        self.decreased = float("-inf")
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float, level: float) -> float:
+        """Seconds until the bucket holds `level` tokens and is not paused."""
+        self._refill(now)
+        return max((level - self.tokens) / self.rate, self.paused_until - now, 0.0)
+
+    def take(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+    def throttled(self, now: float, pause: float):
+        self._refill(now)
+        if now - self.decreased >= DECREASE_INTERVAL_SECONDS:
+            self.rate = max(self.ceiling * MIN_RATE_FRACTION, self.rate * RATE_DECREASE)
+            self.decreased = now
+        self.tokens = min(self.tokens, 0.0)
+        self.paused_until = max(self.paused_until, now + pause)
+        self.adjusted = now
+
+    def succeeded(self, now: float):
+        if self.rate < self.ceiling:
+            self._refill(now)
+            self.rate = min(self.ceiling, self.rate + self.ceiling * RATE_INCREASE * (now - self.adjusted))
+        self.adjusted = now
+
+
+@dataclass
+class Throttle:
+    """What a throttled response said: how long to wait, and whose quota ran out."""
+    retry_after: Optional[float]
+    user_scoped: bool
+
+
+def _retry_after_seconds(value: Any) -> Optional[float]:
+    if value in (None, ""):
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(str(value)).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _throttle_from(status: int, headers: Any, body: Any) -> Optional[Throttle]:
+    text = body.decode("utf-8", "replace") if isinstance(body, bytes) else str(body or "")
+    if status != 429 and not (status == 403 and RATE_LIMIT_REASON.search(text)):
+        return None
+    retry_after = headers.get("retry-after") or headers.get("Retry-After")
+    return Throttle(_retry_after_seconds(retry_after), "userRateLimitExceeded" in text)
+
+
+def throttle_info(outcome: Any) -> Optional[Throttle]:
+    """
+    The throttle signalled by a call's result or exception, if any: googleapiclient
+    HttpErrors, httplib2 (response, content) pairs, and requests responses or HTTPErrors.
+    """
+    if isinstance(outcome, tuple) and len(outcome) == 2 and isinstance(outcome[0], httplib2.Response):
+        return _throttle_from(outcome[0].status, outcome[0], outcome[1])
+    resp = getattr(outcome, "resp", None)  # googleapiclient.errors.HttpError
+    if resp is not None and hasattr(resp, "status"):
+        return _throttle_from(resp.status, resp, getattr(outcome, "content", b""))
+    response = getattr(outcome, "response", None)  # requests.HTTPError
+    if response is not None and hasattr(response, "status_code"):
+        outcome = response
+    if hasattr(outcome, "status_code") and hasattr(outcome, "headers"):  # requests.Response
+        return _throttle_from(outcome.status_code, outcome.headers, getattr(outcome, "text", ""))
+    return None
+
+
+class QuotaScheduler:
+    """
+    Token buckets per API and per (API, user), shared by every caller in the process.
+
+    Args:
+        quotas: Quota per API name; APIs not listed get `fallback`.
+        fallback: Quota for unlisted APIs.
+        enabled: When False, requests are sent without waiting.
+        max_retries: Retries of a throttled call before its error is returned or raised.
+    """
+
+    def __init__(
+        self,
+        quotas: Optional[Dict[str, Quota]] = None,
+        fallback: Quota = FALLBACK_QUOTA,
+        enabled: bool = True,
+        max_retries: int = MAX_RETRIES,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.quotas = dict(DEFAULT_QUOTAS if quotas is None else quotas)
+        self.fallback = fallback
+        self.enabled = enabled
+        self.max_retries = max_retries
+        self.clock = clock
+        self._buckets: Dict[Tuple[str, Optional[str]], TokenBucket] = {}
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "throttled": 0, "waited_seconds": 0.0}
+
+    def _bucket(self, api: str, user: Optional[str], now: float) -> TokenBucket:
+        key = (api, user)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            quota = self.quotas.get(api, self.fallback)
+            bucket = TokenBucket(quota.per_user if user is not None else quota.per_project, now)
+            self._buckets[key] = bucket
+        return bucket
+
+    def _reserve(self, api: str, user: str, priority: int) -> Optional[float]:
+        """
+        Takes a token for the request if its priority allows it now, and returns
+        how long to wait before sending. A negative value is how long a bulk
+        request must wait before competing for a token again.
+        """
+        with self._lock:
+            now = self.clock()
+            buckets = [self._bucket(api, None, now), self._bucket(api, user, now)]
+            if priority == INTERACTIVE:
+                for bucket in buckets:
+                    bucket.take(now)
+                return max(bucket.delay(now, 0.0) for bucket in buckets)
+            wait = max(bucket.delay(now, min(bucket.burst, 1 + BULK_RESERVE * bucket.burst)) for bucket in buckets)
+            if wait > 0:
+                return -wait
+            for bucket in buckets:
+                bucket.take(now)
+            return 0.0
+
+    def _delays(self, api: str, user: str, priority: int):
+        """Yields the sleeps before a request may be sent; the last one is its reservation."""
+        while True:
+            delay = self._reserve(api, user, priority)
+            if delay >= 0:
+                yield delay
+                return
+            # Bulk: sleep until a token is free, then compete for it again
+            yield max(-delay, 0.005)
+
+    def acquire_sync(self, api: str, user: str, priority: int = INTERACTIVE):
+        """Blocks until the request may be sent."""
+        if not self.enabled:
+            return
+        started = self.clock()
+        for delay in self._delays(api, user, priority):
+            if delay:
+                time.sleep(delay)
+        self._count(waited=self.clock() - started)
+
+    async def acquire(self, api: str, user: str, priority: int = INTERACTIVE):
+        """Waits until the request may be sent."""
+        if not self.enabled:
+            return
+        started = self.clock()
+        for delay in self._delays(api, user, priority):
+            if delay:
+                await asyncio.sleep(delay)
+        self._count(waited=self.clock() - started)
+
+    def _count(self, waited: float = 0.0, throttled: bool = False):
+        with self._lock:
+            self.stats["requests"] += not throttled
+            self.stats["throttled"] += throttled
+            self.stats["waited_seconds"] += waited
+
+    def report_throttled(self, api: str, user: str, throttle: Throttle, attempt: int = 0) -> float:
+        """Pauses and slows the bucket the throttle names. Returns the pause in seconds."""
+        pause = throttle.retry_after
+        if pause is None:
+            pause = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt) * random.uniform(0.5, 1.0)
+        self._count(throttled=True)
+        if not self.enabled:
+            return pause
+        with self._lock:
+            now = self.clock()
+            self._bucket(api, user if throttle.user_scoped else None, now).throttled(now, pause)
+        return pause
+
+    def report_success(self, api: str, user: str):
+        if not self.enabled:
+            return
+        with self._lock:
+            now = self.clock()
+            self._bucket(api, None, now).succeeded(now)
+            self._bucket(api, user, now).succeeded(now)
+
+    def call(self, api: str, user: str, fn: Callable, *args, priority: int = INTERACTIVE, **kwargs) -> Any:
+        """
+        Calls `fn` when the quota allows, retrying while it is throttled. A result
+        that is still throttled after max_retries is returned, an exception re-raised.
+        """
+        for attempt in range(self.max_retries + 1):
+            self.acquire_sync(api, user, priority)
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                throttle = throttle_info(e)
+                if throttle is None or attempt == self.max_retries:
+                    raise
+            else:
+                throttle = throttle_info(result)
+                if throttle is None or attempt == self.max_retries:
+                    if throttle is None:
+                        self.report_success(api, user)
+                    return result
+            pause = self.report_throttled(api, user, throttle, attempt)
+            if not self.enabled:
+                time.sleep(pause)
+
+    async def run(self, api: str, user: str, fn: Callable, *args, priority: int = INTERACTIVE, **kwargs) -> Any:
+        """`call` for async code. Coroutine functions are awaited, others run in a thread."""
+        for attempt in range(self.max_retries + 1):
+            await self.acquire(api, user, priority)
+            try:
+                if inspect.iscoroutinefunction(fn):
+                    result = await fn(*args, **kwargs)
+                else:
+                    result = await asyncio.to_thread(fn, *args, **kwargs)
+            except Exception as e:
+                throttle = throttle_info(e)
+                if throttle is None or attempt == self.max_retries:
+                    raise
+            else:
+                throttle = throttle_info(result)
+                if throttle is None or attempt == self.max_retries:
+                    if throttle is None:
+                        self.report_success(api, user)
+                    return result
+            pause = self.report_throttled(api, user, throttle, attempt)
+            if not self.enabled:
+                await asyncio.sleep(pause)
+
+    def http(self, credentials, api: str, user: str, priority: int = INTERACTIVE) -> "QuotaHttp":
+        """An authorized http for googleapiclient's `build(..., http=...)` that schedules every request."""
+        return QuotaHttp(google_auth_httplib2.AuthorizedHttp(credentials, http=httplib2.Http()), self, api, user, priority)
+
+
+class QuotaHttp:
+    """Wraps an httplib2-style http so every request goes through a QuotaScheduler."""
+
+    def __init__(self, http, scheduler: QuotaScheduler, api: str, user: str, priority: int = INTERACTIVE):
+        self._http = http
+        self._scheduler = scheduler
+        self._api = api
+        self._user = user
+        self._priority = priority
+
+    def request(self, uri, method="GET", body=None, headers=None, *args, **kwargs):
+        return self._scheduler.call(
+            self._api, self._user, self._http.request, uri, method, body, headers, *args,
+            priority=self._priority, **kwargs,
+        )
+
+    def __getattr__(self, name):
+        # credentials, timeout, close() etc. as googleapiclient expects them
+        return getattr(self._http, name)
+
+
+# Keywords in tool names, in the order they are checked, and the API they call
+TOOL_API_KEYWORDS = (
+    ("gmail", "gmail"),
+    ("calendar", "calendar"),
+    ("sheet", "sheets"),
+    ("drive", "drive"),
+    ("file", "drive"),
+    ("doc", "drive"),
+)
+
+RETRY_AFTER_PATTERN = re.compile(r"retry[- ]after\D{0,5}(\d+(?:\.\d+)?)", re.IGNORECASE)
+
+
+def api_for_tool(name: str) -> str:
+    lowered = name.lower()
+    return next((api for keyword, api in TOOL_API_KEYWORDS if keyword in lowered), "google")
+
+
+# Fields of structured errors that carry the HTTP status or the error reason
+_STATUS_CODE_FIELD = re.compile(r"Status Code: (\d{3})")  # RestApiTool errors
+_HTTP_ERROR_FIELD = re.compile(r"<HttpError (\d{3}) ")  # googleapiclient HttpErrors as text
+_REASON_FIELD = re.compile(r"""["']reason["']\s*:\s*["']((?:user)?rateLimitExceeded)["']""", re.IGNORECASE)
+
+
+def _error_object_throttle(error: Dict[str, Any]) -> Optional[Throttle]:
+    """A Google API error object: {"code": 429, "status": ..., "errors": [{"reason": ...}], "details": [...]}."""
+    reasons = [e.get("reason", "") for e in error.get("errors") or () if isinstance(e, dict)]
+    limited = [r for r in reasons if RATE_LIMIT_REASON.fullmatch(str(r))]
+    if error.get("code") != 429 and error.get("status") != "RESOURCE_EXHAUSTED" and not limited:
+        return None
+    retry_after = next(
+        (
+            _retry_after_seconds(str(d.get("retryDelay", "")).rstrip("s"))
+            for d in error.get("details") or ()
+            if isinstance(d, dict) and "retryDelay" in d
+        ),
+        None,
+    )
+    return Throttle(retry_after, any(r.lower() == "userratelimitexceeded" for r in limited))
+
+
+def _error_text_throttle(text: str) -> Optional[Throttle]:
+    """An error message carrying the status or reason as a field, such as RestApiTool's or an HttpError's."""
+    try:
+        parsed = json.loads(text)
+    except ValueError:
+        parsed = None
+    if isinstance(parsed, dict):
+        return _payload_throttle(parsed)
+    status = _STATUS_CODE_FIELD.search(text) or _HTTP_ERROR_FIELD.search(text)
+    reason = _REASON_FIELD.search(text)
+    if not (status and status.group(1) == "429") and not reason:
+        return None
+    match = RETRY_AFTER_PATTERN.search(text)
+    user_scoped = bool(reason) and reason.group(1).lower() == "userratelimitexceeded"
+    return Throttle(float(match.group(1)) if match else None, user_scoped)
+
+
+def _payload_throttle(response: Any) -> Optional[Throttle]:
+    """
+    The throttle a tool response reports, judged only by its structured error
+    fields: a Google error object, an MCP result flagged isError, or an `error`
+    message with a status code. Successful results never count, whatever they say.
+    """
+    if not isinstance(response, dict):
+        return None
+    error = response.get("error")
+    if isinstance(error, dict):
+        return _error_object_throttle(error)
+    if isinstance(error, str):
+        return _error_text_throttle(error)
+    if response.get("isError"):  # MCP CallToolResult
+        for part in response.get("content") or ():
+            if isinstance(part, dict) and part.get("type") == "text":
+                throttle = _error_text_throttle(part.get("text", ""))
+                if throttle is not None:
+                    return throttle
+    return None
+
+
+class QuotaGate:
+    """
+    Before/after-tool callbacks that schedule an agent's remote tool calls.
+
+    Function tools are left alone; the ones that call Google do so through the
+    scheduler themselves. Other tools (MCP, Google API, Integration Connectors)
+    wait for a token before they run. A response whose error fields report a
+    429 or a rate-limit reason throttles the bucket; the model decides whether
+    to call again.
+
+    Args:
+        scheduler: The scheduler to use.
+        bulk_tools: Names of tools whose calls are BULK; all others are INTERACTIVE.
+        api_for: Maps a tool name to its API; defaults to keywords in the name.
+    """
+
+    def __init__(
+        self,
+        scheduler: QuotaScheduler,
+        bulk_tools: Iterable[str] = (),
+        api_for: Callable[[str], str] = api_for_tool,
+    ):
+        self.scheduler = scheduler
+        self.bulk_tools = set(bulk_tools)
+        self.api_for = api_for
+
+    @staticmethod
+    def _user(args: Dict[str, Any], tool_context: ToolContext) -> str:
+        return args.get("user_google_email") or tool_context.user_id
+
+    async def before_tool(self, tool: BaseTool, args: Dict[str, Any], tool_context: ToolContext) -> Optional[Dict]:
+        if isinstance(tool, FunctionTool):
+            return None
+        priority = BULK if tool.name in self.bulk_tools else INTERACTIVE
+        await self.scheduler.acquire(self.api_for(tool.name), self._user(args, tool_context), priority)
+        return None
+
+    async def after_tool(
+        self, tool: BaseTool, args: Dict[str, Any], tool_context: ToolContext, tool_response: Any
+    ) -> Optional[Dict]:
+        if isinstance(tool, FunctionTool):
+            return None
+        api, user = self.api_for(tool.name), self._user(args, tool_context)
+        throttle = _payload_throttle(tool_response)
+        if throttle is None:
+            self.scheduler.report_success(api, user)
+        else:
+            self.scheduler.report_throttled(api, user, throttle)
+        return None
+
+
+def _quotas_from_env() -> Dict[str, Quota]:
+    quotas = dict(DEFAULT_QUOTAS)
+    for api, quota in json.loads(os.getenv("GOOGLE_API_QUOTAS") or "{}").items():
+        base = quotas.get(api, FALLBACK_QUOTA)
+        quotas[api] = Quota(
+            per_project=float(quota.get("per_project", base.per_project)),
+            per_user=float(quota.get("per_user", base.per_user)),
+        )
+    return quotas
+
+
+@functools.lru_cache(maxsize=None)
+def get_quota_scheduler() -> QuotaScheduler:
+    """The process-wide scheduler, configured from the environment."""
+    return QuotaScheduler(_quotas_from_env(), enabled=os.getenv("QUOTA_SCHEDULER", "1") != "0")
@@ -0,0 +1,161 @@
+"""
+Local cache of Drive sheet contents, keyed by file ID and revision.
+
+`fetch_sheet` starts with one `files.get` metadata call. When the file's
+`version` and `modifiedTime` match the cached copy, the rows are served from
+disk with no download. Otherwise the sheet is fetched and the cache replaced:
+  * Google Sheets: the tab titles, then every tab in one `values.batchGet`
+  * CSV and XLSX files: one media download
+
+Entries are per user, so one user's cached rows are never served to another.
+They live as JSON files under the cache directory, and the least recently
+used are evicted past `max_bytes`.
+
+Usage:
+    cache = SheetCache("sheet_cache")
+    sheet = fetch_sheet(user_email, file_id, drive, sheets, cache)
+    sheet["tabs"]   # {"Sheet1": [["First Name", ...], [...], ...], ...}
+    sheet["cache"]  # "hit" or "miss"
+"""
+import csv
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+GOOGLE_SHEET_MIME_TYPE = "application/vnd.google-apps.spreadsheet"
+XLSX_MIME_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+CSV_MIME_TYPES = ("text/csv", "text/plain")
+METADATA_FIELDS = "id,name,mimeType,modifiedTime,version"
+
+
+class SheetCache:
+    """
+    Per-user sheet contents on disk, one JSON file per file ID.
+
+    Args:
+        cache_dir: Directory of the cache. Created if missing.
+        max_bytes: Byte budget; least recently used entries are evicted past it.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 256 * 2**20):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, user: str, file_id: str) -> str:
+        user_dir = hashlib.sha256(user.encode()).hexdigest()[:16]
+        return os.path.join(self.cache_dir, user_dir, f"{file_id}.json")
+
+    def get(self, user: str, file_id: str) -> Optional[Dict[str, Any]]:
+        path = self._path(user, file_id)
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        os.utime(path)  # mtime doubles as the LRU clock
+        return entry
+
+    def put(self, user: str, file_id: str, entry: Dict[str, Any]):
+        path = self._path(user, file_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._evict()
+
+    def _evict(self):
+        files = []
+        for directory, _, names in os.walk(self.cache_dir):
+            for name in names:
+                if name.endswith(".json"):
+                    path = os.path.join(directory, name)
+                    files.append((os.path.getmtime(path), os.path.getsize(path), path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+
+def _is_current(entry: Dict[str, Any], metadata: Dict[str, Any]) -> bool:
+    return entry.get("version") == metadata.get("version") and entry.get("modifiedTime") == metadata.get("modifiedTime")
+
+
+def _quote_tab(title: str) -> str:
+    return "'" + title.replace("'", "''") + "'"
+
+
+def _download_google_sheet(sheets, file_id: str) -> Dict[str, List[List[str]]]:
+    spreadsheet = sheets.spreadsheets().get(spreadsheetId=file_id, fields="sheets.properties.title").execute()
+    titles = [s["properties"]["title"] for s in spreadsheet.get("sheets", [])]
+    response = sheets.spreadsheets().values().batchGet(
+        spreadsheetId=file_id,
+        ranges=[_quote_tab(t) for t in titles],
+        majorDimension="ROWS",
+        valueRenderOption="FORMATTED_VALUE",
+    ).execute()
+    return {title: value_range.get("values", []) for title, value_range in zip(titles, response.get("valueRanges", []))}
+
+
+def _download_file(drive, file_id: str, mime_type: str) -> Dict[str, List[List[str]]]:
+    data = drive.files().get_media(fileId=file_id).execute()
+    if mime_type == XLSX_MIME_TYPE:
+        frames = pd.read_excel(io.BytesIO(data), sheet_name=None, dtype=str, keep_default_na=False)
+        return {name: [list(frame.columns)] + frame.values.tolist() for name, frame in frames.items()}
+    text = data.decode("utf-8-sig") if isinstance(data, bytes) else data
+    return {"Sheet1": list(csv.reader(io.StringIO(text)))}
+
+
+def fetch_sheet(user: str, file_id: str, drive, sheets, cache: SheetCache) -> Dict[str, Any]:
+    """
+    The rows of every tab of a Drive sheet, from the cache when the file is unchanged.
+
+    Args:
+        user: The user the file is fetched as; cache entries are kept per user.
+        file_id: Drive file ID of a Google Sheet, XLSX or CSV file.
+        drive: A Drive v3 service, from googleapiclient's `build`.
+        sheets: A Sheets v4 service, from googleapiclient's `build`.
+        cache: Where fetched contents are kept.
+
+    Returns:
+        {"file_id", "name", "mimeType", "modifiedTime", "version", "tabs": {title: rows}, "cache": "hit"|"miss"}
+    """
+    metadata = drive.files().get(fileId=file_id, fields=METADATA_FIELDS, supportsAllDrives=True).execute()
+    entry = cache.get(user, file_id)
+    if entry is not None and _is_current(entry, metadata):
+        return {**entry, "cache": "hit"}
+
+    mime_type = metadata.get("mimeType")
+    if mime_type == GOOGLE_SHEET_MIME_TYPE:
+        tabs = _download_google_sheet(sheets, file_id)
+    elif mime_type == XLSX_MIME_TYPE or mime_type in CSV_MIME_TYPES:
+        tabs = _download_file(drive, file_id, mime_type)
+    else:
+        raise ValueError(f"File {file_id} is a {mime_type}, not a sheet.")
+    entry = {
+        "file_id": file_id,
+        "name": metadata.get("name"),
+        "mimeType": mime_type,
+        "modifiedTime": metadata.get("modifiedTime"),
+        "version": metadata.get("version"),
+        "tabs": tabs,
+    }
+    cache.put(user, file_id, entry)
+    return {**entry, "cache": "miss"}
+
+
+def rows_to_csv(rows: List[List[Any]]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows(rows)
+    return buffer.getvalue()
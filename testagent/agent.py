@@ -1,10 +1,18 @@
 import os
+import sys
 from google.adk.agents import LlmAgent
+from google.adk.tools import LongRunningFunctionTool
 from google.adk.tools.mcp_tool.mcp_toolset import MCPToolset, StdioConnectionParams
 from mcp.client.stdio import StdioServerParameters
 from dotenv import load_dotenv
-from .custom_read_tools import   process_and_save_candidates , generate_onboarding_email
+from .custom_read_tools import   process_and_save_candidates , ingest_candidates_from_sheet, generate_onboarding_email, record_onboarding_email_results
+from .candidate_analytics import get_candidate_statistics
+from .candidate_export import export_candidates
+from .drive_lookup import find_drive_file, index_search_drive_results
+from .ingest_jobs import cancel_ingestion_job, get_ingestion_job_status, start_candidate_ingestion
+from .sheet_reader import read_sheet, use_workspace_connection
 from .prompt import system_prompt
+from shared.quota_scheduler import QuotaGate, get_quota_scheduler
 
 load_dotenv()
 
@@ -12,44 +20,72 @@ clientid = os.getenv("OAUTH_CLIENT_ID")
 clientsecret = os.getenv("OAUTH_CLIENT_SECRET")
 
 # Define the absolute path to your MCP server directory
-MCP_SERVER_PATH = "/Users/mustafa.mohammed/Documents/google_workspace_mcp"
+MCP_SERVER_PATH = os.getenv("MCP_SERVER_PATH", "/Users/mustafa.mohammed/Documents/google_workspace_mcp")
 
-# Verify the path exists
-if not os.path.exists(MCP_SERVER_PATH):
-    raise ValueError(f"MCP server path does not exist: {MCP_SERVER_PATH}")
+# Set USE_FAKE_WORKSPACE_MCP=1 to run against the bundled offline stand-in instead
+USE_FAKE_WORKSPACE_MCP = os.getenv("USE_FAKE_WORKSPACE_MCP", "").lower() in ("1", "true", "yes")
+FAKE_MCP_SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_workspace_mcp.py")
 
-# Verify main.py exists in the server directory
-main_py_path = os.path.join(MCP_SERVER_PATH, "main.py")
-if not os.path.exists(main_py_path):
-    raise ValueError(f"main.py not found at: {main_py_path}")
+if USE_FAKE_WORKSPACE_MCP:
+    workspace_server_params = StdioServerParameters(
+        command=sys.executable,
+        args=[FAKE_MCP_SERVER_SCRIPT],
+        # Pass the fake server's size/latency knobs through to the subprocess
+        env={k: v for k, v in os.environ.items() if k.startswith("FAKE_MCP_")},
+    )
+else:
+    # Verify the path exists
+    if not os.path.exists(MCP_SERVER_PATH):
+        raise ValueError(f"MCP server path does not exist: {MCP_SERVER_PATH}")
+
+    # Verify main.py exists in the server directory
+    main_py_path = os.path.join(MCP_SERVER_PATH, "main.py")
+    if not os.path.exists(main_py_path):
+        raise ValueError(f"main.py not found at: {main_py_path}")
+
+    workspace_server_params = StdioServerParameters(
+        command='uv',
+        args=[
+            "run",  # This tells uv to run the script
+            "python",  # Specify python interpreter
+            "main.py"  # Your MCP server script
+        ],
+        # Set the working directory to your MCP server location
+        cwd=MCP_SERVER_PATH,
+        env={
+            "GOOGLE_OAUTH_CLIENT_ID": clientid,
+            "GOOGLE_OAUTH_CLIENT_SECRET": clientsecret,
+            "OAUTHLIB_INSECURE_TRANSPORT": "1"
+        }
+    )
+
+workspace_connection = StdioConnectionParams(
+    server_params=workspace_server_params,
+)
+workspace_toolset = MCPToolset(
+    connection_params=workspace_connection,
+    # Optional: Filter which tools from the MCP server are exposed
+    # tool_filter=['list_directory', 'read_file']
+)
+# ingest_candidates_from_sheet reads through the same server, in its own session, when there are no Google tokens in this process
+use_workspace_connection(workspace_connection)
+
+# Workspace MCP calls wait for quota; onboarding email sends yield to everything else
+quota_gate = QuotaGate(get_quota_scheduler(), bulk_tools=("send_gmail_message",))
 
 root_agent = LlmAgent(
     model ='gemini-2.5-flash',
     name ='google_workspace_agent',
     instruction = system_prompt ,
     tools=[
-        MCPToolset(
-            connection_params=StdioConnectionParams(
-                server_params=StdioServerParameters(
-                    command='uv',
-                    args=[
-                        "run",  # This tells uv to run the script
-                        "python",  # Specify python interpreter
-                        "main.py"  # Your MCP server script
-                    ],
-                    # Set the working directory to your MCP server location
-                    cwd=MCP_SERVER_PATH,
-                    env={
-                        "GOOGLE_OAUTH_CLIENT_ID": clientid,
-                        "GOOGLE_OAUTH_CLIENT_SECRET": clientsecret,
-                        "OAUTHLIB_INSECURE_TRANSPORT": "1"
-                    }
-                ),
-            ),
-            # Optional: Filter which tools from the MCP server are exposed
-            # tool_filter=['list_directory', 'read_file']
-        ),  process_and_save_candidates, generate_onboarding_email
+        workspace_toolset, find_drive_file, ingest_candidates_from_sheet, read_sheet, process_and_save_candidates,
+        LongRunningFunctionTool(func=start_candidate_ingestion), get_ingestion_job_status, cancel_ingestion_job,
+        generate_onboarding_email, record_onboarding_email_results, get_candidate_statistics,
+        export_candidates
     ],
+    before_tool_callback=quota_gate.before_tool,
+    # Files found by search_drive go into the local Drive index
+    after_tool_callback=[quota_gate.after_tool, index_search_drive_results],
 )
 
 # Alternative configuration if you're not using uv to manage the Python environment
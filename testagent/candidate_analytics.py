@@ -0,0 +1,184 @@
+"""
+Candidate reporting from Mongo aggregation pipelines.
+
+`get_candidate_statistics` answers dashboard questions ("how many Software
+Engineers are still awaiting onboarding?") with one aggregation over
+`nextleap.candidates`. The filter goes in a leading `$match` that the indexes
+below can serve. A `$facet` then computes counts by role, status, gender and
+created_at bucket, plus the onboarding funnel per role. Only the counts go
+back to the model, and identical questions within ANALYTICS_CACHE_SECONDS
+are answered from memory.
+"""
+import asyncio
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Tuple
+
+from pymongo import ASCENDING
+
+from shared.instrumentation import instrument, set_attributes
+from shared.serialization import dumps
+from .custom_read_tools import _get_mongo_client
+from .onboarding_outbox import STATUS_CLAIMED, STATUS_FAILED, STATUS_SAVED, STATUS_SENT
+
+CACHE_SECONDS = float(os.getenv("ANALYTICS_CACHE_SECONDS", "30"))
+
+BUCKET_FORMATS = {"day": "%Y-%m-%d", "week": "%G-W%V", "month": "%Y-%m"}
+
+# Every status a saved candidate can be in, in funnel order
+FUNNEL_STATUSES = (STATUS_SAVED, STATUS_CLAIMED, STATUS_SENT, STATUS_FAILED)
+
+_cache: Dict[Tuple, Tuple[float, str]] = {}
+_cache_lock = threading.Lock()
+_indexes_ensured = False
+
+
+def ensure_analytics_indexes(coll):
+    """Indexes for the filters the statistics tool matches on."""
+    coll.create_index([("Role", ASCENDING), ("status", ASCENDING)])
+    coll.create_index([("created_at", ASCENDING)])
+
+
+def _match_stage(role: str, status: str, created_after: str) -> Dict[str, Any]:
+    match: Dict[str, Any] = {}
+    if role:
+        match["Role"] = role
+    if status:
+        match["status"] = status
+    if created_after:
+        since = datetime.fromisoformat(created_after.replace("Z", "+00:00"))
+        match["created_at"] = {"$gte": since if since.tzinfo else since.replace(tzinfo=timezone.utc)}
+    return {"$match": match}
+
+
+def _count_by(field: str) -> List[Dict[str, Any]]:
+    return [{"$group": {"_id": field, "count": {"$sum": 1}}}, {"$sort": {"count": -1}}]
+
+
+def build_pipeline(role: str = "", status: str = "", created_after: str = "", bucket: str = "day") -> List[Dict[str, Any]]:
+    return [
+        _match_stage(role, status, created_after),
+        {"$facet": {
+            "total": [{"$count": "count"}],
+            "by_role": _count_by("$Role"),
+            "by_status": _count_by("$status"),
+            "by_gender": _count_by({"$toLower": "$Gender"}),
+            "by_created": [
+                {"$group": {
+                    "_id": {"$dateToString": {"format": BUCKET_FORMATS[bucket], "date": "$created_at"}},
+                    "count": {"$sum": 1},
+                }},
+                {"$sort": {"_id": 1}},
+            ],
+            "funnel": [{"$group": {"_id": {"role": "$Role", "status": "$status"}, "count": {"$sum": 1}}}],
+        }},
+    ]
+
+
+def _counts(rows: List[Dict[str, Any]]) -> Dict[str, int]:
+    return {str(row["_id"]) if row["_id"] is not None else "unknown": row["count"] for row in rows}
+
+
+def _funnel(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    per_role: Dict[str, Dict[str, int]] = {}
+    for row in rows:
+        role = row["_id"].get("role") or "unknown"
+        per_role.setdefault(role, {s: 0 for s in FUNNEL_STATUSES})[row["_id"].get("status") or "unknown"] = row["count"]
+
+    def stage(counts: Dict[str, int]) -> Dict[str, Any]:
+        saved = sum(counts.values())
+        sent = counts.get(STATUS_SENT, 0)
+        return {
+            "saved": saved,
+            "awaiting_email": counts.get(STATUS_SAVED, 0) + counts.get(STATUS_CLAIMED, 0),
+            "email_sent": sent,
+            "email_failed": counts.get(STATUS_FAILED, 0),
+            "sent_rate": round(sent / saved, 3) if saved else 0.0,
+        }
+
+    overall: Dict[str, int] = {}
+    for counts in per_role.values():
+        for s, n in counts.items():
+            overall[s] = overall.get(s, 0) + n
+    return {"overall": stage(overall), "by_role": {role: stage(counts) for role, counts in per_role.items()}}
+
+
+@instrument()
+async def get_candidate_statistics(role: str = "", status: str = "", created_after: str = "", bucket: str = "day") -> str:
+    """
+    Counts candidates in the database, for reporting and dashboard questions.
+
+    Use this instead of reading candidate records to answer questions such as
+    "how many Software Engineer candidates are still awaiting onboarding".
+
+    Args:
+        role (str): Only count candidates applying for this role, e.g. "Software Engineer".
+        status (str): Only count candidates in this status: Record_Saved (awaiting email),
+            Onboarding_Email_Claimed, Onboarding_Email_Sent or Onboarding_Email_Failed.
+        created_after (str): Only count candidates saved on or after this ISO date, e.g. "2025-01-31".
+        bucket (str): Granularity of the created_at counts: "day", "week" or "month".
+
+    Returns:
+        str: JSON string with:
+          {
+            "status": "success"|"error",
+            "total": n,
+            "by_role": {role: n, …}, "by_status": {status: n, …}, "by_gender": {gender: n, …},
+            "by_created": {bucket: n, …},
+            "funnel": {"overall": {"saved","awaiting_email","email_sent","email_failed","sent_rate"},
+                       "by_role": {role: {…}, …}},
+            "cached": true|false
+          }
+    """
+    # The aggregation is a Mongo round trip; run it off the event loop the other sessions share
+    return await asyncio.to_thread(_candidate_statistics, role, status, created_after, bucket)
+
+
+def _candidate_statistics(role: str, status: str, created_after: str, bucket: str) -> str:
+    if bucket not in BUCKET_FORMATS:
+        return dumps({"status": "error", "message": f"bucket must be one of {', '.join(BUCKET_FORMATS)}."})
+    key = (role, status, created_after, bucket)
+    now = time.monotonic()
+    with _cache_lock:
+        entry = _cache.get(key)
+    if entry and entry[0] > now:
+        set_attributes(cached=True)
+        return entry[1]
+
+    global _indexes_ensured
+    client = None
+    try:
+        pipeline = build_pipeline(role, status, created_after, bucket)
+        client = _get_mongo_client()
+        collection = client['nextleap']['candidates']
+        if not _indexes_ensured:
+            ensure_analytics_indexes(collection)
+            _indexes_ensured = True
+        facets = next(collection.aggregate(pipeline), {})
+    except ValueError as e:
+        return dumps({"status": "error", "message": f"Invalid filter: {e}"})
+    except Exception as e:
+        return dumps({"status": "error", "message": f"Database Error: Could not compute statistics. Details: {e}"})
+    finally:
+        if client:
+            client.close()
+
+    total = facets.get("total") or [{"count": 0}]
+    result = {
+        "status": "success",
+        "total": total[0]["count"],
+        "by_role": _counts(facets.get("by_role", [])),
+        "by_status": _counts(facets.get("by_status", [])),
+        "by_gender": _counts(facets.get("by_gender", [])),
+        "by_created": _counts(facets.get("by_created", [])),
+        "funnel": _funnel(facets.get("funnel", [])),
+    }
+    set_attributes(cached=False, total=result["total"])
+    with _cache_lock:
+        # Drop expired entries so the cache stays as small as the set of live questions
+        for stale in [k for k, (expires, _) in _cache.items() if expires <= now]:
+            del _cache[stale]
+        _cache[key] = (now + CACHE_SECONDS, dumps({**result, "cached": True}))
+    return dumps({**result, "cached": False})
@@ -0,0 +1,146 @@
+"""
+Candidate export to a CSV or XLSX artifact.
+
+`export_candidates` streams `nextleap.candidates` through a batched cursor with
+a projection, and writes rows to a file in EXPORT_DIR as they arrive: CSV
+through the csv module, XLSX through openpyxl's write-only mode. Memory stays
+flat however many candidates there are.
+
+When the runner's artifact service is a DiskArtifactService with EXPORT_DIR
+among its `ingest_dirs` (see `services.py`), the file is saved as a `file://`
+reference that the service streams into its blob store. Any other artifact
+service gets the file's bytes inline, since a local path means nothing to its
+clients. Either way the file is gone from EXPORT_DIR once the tool returns.
+Only the artifact name, version and row count go back to the model.
+"""
+import asyncio
+import csv
+import os
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from google.adk.tools import ToolContext
+from google.genai import types
+from openpyxl import Workbook
+
+from artifact.disk_artifact_service import DiskArtifactService
+from shared.instrumentation import instrument, set_attributes
+from shared.serialization import dumps
+from .custom_read_tools import _get_mongo_client
+
+EXPORT_DIR = os.getenv("EXPORT_DIR", os.path.join(os.path.expanduser("~"), ".cache", "adk_exports"))
+
+# Documents fetched per cursor round trip
+CURSOR_BATCH_SIZE = 1000
+
+EXPORT_COLUMNS = ["First Name", "Last Name", "Email", "Gender", "Role", "status", "created_at", "send_attempts"]
+
+MIME_TYPES = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def _export_filter(status: str, role: str) -> Dict[str, Any]:
+    query: Dict[str, Any] = {}
+    if status:
+        query["status"] = status
+    if role:
+        query["Role"] = role
+    return query
+
+
+def _row(doc: Dict[str, Any]) -> List[Any]:
+    values = []
+    for column in EXPORT_COLUMNS:
+        value = doc.get(column, "")
+        values.append(value.isoformat() if hasattr(value, "isoformat") else value)
+    return values
+
+
+def write_export(cursor, path: str, file_format: str) -> int:
+    """Writes the cursor's documents to `path` one at a time. Returns the row count."""
+    rows = 0
+    if file_format == "csv":
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(EXPORT_COLUMNS)
+            for doc in cursor:
+                writer.writerow(_row(doc))
+                rows += 1
+        return rows
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Candidates")
+    sheet.append(EXPORT_COLUMNS)
+    for doc in cursor:
+        sheet.append(_row(doc))
+        rows += 1
+    workbook.save(path)
+    return rows
+
+
+async def _export_part(tool_context: ToolContext, path: str, file_format: str) -> types.Part:
+    """The artifact for the export at `path`: a reference the artifact service ingests, or the bytes."""
+    file_uri = f"file://{path}"
+    artifact_service = tool_context._invocation_context.artifact_service
+    if isinstance(artifact_service, DiskArtifactService) and artifact_service.ingests(file_uri):
+        return types.Part(file_data=types.FileData(file_uri=file_uri, mime_type=MIME_TYPES[file_format]))
+    with open(path, "rb") as f:
+        data = await asyncio.to_thread(f.read)
+    return types.Part.from_bytes(data=data, mime_type=MIME_TYPES[file_format])
+
+
+@instrument()
+async def export_candidates(tool_context: ToolContext, file_format: str = "csv", status: str = "", role: str = "") -> str:
+    """
+    Exports candidate records from the database to a CSV or XLSX file artifact.
+
+    Args:
+        file_format (str): "csv" or "xlsx".
+        status (str): Only export candidates in this status, e.g. Record_Saved or Onboarding_Email_Sent.
+        role (str): Only export candidates applying for this role, e.g. "Software Engineer".
+
+    Returns:
+        str: JSON string with:
+          {
+            "status": "success"|"error",
+            "artifact": artifact file name, "version": n,
+            "rows": n, "bytes": n,
+            "message": present on error
+          }
+    """
+    if file_format not in MIME_TYPES:
+        return dumps({"status": "error", "message": f"file_format must be one of {', '.join(MIME_TYPES)}."})
+
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    filename = f"candidates-{time.strftime('%Y%m%dT%H%M%S')}.{file_format}"
+    fd, path = tempfile.mkstemp(dir=EXPORT_DIR, prefix="candidates-", suffix=f".{file_format}")
+    os.close(fd)
+
+    def run_export() -> int:
+        client = _get_mongo_client()
+        try:
+            cursor = client['nextleap']['candidates'].find(
+                _export_filter(status, role),
+                {column: 1 for column in EXPORT_COLUMNS} | {"_id": 0},
+                batch_size=CURSOR_BATCH_SIZE,
+            )
+            return write_export(cursor, path, file_format)
+        finally:
+            client.close()
+
+    try:
+        rows = await asyncio.to_thread(run_export)
+        size = os.path.getsize(path)
+        version = await tool_context.save_artifact(filename, await _export_part(tool_context, path, file_format))
+    except Exception as e:
+        return dumps({"status": "error", "message": f"Export failed: {e}"})
+    finally:
+        # Ingested exports have already been moved into the blob store
+        if os.path.exists(path):
+            os.remove(path)
+
+    set_attributes(rows=rows, bytes=size, file_format=file_format)
+    return dumps({"status": "success", "artifact": filename, "version": version, "rows": rows, "bytes": size})
@@ -0,0 +1,42 @@
+"""
+Typed candidate and onboarding email records.
+
+Both are slotted dataclasses: no per-instance __dict__, so a batch of them
+takes roughly half the memory of the equivalent dicts. They go straight into
+`shared.serialization.dumps`, which encodes dataclasses natively. Candidates
+are still stored in Mongo as documents keyed by the sheet's column names;
+`Candidate.from_document` reads the fields the tools use from one.
+"""
+from dataclasses import dataclass
+from typing import Any, Dict
+
+
+@dataclass(slots=True)
+class Candidate:
+    """The fields of a candidate document the onboarding tools read."""
+    first_name: str
+    last_name: str
+    email: str
+    gender: str
+    role: str
+
+    @classmethod
+    def from_document(cls, doc: Dict[str, Any]) -> "Candidate":
+        return cls(
+            first_name=(doc.get("First Name") or "").strip(),
+            last_name=(doc.get("Last Name") or "").strip(),
+            email=(doc.get("Email") or "").strip(),
+            gender=(doc.get("Gender") or "").strip(),
+            role=(doc.get("Role") or "").strip(),
+        )
+
+
+@dataclass(slots=True)
+class OnboardingEmail:
+    """One email draft from generate_onboarding_email, with the claim it belongs to."""
+    candidate_id: str
+    claim_token: str
+    to: str
+    title: str
+    subject: str
+    body: str
@@ -0,0 +1,172 @@
+"""
+Declarative validation rules for candidate rows.
+
+Rules are plain data: a list applied to every row plus optional extra rules per
+role. `compile_rules` turns a schema into one validator function that checks a
+row in a single pass and names the first rule it breaks, and
+`ValidationReport` keeps the per-rule counts and a capped sample of rejected
+rows so a failed ingest can be diagnosed from the tool result alone.
+
+Set CANDIDATE_RULES_PATH to a JSON file with the same shape as
+DEFAULT_RULE_SCHEMA to change the rules without a code edit.
+
+Supported checks:
+    required  - every field in "fields" is present and non-empty
+    one_of    - "field" is one of "values" (after the optional "normalize": "title"|"lower"|"upper")
+    pattern   - "field" matches the regex "pattern"
+    max_length - "field" is at most "max" characters
+"""
+import json
+import os
+import re
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Rule 4 is structural and checked before any declared rule runs
+COLUMN_COUNT_RULE = "column_count"
+# The uniqueness half of Rule 5 needs the database, so the tool reports it itself
+EMAIL_EXISTS_RULE = "email_exists"
+
+DEFAULT_RULE_SCHEMA = {
+    "common": [
+        # Rule 1
+        {"id": "required_fields", "check": "required", "fields": ["First Name", "Last Name", "Email"],
+         "reason": "First Name, Last Name and Email are required"},
+        # Rule 2
+        {"id": "gender", "check": "one_of", "field": "Gender", "values": ["Male", "Female"], "normalize": "title",
+         "reason": "Gender must be Male or Female"},
+        # Rule 3
+        {"id": "role_required", "check": "required", "fields": ["Role"],
+         "reason": "Role is required"},
+        # Rule 5 (format); the database uniqueness check runs after validation
+        {"id": "email_format", "check": "pattern", "field": "Email", "pattern": r"^[\w\.-]+@[\w\.-]+\.\w+$",
+         "reason": "Email is not a valid address"},
+    ],
+    # Extra rules for a role, applied after the common ones, e.g.
+    # "Software Engineer": [{"id": "github_required", "check": "required", "fields": ["GitHub"]}]
+    "roles": {},
+}
+
+NORMALIZERS = {
+    None: lambda v: v,
+    "title": str.title,
+    "lower": str.lower,
+    "upper": str.upper,
+}
+
+# A compiled check returns False when the record breaks the rule; it may normalize fields in place
+Check = Callable[[Dict[str, str]], bool]
+Validator = Callable[[List[str]], Tuple[Optional[Dict[str, str]], Optional[str]]]
+
+
+def load_rule_schema() -> Dict[str, Any]:
+    """Returns the schema from CANDIDATE_RULES_PATH, or the built-in default."""
+    path = os.getenv("CANDIDATE_RULES_PATH")
+    if not path:
+        return DEFAULT_RULE_SCHEMA
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _compile_check(rule: Dict[str, Any]) -> Check:
+    kind = rule["check"]
+    if kind == "required":
+        fields = list(rule["fields"])
+        return lambda record: all(record.get(f) for f in fields)
+    if kind == "one_of":
+        field, allowed = rule["field"], frozenset(rule["values"])
+        normalize = NORMALIZERS[rule.get("normalize")]
+
+        def one_of(record):
+            value = normalize(record.get(field, ""))
+            if value not in allowed:
+                return False
+            record[field] = value  # store the standardized form
+            return True
+        return one_of
+    if kind == "pattern":
+        field, regex = rule["field"], re.compile(rule["pattern"])
+        return lambda record: bool(regex.match(record.get(field, "")))
+    if kind == "max_length":
+        field, limit = rule["field"], int(rule["max"])
+        return lambda record: len(record.get(field, "")) <= limit
+    raise ValueError(f"Unknown rule check '{kind}' in rule '{rule.get('id')}'")
+
+
+def _compile_rule_list(rules: List[Dict[str, Any]]) -> List[Tuple[str, Check]]:
+    return [(rule["id"], _compile_check(rule)) for rule in rules]
+
+
+def compile_rules(header: List[str], schema: Optional[Dict[str, Any]] = None) -> Validator:
+    """
+    Compiles a rule schema into a single-pass validator for rows under `header`.
+
+    Args:
+        header: The column names from the sheet's header row.
+        schema: The rule schema; defaults to load_rule_schema().
+
+    Returns:
+        A function taking a row's values and returning (record, None) when the row
+        is valid or (None, rule_id) for the first rule it breaks.
+    """
+    schema = schema or load_rule_schema()
+    common = _compile_rule_list(schema.get("common", []))
+    per_role = {
+        role: common + _compile_rule_list(rules) for role, rules in schema.get("roles", {}).items()
+    }
+    width = len(header)
+
+    def validate(values: List[str]):
+        if len(values) != width:
+            return None, COLUMN_COUNT_RULE
+        record = dict(zip(header, values))
+        for rule_id, check in per_role.get(record.get("Role"), common):
+            if not check(record):
+                return None, rule_id
+        return record, None
+
+    return validate
+
+
+def rule_reasons(schema: Optional[Dict[str, Any]] = None) -> Dict[str, str]:
+    """Maps each rule id to its human-readable reason."""
+    schema = schema or load_rule_schema()
+    reasons = {
+        COLUMN_COUNT_RULE: "Row does not have the same number of fields as the header",
+        EMAIL_EXISTS_RULE: "Email already exists in the database",
+    }
+    rules = list(schema.get("common", []))
+    for role_rules in schema.get("roles", {}).values():
+        rules.extend(role_rules)
+    for rule in rules:
+        reasons[rule["id"]] = rule.get("reason", rule["id"])
+    return reasons
+
+
+class ValidationReport:
+    """Per-rule rejection counters plus a capped sample of rejected rows."""
+
+    def __init__(self, reasons: Dict[str, str], max_samples: int = 20):
+        self.reasons = reasons
+        self.max_samples = max_samples
+        self.accepted = 0
+        self.rejections: Counter = Counter()
+        self.samples: List[Dict[str, Any]] = []
+
+    def reject(self, rule_id: str, line_number: int, row: str):
+        self.rejections[rule_id] += 1
+        if len(self.samples) < self.max_samples:
+            self.samples.append({
+                "line": line_number,
+                "rule": rule_id,
+                "reason": self.reasons.get(rule_id, rule_id),
+                "row": row,
+            })
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "accepted": self.accepted,
+            "rejected": sum(self.rejections.values()),
+            "rejections_by_rule": dict(self.rejections),
+            "rejected_samples": self.samples,
+        }
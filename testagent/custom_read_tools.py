@@ -1,14 +1,33 @@
+import asyncio
 import os
-import json
-import re
-from typing import Dict, Any
-from pymongo import MongoClient
+from typing import Callable, Dict, Any, Iterable, List, Optional, Tuple
+from bson import ObjectId
+from pymongo import ASCENDING, MongoClient
 from dotenv import load_dotenv
 from datetime import datetime, timezone
+from .candidate_model import Candidate, OnboardingEmail
+from .candidate_rules import EMAIL_EXISTS_RULE, ValidationReport, compile_rules, load_rule_schema, rule_reasons
+from .drive_lookup import lookup_drive_file
+from .onboarding_outbox import claim_batch, default_worker_id, ensure_outbox_indexes, record_result
+from .sheet_reader import fetch_sheet_rows
+from .sheet_watermarks import (
+    ensure_sheet_indexes, is_unchanged, row_hasher, save_watermark, sheet_digest, sheet_key, tracked_rows,
+)
+from shared.instrumentation import instrument, set_attributes
+from shared.serialization import dumps, loads
 
 
 load_dotenv()
 
+# Valid records per insert_many when saving candidates
+INSERT_CHUNK_SIZE = 1000
+
+# Lowercased copy of Email; duplicate checks look up each chunk's emails on its index
+EMAIL_KEY = "email_lower"
+
+_email_index_ensured = False
+_outbox_indexes_ensured = False
+
 # Move this inside functions to avoid module-level state
 def _get_mongo_client():
     """Helper function to create MongoDB client when needed"""
@@ -17,12 +36,31 @@ def _get_mongo_client():
         raise ValueError("MONGO_URI environment variable not set")
     return MongoClient(mongo_uri, serverSelectionTimeoutMS=5000)
 
-def process_and_save_candidates(raw_data_string: str) -> str:
+def ensure_email_index(coll):
+    """Index behind the duplicate-email check. Fills in EMAIL_KEY on candidates saved before it existed."""
+    coll.update_many(
+        {EMAIL_KEY: {"$exists": False}, "Email": {"$type": "string"}},
+        [{"$set": {EMAIL_KEY: {"$toLower": "$Email"}}}],
+    )
+    coll.create_index([(EMAIL_KEY, ASCENDING)])
+
+
+def saved_emails(coll, emails: Iterable[str]) -> set:
+    """Which of the lowercased `emails` a saved candidate already has."""
+    return {
+        doc[EMAIL_KEY]
+        for doc in coll.find({EMAIL_KEY: {"$in": list(emails)}}, {EMAIL_KEY: 1, "_id": 0})
+    }
+
+
+@instrument()
+def process_and_save_candidates(raw_data_string: str, file_id: str = "", tab: str = "") -> str:
     """
-    Parses a raw string of candidate data, manually validates each record, and saves valid ones to MongoDB.
+    Parses a raw string of candidate data, validates each record, and saves valid ones to MongoDB.
 
     This tool handles the entire workflow from raw text to database entry.
-    It manually parses the string line-by-line and applies the following validation rules:
+    It parses the string line-by-line and checks each row in a single pass against
+    the declarative rules in candidate_rules.py:
 
     - Rule 1: A 'First Name', 'Last Name', and 'Email' must be present for each candidate.
     - Rule 2: The 'Gender' must be either 'Male' or 'Female' (case-insensitive).
@@ -30,243 +68,545 @@ def process_and_save_candidates(raw_data_string: str) -> str:
     - Rule 4: Each candidate record must have the same number of fields as the header row.
     - Rule 5: The 'Email' field must be a valid email address and not already exist in the database.
 
-    Records that fail validation are discarded.
+    Records that fail validation are not saved; the result says which rule each
+    rejected row broke. When the data was read from a Drive file and its file_id
+    (and tab) are given, re-ingesting the same tab only validates and saves the
+    rows that are new or changed since the last time.
 
     Args:
         raw_data_string (str): A single string containing candidate data, with each candidate on a new line
                                and fields separated by commas. Assumes a header is the first line.
+        file_id (str): The Drive file ID the data was read from, if any.
+        tab (str): The name of the tab the data was read from, when it isn't the file's first tab.
 
     Returns:
-        str: The final status message: "Candidate records were validated and saved in MongoDB."
+        str: JSON string with:
+          {
+            "status": "success"|"no_records"|"error",
+            "message": status-text,
+            "accepted": n, "rejected": n,
+            "rejections_by_rule": { rule_id: count, … },
+            "rejected_samples": [ { "line","rule","reason","row" }, … ],
+            "added": n, "changed": n, "unchanged": n, "removed": n
+          }
+        "accepted" counts added and changed records. "removed" counts candidates
+        saved from the sheet earlier whose rows are gone; they are kept. Without
+        a file_id every row is new, so "changed", "unchanged" and "removed" are 0.
     """
     if not raw_data_string or not raw_data_string.strip():
-        return "Processing failed: The input string was empty."
+        return _ingest_result("error", "Processing failed: The input string was empty.")
 
     lines = raw_data_string.strip().split('\n')
     
     # Check for header and at least one data line
     if len(lines) < 2:
-        return "Error: Data must include a header row and at least one candidate record."
+        return _ingest_result("error", "Error: Data must include a header row and at least one candidate record.")
 
+    set_attributes(input_bytes=len(raw_data_string), rows=len(lines) - 1)
     header = [h.strip() for h in lines[0].split(',')]
-    data_lines = lines[1:]
-
-    # --- This is where the list of dictionaries is built manually ---
-    validated_candidates_list = []
-    for line in data_lines:
-        if not line.strip():
-            continue  # Skip empty lines
-
-        values = [v.strip() for v in line.split(',')]
-        
-        # Ensure the row has the same number of columns as the header
-        if len(values) != len(header):
-            continue
-
-        # Create a dictionary for the current candidate record
-        candidate_record = dict(zip(header, values))
-
-        # --- Apply validation rules to the created dictionary ---
-        first_name = candidate_record.get('First Name')
-        last_name = candidate_record.get('Last Name')
-        email = candidate_record.get('Email')
-        
-        # Rule 1: Check for presence of required fields
-        if not all([first_name, last_name, email]):
-            continue # Discard this record
-
-        # Rule 2: Check Gender
-        gender = candidate_record.get('Gender', '').title() # .title() makes it 'Male' or 'Female'
-        if gender not in ['Male', 'Female']:
-            continue # Discard this record
-
-        # Rule 3: Check Role
-        role = candidate_record.get('Role')
-        if not role:
-            continue
-
-        # Rule 4: Ensure all fields match the header length
-        if len(candidate_record) != len(header):
-            continue
-
-        EMAIL_REGEX = re.compile(r"^[\w\.-]+@[\w\.-]+\.\w+$")
-        if not EMAIL_REGEX.match(email):
-            continue
-        
-        # If all checks pass, add the validated and structured record to our list
-        # Ensure the gender is stored in the standardized format
-        candidate_record['Gender'] = gender
-        validated_candidates_list.append(candidate_record)
-    
-    # --- End of manual building and validation ---
+    rows = (
+        (line_number, [v.strip() for v in line.split(',')])
+        for line_number, line in enumerate(lines[1:], start=2)
+        if line.strip()  # Skip empty lines
+    )
+    return save_candidate_rows(header, rows, sheet_id=sheet_key(file_id, tab) if file_id else "")
+
+
+def save_candidate_rows(
+    header: List[str],
+    rows: Iterable[Tuple[int, List[str]]],
+    progress: Optional[Callable[[Dict[str, int]], None]] = None,
+    cancelled: Optional[Callable[[], bool]] = None,
+    chunk_size: int = INSERT_CHUNK_SIZE,
+    sheet_id: str = "",
+) -> str:
+    """
+    Validates candidate rows against the rules in candidate_rules.py and saves
+    the valid, new ones to MongoDB, `chunk_size` records per insert.
+
+    With a `sheet_id`, ingestion is incremental (see sheet_watermarks.py): rows
+    saved by an earlier ingestion of the same sheet are skipped when unchanged
+    and updated in place when changed, and only those and new rows are validated.
+
+    Args:
+        header: The column names from the sheet's header row.
+        rows: (line number, values) for each data row.
+        progress: Called after each chunk with rows_processed, accepted and rejected counts.
+        cancelled: Checked between rows; when it returns True, saving stops
+            (chunks already inserted stay) and the status is "cancelled".
+        chunk_size: Valid records buffered per insert_many.
+        sheet_id: The sheet the rows come from, from sheet_key().
 
-    if not validated_candidates_list:
-        return "Validation complete. No valid candidate records were found to save."
+    Returns:
+        str: The JSON result described in process_and_save_candidates.
+    """
+    schema = load_rule_schema()
+    validate = compile_rules(header, schema)
+    report = ValidationReport(rule_reasons(schema))
 
-    # Create MongoDB connection inside the function
+    # Create MongoDB connection inside the function, only once there is something to save
     client = None
-    try:
-        client = _get_mongo_client()
-        client.server_info()
-        db = client['nextleap']
-        collection = db['candidates']
-
-        
-        # Use the manually built list to create records in the database
-        # add a status field to each record
-        for candidate in validated_candidates_list:
-            candidate['status'] = 'Record_Saved'
-            candidate['created_at'] = datetime.now(timezone.utc)
-        
-        existing_emails = set(
-            doc["Email"].lower()
-            for doc in collection.find({}, {"Email": 1, "_id": 0})
+    collection = None
+    pending = []
+    updates = []
+    counts = {"rows_processed": 0, "valid": 0, "added": 0, "changed": 0, "unchanged": 0, "removed": 0}
+
+    def connect():
+        nonlocal client, collection
+        if collection is None:
+            client = _get_mongo_client()
+            client.server_info()
+            collection = client['nextleap']['candidates']
+        return collection
+
+    def report_progress():
+        if progress:
+            progress({
+                "rows_processed": counts["rows_processed"],
+                "accepted": report.accepted,
+                "rejected": sum(report.rejections.values()),
+            })
+
+    def flush():
+        global _email_index_ensured
+        if not pending and not updates:
+            return
+        connect()
+        if not _email_index_ensured:
+            ensure_email_index(collection)
+            _email_index_ensured = True
+        if updates:
+            now = datetime.now(timezone.utc)
+            for _id, record in updates:
+                record[EMAIL_KEY] = record['Email'].lower()
+                collection.update_one({"_id": _id}, {"$set": {**record, "updated_at": now}})
+            counts["changed"] += len(updates)
+            report.accepted += len(updates)
+            updates.clear()
+        # Only this chunk's emails are looked up; earlier chunks are already saved
+        existing_emails = saved_emails(collection, {c['Email'].lower() for c in pending}) if pending else set()
+
+        # Filter out duplicates before insert (second half of Rule 5), and add a status field to each record
+        new_candidates = []
+        for c in pending:
+            line_number = c.pop('_line')
+            email = c['Email'].lower()
+            if email in existing_emails:
+                report.reject(EMAIL_EXISTS_RULE, line_number, ",".join(str(c.get(h, "")) for h in header))
+            else:
+                existing_emails.add(email)
+                c[EMAIL_KEY] = email
+                c['status'] = 'Record_Saved'
+                c['created_at'] = datetime.now(timezone.utc)
+                new_candidates.append(c)
+        pending.clear()
+        if new_candidates:
+            collection.insert_many(new_candidates)
+            counts["added"] += len(new_candidates)
+            report.accepted += len(new_candidates)
+        report_progress()
+
+    def result(status: str, message: str) -> str:
+        return _ingest_result(
+            status, message, report,
+            added=counts["added"], changed=counts["changed"], unchanged=counts["unchanged"],
+            removed=counts["removed"],
         )
 
-        # Filter out duplicates before insert
-        validated_candidates_list_final = [
-            c for c in validated_candidates_list
-            if c['Email'].lower() not in existing_emails
-        ]
-        
-        if not validated_candidates_list_final:
-            return "Validation complete. No new valid candidate records to save."
-        
-        collection.insert_many(validated_candidates_list_final)
-        
+    try:
+        tracked = None
+        if sheet_id:
+            # Hash every row up front: an unchanged sheet is then recognised without validating anything
+            rows = list(rows)
+            row_hash = row_hasher(header)
+            hashes = [row_hash(values) for _, values in rows]
+            digest = sheet_digest(hashes, schema)
+            connect()
+            ensure_sheet_indexes(collection)
+            watermark = is_unchanged(collection.database, collection, sheet_id, digest)
+            if watermark:
+                counts["rows_processed"] = counts["unchanged"] = len(rows)
+                report_progress()
+                return result("success", f"The sheet hasn't changed since it was last ingested at "
+                                         f"{watermark['ingested_at']:%Y-%m-%d %H:%M} UTC; nothing to save.")
+            tracked = tracked_rows(collection, sheet_id)
+            email_index = header.index("Email") if "Email" in header else None
+            # Emails already used by an earlier row of this ingestion, skipped or not: a later
+            # row with the same email is a duplicate, never a change to the tracked candidate
+            seen_emails = set()
+            if email_index is not None:
+                # Tracked candidates whose email no row of the sheet has any more; they stay saved
+                sheet_emails = {values[email_index].lower() for _, values in rows if email_index < len(values)}
+                counts["removed"] = len(tracked.keys() - sheet_emails)
+
+        for index, (line_number, values) in enumerate(rows):
+            if cancelled and cancelled():
+                flush()
+                return result("cancelled", f"Ingestion was cancelled after {counts['rows_processed']} rows.")
+            counts["rows_processed"] += 1
+            previous = None
+            if tracked is not None and email_index is not None and email_index < len(values):
+                previous = tracked.get(values[email_index].lower())
+                if previous and previous[0] == hashes[index]:
+                    seen_emails.add(values[email_index].lower())
+                    counts["unchanged"] += 1
+                    if counts["rows_processed"] % chunk_size == 0:
+                        report_progress()
+                    continue
+
+            candidate_record, failed_rule = validate(values)
+            if failed_rule:
+                report.reject(failed_rule, line_number, ",".join(values))
+                continue
+
+            if tracked is not None:
+                email = candidate_record['Email'].lower()
+                if email in seen_emails:
+                    report.reject(EMAIL_EXISTS_RULE, line_number, ",".join(values))
+                    continue
+                seen_emails.add(email)
+
+            counts["valid"] += 1
+            if tracked is not None:
+                candidate_record['sheet_id'] = sheet_id
+                candidate_record['row_hash'] = hashes[index]
+            if previous:
+                updates.append((previous[1], candidate_record))
+            else:
+                candidate_record['_line'] = line_number
+                pending.append(candidate_record)
+            if len(pending) + len(updates) >= chunk_size:
+                flush()
+        flush()
+        report_progress()
+
+        if tracked is not None:
+            save_watermark(
+                collection.database, sheet_id, digest, len(tracked) + counts["added"],
+                {k: counts[k] for k in ("added", "changed", "unchanged", "removed")},
+            )
+            if not report.accepted:
+                return result("success", "No new or changed candidate records since the last ingestion.")
+
+        if not counts["valid"]:
+            return result("no_records", "Validation complete. No valid candidate records were found to save.")
+        if not report.accepted:
+            return result("no_records", "Validation complete. No new valid candidate records to save.")
+
         # The final, simple success message
-        return "Candidate records were validated and saved in MongoDB."
-        
+        return result("success", "Candidate records were validated and saved in MongoDB.")
+
     except Exception as e:
-        return f"Database Error: Could not save records. Details: {e}"
+        return result("error", f"Database Error: Could not save records. Details: {e}")
     finally:
         if client:
             client.close()
 
 
-def generate_onboarding_email() -> str:
+async def read_candidate_sheet(
+    user_google_email: str, file_id: str = "", sheet_name: str = "", tab: str = ""
+) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Resolves and reads one tab of a candidate sheet in this process.
+
+    Returns:
+        (sheet, None) with the sheet's "file_id", "tab", "sheet_id" (its
+        sheet_key), "source", "header", "row_count" and "rows" ((line number,
+        values) pairs, padded to the header's width), or (None, error message).
+    """
+    if not file_id:
+        if not sheet_name:
+            return None, "Either file_id or sheet_name must be given."
+        matches, _ = await asyncio.to_thread(lookup_drive_file, user_google_email, sheet_name, 1)
+        if not matches:
+            return None, f"No file matching '{sheet_name}' was found. Find its file ID with search_drive and retry."
+        file_id = matches[0]["id"]
+
+    try:
+        tabs, source = await fetch_sheet_rows(user_google_email, file_id)
+    except Exception as e:
+        return None, f"Failed to read sheet {file_id}: {e}"
+    if tabs is None:
+        return None, "The sheet can't be read here. Read it with read_file and use process_and_save_candidates."
+    if tab and tab not in tabs:
+        return None, f"Sheet {file_id} has no tab '{tab}'. Tabs: {', '.join(tabs)}."
+    first_tab = next(iter(tabs), "")
+    tab = tab or first_tab
+    rows = tabs.get(tab) or []
+    if len(rows) < 2:
+        return None, "Error: Data must include a header row and at least one candidate record."
+
+    header = [str(h).strip() for h in rows[0]]
+    width = len(header)
+    # Sheets leaves out trailing empty cells, so short rows are padded to the header's width
+    data_rows = (
+        (line_number, [str(v).strip() for v in values] + [""] * (width - len(values)))
+        for line_number, values in enumerate(rows[1:], start=2)
+        if any(str(v).strip() for v in values)
+    )
+    return {
+        "file_id": file_id,
+        "tab": tab,
+        "sheet_id": sheet_key(file_id, tab, first_tab),
+        "source": source,
+        "header": header,
+        "row_count": len(rows) - 1,
+        "rows": data_rows,
+    }, None
+
+
+@instrument()
+async def ingest_candidates_from_sheet(
+    user_google_email: str,
+    file_id: str = "",
+    sheet_name: str = "",
+    tab: str = "",
+) -> str:
     """
-    Reads every candidate record from MongoDB, then for each:
+    Reads a candidate sheet from Google Drive, validates each record, and saves valid ones to MongoDB.
+
+    The sheet is read and processed entirely inside the tool, so its rows never
+    need to be passed as arguments. Checks the same rules as process_and_save_candidates.
+    Ingesting a sheet again only validates and saves the rows that are new or
+    changed since its last ingestion; changed candidates are updated in place.
+
+    Args:
+        user_google_email (str): The user's Google email address.
+        file_id (str): The Drive file ID of the sheet. Either this or sheet_name is required.
+        sheet_name (str): The sheet's file name, resolved to a file ID when file_id is not given.
+        tab (str): The tab to read; defaults to the first tab.
+
+    Returns:
+        str: JSON string with the same fields as process_and_save_candidates, plus
+          "file_id", "tab" and "source" (where the rows were read from).
+    """
+    sheet, error = await read_candidate_sheet(user_google_email, file_id, sheet_name, tab)
+    if error:
+        return _ingest_result("error", error)
+    set_attributes(source=sheet["source"], rows=sheet["row_count"])
+    result = loads(await asyncio.to_thread(
+        save_candidate_rows, sheet["header"], sheet["rows"], sheet_id=sheet["sheet_id"]
+    ))
+    result.update(file_id=sheet["file_id"], tab=sheet["tab"], source=sheet["source"])
+    return dumps(result)
+
+
+def _ingest_result(status: str, message: str, report: Optional[ValidationReport] = None, **counts: int) -> str:
+    result = {"status": status, "message": message}
+    if report is not None:
+        result.update(report.to_dict())
+    result.update(counts)
+    set_attributes(status=status, accepted=result.get("accepted"), rejected=result.get("rejected"), **counts)
+    return dumps(result)
+
+
+# Documents each role has to upload during onboarding
+ROLE_DOCUMENT_REQUIREMENTS = {
+    "Software Engineer": [
+        "Signed NDA",
+        "Proof of identity (passport or driver's license or PAN card)",
+        "Signed offer letter",
+        "Educational certificates (degree/diploma in Computer Science/IT)",
+        "Previous employment certificate",
+        "Salary slip (last 3 months)",
+        "Bank account details",
+        "Technical skills assessment certificate",
+        "Code of conduct acknowledgement",
+        "Programming competency test results",
+        "GitHub/portfolio submission",
+        "System access request form"
+    ],
+
+    "Human Resources Executive": [
+        "Signed NDA",
+        "Proof of identity (passport or driver's license or PAN card)",
+        "Signed offer letter",
+        "Educational certificates (degree in HR/Psychology/Business Administration)",
+        "Previous employment certificate",
+        "Salary slip (last 3 months)",
+        "Bank account details",
+        "HR practices certification",
+        "Employment law training certificate",
+        "Enhanced confidentiality agreement",
+        "HRIS system access form",
+        "Background verification authorization",
+        "Employee data handling training completion",
+        "Conflict resolution certification"
+    ]
+}
+
+
+def _render_onboarding_email(candidate: Candidate, candidate_id: str, claim_token: str) -> OnboardingEmail:
+    first = candidate.first_name
+    last  = candidate.last_name
+    role  = candidate.role
+
+    subject = f"Welcome to NextLeap, {first}! Onboarding for your {role} Role"
+    title   = subject  # add 'title' key
+
+    # Document list
+    docs = ROLE_DOCUMENT_REQUIREMENTS.get(role, [
+        "Signed NDA",
+        "Proof of identity",
+        "Signed offer letter"
+    ])
+    docs_list = "\n".join(f"- {d}" for d in docs)
+
+    body = (
+        f"Hi {first} {last},\n\n"
+        f"Congratulations on joining NextLeap as a {role}!\n\n"
+        "To complete your onboarding, please prepare and upload the following documents:\n"
+        f"{docs_list}\n\n"
+        "If you have any questions, feel free to reach out. We're excited to have you on board!\n\n"
+        "Best,\n"
+        "The NextLeap HR Team"
+    )
+
+    return OnboardingEmail(
+        candidate_id=candidate_id,
+        claim_token=claim_token,
+        to=candidate.email,
+        title=title,
+        subject=subject,
+        body=body,
+    )
+
+
+@instrument()
+async def generate_onboarding_email(batch_size: int = 50) -> str:
+    """
+    Claims a batch of saved candidates from MongoDB, then for each:
       - Pulls First Name, Last Name, Email, Role
       - Builds a personalized onboarding email title/subject/body
       - Collects all emails into a JSON list
 
+    Claiming is atomic and leased (see onboarding_outbox.py), so several agents
+    can run this at once without emailing anyone twice. A candidate is only
+    marked as sent once record_onboarding_email_results reports the send;
+    claims that are never reported become available again when the lease expires.
+
+    Each call claims at most `batch_size` candidates. To email everyone, keep
+    calling it (and recording the results) until the status is "no_records".
+
+    Args:
+        batch_size (int): Maximum number of candidates to claim in this call.
+
     Returns JSON-string with:
       {
         "status": "success"|"no_records"|"error",
-        "emails": [ { "to","title","subject","body" }, … ],
+        "emails": [ { "candidate_id","claim_token","to","title","subject","body" }, … ],
         "message": error-or-info-text
       }
     """
-    # Define role requirements inside the function to avoid module-level state
-    ROLE_DOCUMENT_REQUIREMENTS = {
-        "Software Engineer": [
-            "Signed NDA",
-            "Proof of identity (passport or driver's license or PAN card)",
-            "Signed offer letter",
-            "Educational certificates (degree/diploma in Computer Science/IT)",
-            "Previous employment certificate",
-            "Salary slip (last 3 months)",
-            "Bank account details",
-            "Technical skills assessment certificate",
-            "Code of conduct acknowledgement",
-            "Programming competency test results",
-            "GitHub/portfolio submission",
-            "System access request form"
-        ],
-        
-        "Human Resources Executive": [
-            "Signed NDA",
-            "Proof of identity (passport or driver's license or PAN card)",
-            "Signed offer letter",
-            "Educational certificates (degree in HR/Psychology/Business Administration)",
-            "Previous employment certificate",
-            "Salary slip (last 3 months)",
-            "Bank account details",
-            "HR practices certification",
-            "Employment law training certificate",
-            "Enhanced confidentiality agreement",
-            "HRIS system access form",
-            "Background verification authorization",
-            "Employee data handling training completion",
-            "Conflict resolution certification"
-        ]
-    }
-    
+    # Each claim is a Mongo round trip; run them off the event loop the other sessions share
+    return await asyncio.to_thread(_generate_onboarding_emails, batch_size)
+
+
+def _generate_onboarding_emails(batch_size: int) -> str:
+    global _outbox_indexes_ensured
     client = None
     try:
         client = _get_mongo_client()
         client.server_info()
         coll = client['nextleap']['candidates']
+        if not _outbox_indexes_ensured:
+            ensure_outbox_indexes(coll)
+            _outbox_indexes_ensured = True
 
-        emails = []
-        for cand in coll.find({}):
-            first = cand.get("First Name", "").strip()
-            last  = cand.get("Last Name", "").strip()
-            to    = cand.get("Email", "").strip()
-            role  = cand.get("Role", "").strip()
-
-            if not (first and last and to and role):
-                continue
-
-            # Build title/subject
-            # send emails only if status is Record_saved
-            if cand.get("status") != "Record_Saved":
-                continue
-
-            subject = f"Welcome to NextLeap, {first}! Onboarding for your {role} Role"
-            title   = subject  # add 'title' key
-
-            # Document list
-            docs = ROLE_DOCUMENT_REQUIREMENTS.get(role, [
-                "Signed NDA",
-                "Proof of identity",
-                "Signed offer letter"
-            ])
-            docs_list = "\n".join(f"- {d}" for d in docs)
-
-            body = (
-                f"Hi {first} {last},\n\n"
-                f"Congratulations on joining NextLeap as a {role}!\n\n"
-                "To complete your onboarding, please prepare and upload the following documents:\n"
-                f"{docs_list}\n\n"
-                "If you have any questions, feel free to reach out. We're excited to have you on board!\n\n"
-                "Best,\n"
-                "The NextLeap HR Team"
-            )
-
-            emails.append({
-                "to": to,
-                "title": title,
-                "subject": subject,
-                "body": body
-            })
-
-            # Update the candidate record status to "Onboarding_Email_Sent" only when the email is successfully generated
-            # This ensures we don't update the status if no email
-            coll.update_one(
-                {"_id": cand["_id"]},
-                {"$set": {"status": "Onboarding_Email_Sent"}}
-            )
+        emails = [
+            _render_onboarding_email(Candidate.from_document(cand), str(cand["_id"]), cand["claim_token"])
+            for cand in claim_batch(coll, default_worker_id(), batch_size=batch_size)
+        ]
+        set_attributes(claimed=len(emails))
 
         if not emails:
-            return json.dumps({
+            return dumps({
                 "status": "no_records",
                 "emails": [],
                 "message": "No complete candidate records found to generate emails."
             })
 
-        return json.dumps({
+        return dumps({
             "status": "success",
             "emails": emails
         })
 
     except Exception as e:
-        return json.dumps({
+        return dumps({
             "status": "error",
             "emails": [],
             "message": f"Could not generate onboarding emails: {e}"
         })
     finally:
         if client:
-            client.close()
\ No newline at end of file
+            client.close()
+
+
+@instrument()
+async def record_onboarding_email_results(results: List[Dict[str, Any]]) -> str:
+    """
+    Records whether each onboarding email from generate_onboarding_email was sent.
+
+    Safe to call again with the same results; already recorded entries are reported
+    as such instead of being applied twice. Entries without a valid candidate_id
+    or claim_token are counted as invalid and skipped; the rest are still recorded.
+
+    Args:
+        results (list): One entry per email, each with:
+          { "candidate_id", "claim_token", "sent": true|false,
+            "message_id": optional id returned by send_gmail_message,
+            "error": optional failure text }
+
+    Returns JSON-string with:
+      {
+        "status": "success"|"error",
+        "recorded": n, "already_recorded": n, "lease_lost": n, "invalid": n,
+        "message": error-text
+      }
+    """
+    return await asyncio.to_thread(_record_onboarding_email_results, results)
+
+
+def _is_valid_email_result(entry: Any) -> bool:
+    return (
+        isinstance(entry, dict)
+        and isinstance(entry.get("candidate_id"), str)
+        and ObjectId.is_valid(entry["candidate_id"])
+        and isinstance(entry.get("claim_token"), str)
+        and bool(entry["claim_token"])
+    )
+
+
+def _record_onboarding_email_results(results: List[Dict[str, Any]]) -> str:
+    client = None
+    try:
+        client = _get_mongo_client()
+        client.server_info()
+        coll = client['nextleap']['candidates']
+
+        counts = {"recorded": 0, "already_recorded": 0, "lease_lost": 0, "invalid": 0}
+        for entry in results:
+            if not _is_valid_email_result(entry):
+                counts["invalid"] += 1
+                continue
+            outcome = record_result(
+                coll,
+                entry["candidate_id"],
+                entry["claim_token"],
+                bool(entry.get("sent")),
+                message_id=entry.get("message_id"),
+                error=entry.get("error"),
+            )
+            counts[outcome] += 1
+        set_attributes(results=len(results), **counts)
+
+        return dumps({"status": "success", **counts})
+
+    except Exception as e:
+        return dumps({
+            "status": "error",
+            "message": f"Could not record onboarding email results: {e}"
+        })
+    finally:
+        if client:
+            client.close()
@@ -0,0 +1,168 @@
+import asyncio
+import functools
+import json
+import os
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from google.adk.tools import BaseTool, ToolContext
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+from googleapiclient.discovery import build
+
+from shared.drive_index import FILE_FIELDS, DriveIndex
+from shared.instrumentation import instrument, set_attributes
+from shared.quota_scheduler import get_quota_scheduler
+from shared.serialization import dumps
+
+load_dotenv()
+
+# Changes are replayed on a lookup when the index is older than this
+REFRESH_AFTER_SECONDS = float(os.getenv("DRIVE_INDEX_REFRESH_SECONDS", "60"))
+
+# Where the Workspace MCP server keeps each user's OAuth tokens, as <email>.json
+CREDENTIALS_DIR = os.getenv(
+    "WORKSPACE_MCP_CREDENTIALS_DIR",
+    os.path.join(os.path.expanduser("~"), ".google_workspace_mcp", "credentials"),
+)
+
+# One search_drive result line, e.g. - Name: "Cohort 7" (ID: 1AbC..., Type: application/..., Modified: 2025-...)
+_SEARCH_RESULT_LINE = re.compile(
+    r'Name: "(?P<name>[^"]+)" \(ID: (?P<id>[^,)\s]+), Type: (?P<mimeType>[^,)\s]+)'
+    r"(?:[^)]*?Modified: (?P<modifiedTime>[^,)\s]+))?"
+)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_drive_index() -> DriveIndex:
+    """Opened on first use, so importing the agent creates no files."""
+    path = os.getenv("DRIVE_INDEX_PATH", os.path.join(os.path.expanduser("~"), ".cache", "adk_drive_index.db"))
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    return DriveIndex(path)
+
+
+def _credentials_path(user_google_email: str) -> str:
+    return os.path.join(CREDENTIALS_DIR, f"{user_google_email}.json")
+
+
+def has_workspace_tokens(user_google_email: str) -> bool:
+    """Whether the Workspace MCP server has stored OAuth tokens for the user here."""
+    return os.path.exists(_credentials_path(user_google_email))
+
+
+def workspace_credentials(user_google_email: str) -> Optional[Credentials]:
+    """The user's Workspace MCP OAuth tokens, refreshed if expired, or None when there are none."""
+    path = _credentials_path(user_google_email)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        creds = Credentials.from_authorized_user_info(json.load(f))
+    if not creds.valid and creds.refresh_token:
+        creds.refresh(Request())
+    return creds
+
+
+def _drive_service(user_google_email: str):
+    """Drive v3 client for the user, or None when there are no tokens."""
+    creds = workspace_credentials(user_google_email)
+    if creds is None:
+        return None
+    return build("drive", "v3", http=get_quota_scheduler().http(creds, "drive", user_google_email), cache_discovery=False)
+
+
+def _remote_search(drive, name: str, page_size: int = 10):
+    escaped = name.replace("\\", "\\\\").replace("'", "\\'")
+    response = drive.files().list(
+        q=f"name contains '{escaped}' and trashed = false",
+        fields=f"files({FILE_FIELDS})",
+        pageSize=page_size,
+    ).execute()
+    return response.get("files", [])
+
+
+def lookup_drive_file(user_google_email: str, name: str, max_results: int = 5) -> Tuple[List[Dict[str, Any]], str]:
+    """
+    Matches for `name` from the user's Drive index, refreshing it first when
+    stale and searching Drive remotely on a miss.
+
+    Returns:
+        (matches, source), where source is "index" or "remote".
+    """
+    index = _get_drive_index()
+    drive = None
+    try:
+        drive = _drive_service(user_google_email)
+        if drive is not None:
+            synced_at = index.synced_at(user_google_email)
+            if synced_at is None or time.time() - synced_at > REFRESH_AFTER_SECONDS:
+                index.refresh(user_google_email, drive)
+    except Exception as e:
+        # A stale index is still worth answering from
+        print(f"[Drive index] Refresh failed for {user_google_email}: {e}")
+
+    matches = index.lookup(user_google_email, name, limit=max_results)
+    source = "index"
+    if not matches and drive is not None:
+        try:
+            index.upsert(user_google_email, _remote_search(drive, name))
+            matches = index.lookup(user_google_email, name, limit=max_results)
+            source = "remote"
+        except Exception as e:
+            print(f"[Drive index] Remote search failed for {user_google_email}: {e}")
+    return matches, source
+
+
+@instrument()
+async def find_drive_file(user_google_email: str, name: str, max_results: int = 5) -> str:
+    """
+    Resolves a Google Drive file name to its file ID from a local index of the user's Drive.
+
+    Matching ignores case, separators and file extensions, and tolerates typos.
+    When nothing in the index matches, Drive is searched remotely.
+
+    Args:
+        user_google_email (str): The user's Google email address.
+        name (str): The file name, or part of it.
+        max_results (int): The maximum number of matches to return.
+
+    Returns:
+        str: JSON string with:
+          {
+            "status": "success"|"not_found",
+            "source": "index"|"remote",
+            "matches": [ { "id","name","mimeType","modifiedTime","score" }, … ],
+            "message": present when not_found
+          }
+    """
+    matches, source = await asyncio.to_thread(lookup_drive_file, user_google_email, name, max_results)
+    set_attributes(source=source, matches=len(matches))
+
+    if not matches:
+        return dumps({
+            "status": "not_found",
+            "source": source,
+            "matches": [],
+            "message": f"No file matching '{name}' is indexed. Use the search_drive tool to find it.",
+        })
+    return dumps({"status": "success", "source": source, "matches": matches})
+
+
+def index_search_drive_results(
+    tool: BaseTool, args: Dict[str, Any], tool_context: ToolContext, tool_response: Any
+) -> Optional[Dict]:
+    """
+    After-tool callback that adds the files a search_drive call returned to the
+    Drive index, so the next lookup of the same name is answered locally.
+    """
+    if tool.name != "search_drive" or not args.get("user_google_email"):
+        return None
+    if isinstance(tool_response, dict):
+        text = "\n".join(c.get("text", "") for c in tool_response.get("content", []) if isinstance(c, dict))
+    else:
+        text = str(tool_response)
+    files = [m.groupdict() for m in _SEARCH_RESULT_LINE.finditer(text)]
+    if files:
+        _get_drive_index().upsert(args["user_google_email"], files)
+    return None
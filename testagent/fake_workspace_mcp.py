@@ -0,0 +1,141 @@
+"""
+Local stand-in for the Google Workspace MCP server used by testagent.
+
+Implements the tools the onboarding prompt relies on (search_drive, read_file,
+send_gmail_message) with deterministic fake data, so the onboarding flow can
+be run and benchmarked offline.
+
+Usage:
+    python testagent/fake_workspace_mcp.py                      # stdio
+    python testagent/fake_workspace_mcp.py --transport http --port 8765
+
+Response sizes and injected latency come from the command line or, when the
+server is spawned by MCPToolset over stdio, from the environment:
+    FAKE_MCP_LATENCY_MS      delay added to every tool call (default 0)
+    FAKE_MCP_SHEET_ROWS      candidate rows returned by read_file (default 50)
+    FAKE_MCP_SEARCH_RESULTS  files returned by search_drive (default 5)
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import uuid
+
+from mcp.server.fastmcp import FastMCP
+
+mcp = FastMCP("fake_google_workspace", log_level="WARNING")
+
+settings = {
+    "latency_seconds": float(os.getenv("FAKE_MCP_LATENCY_MS", "0")) / 1000,
+    "sheet_rows": int(os.getenv("FAKE_MCP_SHEET_ROWS", "50")),
+    "search_results": int(os.getenv("FAKE_MCP_SEARCH_RESULTS", "5")),
+}
+
+# Messages "sent" through send_gmail_message, kept for inspection
+sent_messages = []
+
+CANDIDATE_HEADER = "First Name,Last Name,Email,Gender,Role"
+ROLES = ["Software Engineer", "Human Resources Executive"]
+
+
+def _file_id_for(name: str) -> str:
+    # Same name always maps to the same ID, like a real Drive file would
+    return hashlib.sha1(name.encode()).hexdigest()[:28]
+
+
+async def _simulate_latency():
+    if settings["latency_seconds"]:
+        await asyncio.sleep(settings["latency_seconds"])
+
+
+@mcp.tool()
+async def search_drive(user_google_email: str, query: str, page_size: int = 10) -> str:
+    """
+    Searches for files and folders within a user's Google Drive.
+
+    Args:
+        user_google_email (str): The user's Google email address.
+        query (str): The file name or search query.
+        page_size (int): The maximum number of files to return.
+
+    Returns:
+        str: The matching files with their IDs, types and modification times.
+    """
+    await _simulate_latency()
+    count = min(page_size, settings["search_results"])
+    lines = [f"Found {count} files for {user_google_email} matching '{query}':"]
+    for i in range(count):
+        name = query if i == 0 else f"{query} ({i})"
+        lines.append(
+            f'- Name: "{name}" (ID: {_file_id_for(name)}, '
+            f"Type: application/vnd.google-apps.spreadsheet, Modified: 2025-01-01T00:00:00Z)"
+        )
+    return "\n".join(lines)
+
+
+@mcp.tool()
+async def read_file(user_google_email: str, file_id: str) -> str:
+    """
+    Retrieves the content of a Google Drive file, exporting sheets as CSV.
+
+    Args:
+        user_google_email (str): The user's Google email address.
+        file_id (str): The Drive file ID.
+
+    Returns:
+        str: The file content as CSV, header row first.
+    """
+    await _simulate_latency()
+    lines = [CANDIDATE_HEADER]
+    # Distinct per file, so different sheets hold different candidates
+    prefix = _file_id_for(file_id)[:8]
+    for i in range(settings["sheet_rows"]):
+        gender = "Male" if i % 2 else "Female"
+        lines.append(f"First{i},Last{i},candidate.{prefix}.{i}@example.com,{gender},{ROLES[i % 2]}")
+    return "\n".join(lines)
+
+
+@mcp.tool()
+async def send_gmail_message(user_google_email: str, to: str, subject: str, content: str) -> str:
+    """
+    Sends an email using the user's Gmail account.
+
+    Args:
+        user_google_email (str): The user's Google email address.
+        to (str): Recipient email address.
+        subject (str): Email subject.
+        content (str): Email body.
+
+    Returns:
+        str: Confirmation message with the sent message ID.
+    """
+    await _simulate_latency()
+    message_id = uuid.uuid4().hex[:16]
+    sent_messages.append({"id": message_id, "from": user_google_email, "to": to, "subject": subject})
+    return f"Email sent! Message ID: {message_id}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Google Workspace MCP server.")
+    parser.add_argument("--transport", choices=["stdio", "http"], default="stdio")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=settings["latency_seconds"] * 1000)
+    parser.add_argument("--sheet-rows", type=int, default=settings["sheet_rows"])
+    parser.add_argument("--search-results", type=int, default=settings["search_results"])
+    args = parser.parse_args()
+
+    settings["latency_seconds"] = args.latency_ms / 1000
+    settings["sheet_rows"] = args.sheet_rows
+    settings["search_results"] = args.search_results
+
+    if args.transport == "stdio":
+        mcp.run(transport="stdio")
+    else:
+        mcp.settings.host = args.host
+        mcp.settings.port = args.port
+        mcp.run(transport="streamable-http")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""
+Background candidate ingestion jobs.
+
+`start_candidate_ingestion` is wrapped in ADK's LongRunningFunctionTool. It
+reads nothing itself; it registers a job and returns its ID at once, so a
+large cohort doesn't hold the turn open. Jobs run on the agent's event loop,
+at most INGEST_MAX_WORKERS at a time. The validation and Mongo inserts run on
+a thread pool of that size, and progress (rows processed, accepted, rejected)
+is updated after every inserted chunk. A job keeps nothing from the invocation
+that started it: it reads with the user's stored tokens or over the sheet
+reader's own Workspace MCP session, and start_candidate_ingestion refuses to
+start one when neither is available.
+
+The agent follows a job with `get_ingestion_job_status` and stops it with
+`cancel_ingestion_job`. A client driving the Runner itself can also send
+`job_update_content(job_id)` back as the long-running call's function
+response, to put the job's latest state into the conversation.
+"""
+import asyncio
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, Optional
+
+from google.adk.tools import ToolContext
+from google.genai import types
+
+from shared.instrumentation import instrument, set_attributes
+from shared.serialization import dumps, loads
+from .custom_read_tools import read_candidate_sheet, save_candidate_rows
+from .sheet_reader import can_read_sheets
+
+MAX_WORKERS = int(os.getenv("INGEST_MAX_WORKERS", "2"))
+
+# Finished jobs are kept this long for status queries
+JOB_RETENTION_SECONDS = 3600
+
+# Statuses a job can't leave
+FINISHED_STATUSES = ("succeeded", "failed", "cancelled")
+
+
+@dataclass
+class IngestJob:
+    """One background ingestion and its progress."""
+    job_id: str
+    user_google_email: str
+    file_id: str = ""
+    sheet_name: str = ""
+    tab: str = ""
+    function_call_id: Optional[str] = None
+    status: str = "queued"  # queued, reading, saving, succeeded, failed, cancelled
+    rows_total: int = 0
+    rows_processed: int = 0
+    accepted: int = 0
+    rejected: int = 0
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    _cancel: threading.Event = field(default_factory=threading.Event, repr=False)
+    _task: Optional[asyncio.Task] = field(default=None, repr=False)
+
+    def snapshot(self) -> Dict[str, Any]:
+        data = {f.name: getattr(self, f.name) for f in fields(self) if not f.name.startswith("_")}
+        data["percent"] = round(100 * self.rows_processed / self.rows_total, 1) if self.rows_total else 0.0
+        return data
+
+
+class IngestJobManager:
+    """Runs ingestion jobs with bounded concurrency and tracks their progress."""
+
+    def __init__(self, max_workers: int = MAX_WORKERS):
+        self.max_workers = max_workers
+        self._jobs: Dict[str, IngestJob] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest")
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def submit(self, job: IngestJob) -> IngestJob:
+        self._prune()
+        if self._semaphore is None:
+            # Created on the loop that runs the jobs
+            self._semaphore = asyncio.Semaphore(self.max_workers)
+        self._jobs[job.job_id] = job
+        job._task = asyncio.get_running_loop().create_task(self._run(job))
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestJob]:
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[IngestJob]:
+        job = self._jobs.get(job_id)
+        if job is None or job.status in FINISHED_STATUSES:
+            return job
+        job._cancel.set()
+        if job.status in ("queued", "reading") and job._task:
+            # Not saving yet, so nothing is half written
+            job._task.cancel()
+        return job
+
+    async def _run(self, job: IngestJob):
+        try:
+            async with self._semaphore:
+                job.status = "reading"
+                sheet, error = await read_candidate_sheet(job.user_google_email, job.file_id, job.sheet_name, job.tab)
+                if error:
+                    self._finish(job, "failed", error=error)
+                    return
+                job.file_id, job.tab, job.rows_total = sheet["file_id"], sheet["tab"], sheet["row_count"]
+                job.status = "saving"
+                result = loads(await asyncio.get_running_loop().run_in_executor(
+                    self._executor,
+                    lambda: save_candidate_rows(
+                        sheet["header"], sheet["rows"], progress=self._progress(job), cancelled=job._cancel.is_set,
+                        sheet_id=sheet["sheet_id"],
+                    ),
+                ))
+                if result["status"] == "cancelled":
+                    self._finish(job, "cancelled", result=result)
+                elif result["status"] == "error":
+                    self._finish(job, "failed", result=result, error=result["message"])
+                else:
+                    job.rows_processed = job.rows_total
+                    self._finish(job, "succeeded", result=result)
+        except asyncio.CancelledError:
+            self._finish(job, "cancelled")
+        except Exception as e:
+            self._finish(job, "failed", error=str(e))
+
+    @staticmethod
+    def _progress(job: IngestJob):
+        def update(counts: Dict[str, int]):
+            job.rows_processed = counts["rows_processed"]
+            job.accepted = counts["accepted"]
+            job.rejected = counts["rejected"]
+        return update
+
+    @staticmethod
+    def _finish(job: IngestJob, status: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None):
+        job.status = status
+        job.result = result
+        job.error = error
+        if result:
+            job.accepted = result.get("accepted", job.accepted)
+            job.rejected = result.get("rejected", job.rejected)
+        job.finished_at = time.time()
+        print(f"[Ingest jobs] Job {job.job_id} {status}: {job.accepted} accepted, {job.rejected} rejected.")
+
+    def _prune(self):
+        cutoff = time.time() - JOB_RETENTION_SECONDS
+        for job_id in [j.job_id for j in self._jobs.values() if j.finished_at and j.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+
+job_manager = IngestJobManager()
+
+
+@instrument()
+async def start_candidate_ingestion(
+    user_google_email: str,
+    tool_context: ToolContext,
+    file_id: str = "",
+    sheet_name: str = "",
+    tab: str = "",
+) -> Dict[str, Any]:
+    """
+    Starts reading, validating and saving the candidates of a Google Drive sheet in the background.
+
+    Returns immediately with a job ID. Use it with get_ingestion_job_status to
+    follow progress and cancel_ingestion_job to stop the job.
+
+    Args:
+        user_google_email (str): The user's Google email address.
+        file_id (str): The Drive file ID of the sheet. Either this or sheet_name is required.
+        sheet_name (str): The sheet's file name, resolved to a file ID when file_id is not given.
+        tab (str): The tab to read; defaults to the first tab.
+
+    Returns:
+        dict: {"status": "pending", "job_id": ..., "message": ...}
+    """
+    if not file_id and not sheet_name:
+        return {"status": "error", "message": "Either file_id or sheet_name must be given."}
+    # Jobs outlive this invocation, so they only read through paths that don't need its context
+    if not can_read_sheets(user_google_email):
+        return {
+            "status": "error",
+            "message": "The sheet can't be read here. Read it with read_file and use process_and_save_candidates.",
+        }
+    job = job_manager.submit(
+        IngestJob(
+            job_id=uuid.uuid4().hex[:12],
+            user_google_email=user_google_email,
+            file_id=file_id,
+            sheet_name=sheet_name,
+            tab=tab,
+            function_call_id=tool_context.function_call_id,
+        )
+    )
+    set_attributes(job_id=job.job_id)
+    return {
+        "status": "pending",
+        "job_id": job.job_id,
+        "message": "Ingestion started in the background. Check on it with get_ingestion_job_status.",
+    }
+
+
+@instrument()
+def get_ingestion_job_status(job_id: str) -> str:
+    """
+    Reports the progress of a background candidate ingestion job.
+
+    Args:
+        job_id (str): The job ID returned by start_candidate_ingestion.
+
+    Returns:
+        str: JSON string with the job's status (queued, reading, saving, succeeded,
+          failed or cancelled), rows_total, rows_processed, percent, accepted,
+          rejected and, once finished, the full ingestion result.
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        return dumps({"status": "error", "message": f"No ingestion job {job_id}."})
+    return dumps(job.snapshot())
+
+
+@instrument()
+def cancel_ingestion_job(job_id: str) -> str:
+    """
+    Cancels a background candidate ingestion job. Candidates already saved stay saved.
+
+    Args:
+        job_id (str): The job ID returned by start_candidate_ingestion.
+
+    Returns:
+        str: JSON string with the job's status after the request.
+    """
+    job = job_manager.cancel(job_id)
+    if job is None:
+        return dumps({"status": "error", "message": f"No ingestion job {job_id}."})
+    return dumps(job.snapshot())
+
+
+def job_update_content(job_id: str) -> Optional[types.Content]:
+    """
+    The job's current state as a function response to its start_candidate_ingestion
+    call, for a client to send back through the Runner.
+    """
+    job = job_manager.get(job_id)
+    if job is None or not job.function_call_id:
+        return None
+    return types.Content(
+        role="user",
+        parts=[types.Part(function_response=types.FunctionResponse(
+            id=job.function_call_id,
+            name=start_candidate_ingestion.__name__,
+            response=job.snapshot(),
+        ))],
+    )
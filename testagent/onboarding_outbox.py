@@ -0,0 +1,145 @@
+"""
+Onboarding email outbox on top of the `nextleap.candidates` collection.
+
+Lets any number of workers generate and send onboarding emails without
+double-sends. A candidate moves through:
+
+    Record_Saved --claim--> Onboarding_Email_Claimed --sent--> Onboarding_Email_Sent
+                                   |  \\--failed (retries left)--> Record_Saved
+                                   |   \\-failed (no retries)----> Onboarding_Email_Failed
+                                   \\--lease expired--> claimable again
+
+Each claim is a single `find_one_and_update`, so two workers can never hold
+the same candidate. A claim carries a lease; a worker that dies mid-batch
+simply lets its leases expire and another worker picks the candidates up.
+Results are recorded against the claim token, so reporting the same result
+twice is harmless and a worker whose lease was taken over cannot overwrite
+the new owner's result.
+"""
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.collection import Collection
+
+STATUS_SAVED = "Record_Saved"
+STATUS_CLAIMED = "Onboarding_Email_Claimed"
+STATUS_SENT = "Onboarding_Email_Sent"
+STATUS_FAILED = "Onboarding_Email_Failed"
+
+DEFAULT_LEASE_SECONDS = 300
+MAX_SEND_ATTEMPTS = 3
+
+# Fields every candidate needs before an email can be generated for it
+REQUIRED_FIELDS = ("First Name", "Last Name", "Email", "Role")
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def ensure_outbox_indexes(coll: Collection):
+    """Index that keeps claim queries cheap as the collection grows."""
+    coll.create_index([("status", ASCENDING), ("lease_expires_at", ASCENDING), ("created_at", ASCENDING)])
+
+
+def _claimable_filter(now: datetime) -> Dict[str, Any]:
+    return {
+        "$or": [
+            {"status": STATUS_SAVED},
+            # A claim whose worker never reported back
+            {"status": STATUS_CLAIMED, "lease_expires_at": {"$lt": now}},
+        ]
+    }
+
+
+def claim_batch(
+    coll: Collection,
+    worker_id: str,
+    batch_size: int = 50,
+    lease_seconds: int = DEFAULT_LEASE_SECONDS,
+) -> List[Dict[str, Any]]:
+    """
+    Atomically claims up to `batch_size` candidates for `worker_id`.
+
+    Candidates missing a required field are marked failed instead of returned,
+    so they don't get claimed over and over.
+
+    Returns:
+        The claimed candidate documents, each with its `claim_token`.
+    """
+    claimed = []
+    while len(claimed) < batch_size:
+        now = datetime.now(timezone.utc)
+        doc = coll.find_one_and_update(
+            _claimable_filter(now),
+            {
+                "$set": {
+                    "status": STATUS_CLAIMED,
+                    "lease_owner": worker_id,
+                    "lease_expires_at": now + timedelta(seconds=lease_seconds),
+                    "claim_token": uuid.uuid4().hex,
+                },
+                "$inc": {"send_attempts": 1},
+            },
+            sort=[("created_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+        if doc is None:
+            break
+        if not all(str(doc.get(f, "")).strip() for f in REQUIRED_FIELDS):
+            _finish(coll, doc["_id"], doc["claim_token"], STATUS_FAILED, {"last_error": "Incomplete candidate record"})
+            continue
+        claimed.append(doc)
+    return claimed
+
+
+def _finish(
+    coll: Collection, candidate_id: ObjectId, claim_token: str, status: str, fields: Dict[str, Any]
+) -> bool:
+    result = coll.update_one(
+        {"_id": candidate_id, "status": STATUS_CLAIMED, "claim_token": claim_token},
+        {
+            "$set": {"status": status, **fields},
+            "$unset": {"lease_owner": "", "lease_expires_at": ""},
+        },
+    )
+    return result.modified_count == 1
+
+
+def record_result(
+    coll: Collection,
+    candidate_id: str,
+    claim_token: str,
+    sent: bool,
+    message_id: Optional[str] = None,
+    error: Optional[str] = None,
+) -> str:
+    """
+    Records the outcome of sending one claimed email. Safe to call more than once.
+
+    Returns:
+        "recorded", "already_recorded", or "lease_lost" when the claim expired
+        and was taken over by another worker.
+    """
+    _id = ObjectId(candidate_id)
+    now = datetime.now(timezone.utc)
+    if sent:
+        fields = {"sent_at": now, "message_id": message_id}
+        recorded = _finish(coll, _id, claim_token, STATUS_SENT, fields)
+    else:
+        doc = coll.find_one({"_id": _id, "claim_token": claim_token}, {"send_attempts": 1})
+        attempts = doc.get("send_attempts", 0) if doc else 0
+        status = STATUS_FAILED if attempts >= MAX_SEND_ATTEMPTS else STATUS_SAVED
+        recorded = _finish(coll, _id, claim_token, status, {"last_error": error or "Send failed"})
+    if recorded:
+        return "recorded"
+
+    # Nothing matched: either this exact result is already stored, or someone else owns the claim now
+    if coll.count_documents({"_id": _id, "claim_token": claim_token, "status": {"$ne": STATUS_CLAIMED}}):
+        return "already_recorded"
+    return "lease_lost"
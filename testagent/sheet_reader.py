@@ -0,0 +1,157 @@
+import asyncio
+import csv
+import functools
+import io
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from google.adk.tools.mcp_tool.mcp_session_manager import MCPSessionManager
+from googleapiclient.discovery import build
+
+from shared.instrumentation import instrument, set_attributes
+from shared.quota_scheduler import get_quota_scheduler
+from shared.serialization import dumps
+from shared.sheet_cache import SheetCache, fetch_sheet, rows_to_csv
+from .drive_lookup import has_workspace_tokens, workspace_credentials
+
+load_dotenv()
+
+# What the Workspace MCP server's read_file puts between the file's details and its content
+READ_FILE_CONTENT_MARKER = "--- CONTENT ---"
+
+# Sessions to the agent's Workspace MCP server, for reading sheets when there are no tokens to call Google with
+_workspace_sessions: Optional[MCPSessionManager] = None
+
+
+def use_workspace_connection(connection_params):
+    """
+    Lets tools read files through the agent's Workspace MCP server. The reads
+    get a client session of their own rather than the agent's MCPToolset's,
+    whose session belongs to the model-driven calls of running invocations.
+    It is opened on the first read and reopened if it drops.
+    """
+    global _workspace_sessions
+    _workspace_sessions = MCPSessionManager(connection_params)
+
+
+def can_read_sheets(user_google_email: str) -> bool:
+    """Whether fetch_sheet_rows can read the user's sheets in this process."""
+    return _workspace_sessions is not None or has_workspace_tokens(user_google_email)
+
+
+async def close_workspace_reader():
+    """Closes the read session, if one is open; the next read opens a new one."""
+    if _workspace_sessions is not None:
+        await _workspace_sessions.close()
+
+
+@functools.lru_cache(maxsize=None)
+def _get_sheet_cache() -> SheetCache:
+    """Opened on first use, so importing the agent creates no files."""
+    return SheetCache(os.getenv("SHEET_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "adk_sheet_cache")))
+
+
+def load_sheet(user_google_email: str, file_id: str):
+    """
+    The rows of every tab of the sheet, via the local cache, or None when the
+    user has no Workspace MCP tokens to fetch it with.
+    """
+    creds = workspace_credentials(user_google_email)
+    if creds is None:
+        return None
+    scheduler = get_quota_scheduler()
+    drive = build("drive", "v3", http=scheduler.http(creds, "drive", user_google_email), cache_discovery=False)
+    sheets = build("sheets", "v4", http=scheduler.http(creds, "sheets", user_google_email), cache_discovery=False)
+    return fetch_sheet(user_google_email, file_id, drive, sheets, _get_sheet_cache())
+
+
+@instrument()
+async def read_sheet(user_google_email: str, file_id: str) -> str:
+    """
+    Reads every tab of a Google Sheet, XLSX or CSV file in Google Drive as CSV.
+
+    Unchanged files are served from a local cache after a metadata check, so
+    re-reading the same sheet is cheap.
+
+    Args:
+        user_google_email (str): The user's Google email address.
+        file_id (str): The Drive file ID.
+
+    Returns:
+        str: JSON string with:
+          {
+            "status": "success"|"unavailable"|"error",
+            "name": file name, "cache": "hit"|"miss",
+            "tabs": { tab_title: csv_text, … },
+            "message": present unless success
+          }
+    """
+    try:
+        sheet = await asyncio.to_thread(load_sheet, user_google_email, file_id)
+    except Exception as e:
+        return dumps({"status": "error", "message": f"Failed to read sheet {file_id}: {e}"})
+    if sheet is None:
+        return dumps({
+            "status": "unavailable",
+            "message": "No Google credentials are available here. Use the read_file tool instead.",
+        })
+    set_attributes(cache=sheet["cache"], tabs=len(sheet["tabs"]), rows=sum(len(r) for r in sheet["tabs"].values()))
+    return dumps({
+        "status": "success",
+        "name": sheet["name"],
+        "cache": sheet["cache"],
+        "tabs": {title: rows_to_csv(rows) for title, rows in sheet["tabs"].items()},
+    })
+
+
+def _mcp_text(result: Any) -> str:
+    return "\n".join(getattr(c, "text", "") for c in result.content)
+
+
+async def _read_via_workspace_mcp(user_google_email: str, file_id: str) -> Optional[List[List[str]]]:
+    if _workspace_sessions is None:
+        return None
+    session = await _workspace_sessions.create_session()
+    # Called directly rather than by the model, so it skips the agent's quota gate
+    result = await get_quota_scheduler().run(
+        "drive", user_google_email, session.call_tool,
+        "read_file", arguments={"user_google_email": user_google_email, "file_id": file_id},
+    )
+    if result.isError:
+        raise RuntimeError(_mcp_text(result))
+    return _read_file_rows(_mcp_text(result))
+
+
+def _read_file_rows(text: str) -> List[List[str]]:
+    """
+    The CSV rows of a read_file result. The server puts the file's details
+    (`File: "<name>" (ID: <id>, Type: <mime>)`, its link) before the content,
+    and those lines hold commas too, so the CSV starts after the content
+    marker, or failing that at the first row with an Email column.
+    """
+    _, marker, content = text.partition(READ_FILE_CONTENT_MARKER)
+    if marker:
+        return list(csv.reader(io.StringIO(content.lstrip("\r\n"))))
+    rows = list(csv.reader(io.StringIO(text)))
+    start = next((i for i, row in enumerate(rows) if "email" in (cell.strip().lower() for cell in row)), 0)
+    return rows[start:]
+
+
+async def fetch_sheet_rows(user_google_email: str, file_id: str) -> Tuple[Optional[Dict[str, List[List[str]]]], str]:
+    """
+    The rows of every tab of a sheet, read in this process rather than by the model.
+    Depends on no invocation's context, so background jobs can call it too.
+
+    Uses the Google APIs (through the sheet cache) when the user has Workspace
+    MCP tokens here, otherwise the Workspace MCP server's read_file.
+
+    Returns:
+        (tabs, source); tabs is None when neither is available. source is
+        "cache", "google" or "workspace_mcp".
+    """
+    sheet = await asyncio.to_thread(load_sheet, user_google_email, file_id)
+    if sheet is not None:
+        return sheet["tabs"], "cache" if sheet["cache"] == "hit" else "google"
+    rows = await _read_via_workspace_mcp(user_google_email, file_id)
+    return ({"Sheet1": rows} if rows is not None else None), "workspace_mcp"
@@ -0,0 +1,98 @@
+"""
+Per-sheet ingestion state, so re-ingesting a sheet only touches what changed.
+
+Every candidate saved from a sheet carries `sheet_id` (see sheet_key) and
+`row_hash`, a digest of its row under the sheet's header. Each sheet also has
+one watermark document in `nextleap.sheet_ingestions`: a digest of the whole
+tab and the rule schema as of the last completed ingestion, and how many
+candidates that ingestion left saved for the sheet.
+
+save_candidate_rows uses them in two steps:
+  * the tab's digest matches the watermark and the sheet still has that many
+    candidates: nothing changed, so no row is validated or looked up
+  * otherwise the row hashes of the sheet's candidates are loaded with one
+    indexed query. Rows whose hash matches are skipped, rows whose email is
+    tracked but whose hash differs are validated and updated in place, and
+    the rest go through the normal validate-and-insert path.
+
+Rows removed from the sheet are counted (`removed`), not deleted. Updating a changed row
+leaves its onboarding status as it is.
+"""
+import hashlib
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pymongo import ASCENDING
+from pymongo.collection import Collection
+from pymongo.database import Database
+
+from shared.serialization import dumps_bytes
+
+WATERMARK_COLLECTION = "sheet_ingestions"
+
+_FIELD_SEPARATOR = b"\x1f"
+_ROW_SEPARATOR = b"\x1e"
+
+
+def sheet_key(file_id: str, tab: str = "", first_tab: str = "") -> str:
+    """
+    The `sheet_id` candidates from one tab of a Drive file are tracked under.
+
+    The file's first tab is keyed by the file ID alone, so a caller that only
+    has the file ID (read_file returns the first tab) and one that read the
+    tab by name track the same rows.
+    """
+    return f"{file_id}/{tab}" if tab and tab != first_tab else file_id
+
+
+def row_hasher(header: List[str]) -> Callable[[List[str]], str]:
+    """Returns a function hashing a row's values together with `header`."""
+    seeded = hashlib.blake2b(digest_size=16)
+    seeded.update(_FIELD_SEPARATOR.join(h.encode() for h in header) + _ROW_SEPARATOR)
+
+    def row_hash(values: List[str]) -> str:
+        digest = seeded.copy()
+        digest.update(_FIELD_SEPARATOR.join(v.encode() for v in values))
+        return digest.hexdigest()
+
+    return row_hash
+
+
+def sheet_digest(row_hashes: List[str], schema: Dict[str, Any]) -> str:
+    """Digest of a whole tab, given its row hashes, and the rules it is validated against."""
+    digest = hashlib.blake2b(dumps_bytes(schema), digest_size=16)
+    for h in row_hashes:
+        digest.update(h.encode())
+    return digest.hexdigest()
+
+
+def ensure_sheet_indexes(coll: Collection):
+    """Index behind tracked_rows and the watermark's candidate count."""
+    coll.create_index([("sheet_id", ASCENDING)])
+
+
+def tracked_rows(coll: Collection, sheet_id: str) -> Dict[str, Tuple[str, Any]]:
+    """Maps the lowercased email of each candidate saved from `sheet_id` to (row hash, _id)."""
+    return {
+        doc["Email"].lower(): (doc.get("row_hash"), doc["_id"])
+        for doc in coll.find({"sheet_id": sheet_id}, {"Email": 1, "row_hash": 1})
+    }
+
+
+def is_unchanged(db: Database, coll: Collection, sheet_id: str, digest: str) -> Optional[Dict[str, Any]]:
+    """The sheet's watermark if `digest` matches it and its candidates are all still saved, else None."""
+    watermark = db[WATERMARK_COLLECTION].find_one({"_id": sheet_id})
+    if not watermark or watermark.get("digest") != digest:
+        return None
+    if coll.count_documents({"sheet_id": sheet_id}) != watermark.get("saved"):
+        return None
+    return watermark
+
+
+def save_watermark(db: Database, sheet_id: str, digest: str, saved: int, counts: Dict[str, int]):
+    """Records a completed ingestion of `sheet_id`."""
+    db[WATERMARK_COLLECTION].replace_one(
+        {"_id": sheet_id},
+        {"digest": digest, "saved": saved, "ingested_at": datetime.now(timezone.utc), **counts},
+        upsert=True,
+    )
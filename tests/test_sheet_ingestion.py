@@ -0,0 +1,61 @@
+"""Incremental sheet ingestion (testagent/sheet_watermarks.py) against an in-process mongomock."""
+from unittest import mock
+
+import mongomock
+import pytest
+
+from benchmarks.load_test import offline_environment
+from shared.serialization import loads
+
+with offline_environment():
+    from testagent import custom_read_tools
+
+HEADER = ["First Name", "Last Name", "Email", "Gender", "Role"]
+
+
+def _row(first: str, email: str):
+    return [first, "Smith", email, "Female", "Software Engineer"]
+
+
+@pytest.fixture
+def candidates():
+    client = mongomock.MongoClient()
+    client.close = lambda: None
+    with mock.patch.object(custom_read_tools, "_get_mongo_client", lambda: client):
+        yield client["nextleap"]["candidates"]
+
+
+def _ingest(rows):
+    numbered = [(line, values) for line, values in enumerate(rows, start=2)]
+    return loads(custom_read_tools.save_candidate_rows(HEADER, numbered, sheet_id="file-1"))
+
+
+def test_duplicate_row_never_replaces_the_saved_candidate(candidates):
+    alice, bob = _row("Alice", "x@example.com"), _row("Bob", "x@example.com")
+
+    first = _ingest([alice, bob])
+    assert first["accepted"] == 1
+    assert first["rejections_by_rule"] == {"email_exists": 1}
+
+    # The sheet changes elsewhere, so it is re-ingested row by row
+    for extra in ("c@example.com", "d@example.com"):
+        result = _ingest([alice, bob, _row("Carol", extra)])
+        assert result["changed"] == 0
+        assert result["rejections_by_rule"] == {"email_exists": 1}
+        saved = candidates.find_one({"email_lower": "x@example.com"})
+        assert saved["First Name"] == "Alice"
+    assert candidates.count_documents({"email_lower": "x@example.com"}) == 1
+
+
+def test_changed_row_is_updated_in_place(candidates):
+    _ingest([_row("Alice", "x@example.com")])
+    result = _ingest([_row("Alicia", "x@example.com")])
+    assert (result["added"], result["changed"]) == (0, 1)
+    assert candidates.find_one({"email_lower": "x@example.com"})["First Name"] == "Alicia"
+
+
+def test_removed_rows_are_counted_and_kept(candidates):
+    _ingest([_row("Alice", "a@example.com"), _row("Bob", "b@example.com")])
+    result = _ingest([_row("Alice", "a@example.com")])
+    assert (result["unchanged"], result["removed"]) == (1, 1)
+    assert candidates.count_documents({"sheet_id": "file-1"}) == 2
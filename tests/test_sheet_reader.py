@@ -0,0 +1,34 @@
+"""Reading a sheet through the Workspace MCP server's read_file (testagent/sheet_reader.py)."""
+import asyncio
+from types import SimpleNamespace
+from unittest import mock
+
+from benchmarks.load_test import offline_environment
+
+with offline_environment():
+    from testagent import sheet_reader
+
+CSV = "First Name,Last Name,Email,Gender,Role\nAlice,Smith,alice@example.com,Female,Software Engineer"
+ROWS = [
+    ["First Name", "Last Name", "Email", "Gender", "Role"],
+    ["Alice", "Smith", "alice@example.com", "Female", "Software Engineer"],
+]
+
+
+def _read(text: str):
+    session = SimpleNamespace(call_tool=mock.AsyncMock(
+        return_value=SimpleNamespace(isError=False, content=[SimpleNamespace(text=text)])))
+    sessions = SimpleNamespace(create_session=mock.AsyncMock(return_value=session))
+    with mock.patch.object(sheet_reader, "_workspace_sessions", sessions):
+        return asyncio.run(sheet_reader._read_via_workspace_mcp("user@example.com", "file-1"))
+
+
+def test_file_details_before_the_content_are_not_read_as_the_header():
+    text = ('File: "Cohort, May" (ID: file-1, Type: application/vnd.google-apps.spreadsheet)\n'
+            "Link: https://docs.google.com/spreadsheets/d/file-1/edit\n\n--- CONTENT ---\n" + CSV)
+    assert _read(text) == ROWS
+
+
+def test_without_the_content_marker_the_csv_starts_at_the_header():
+    assert _read('File: "Cohort" (ID: file-1, Type: text/csv)\n' + CSV) == ROWS
+    assert _read(CSV) == ROWS